@@ -0,0 +1,27 @@
+"""Add scenario version
+
+Revision ID: a1c2d3e4f501
+Revises: fac123456789
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a1c2d3e4f501'
+down_revision: Union[str, None] = 'fac123456789'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('scenarios', sa.Column('version', sa.BigInteger(), nullable=False, server_default='1'))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('scenarios', schema=None) as batch_op:
+        batch_op.drop_column('version')
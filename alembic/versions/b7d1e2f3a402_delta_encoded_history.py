@@ -0,0 +1,38 @@
+"""Delta-encoded scenario history
+
+Revision ID: b7d1e2f3a402
+Revises: a1c2d3e4f501
+Create Date: 2026-10-19 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d1e2f3a402'
+down_revision: Union[str, None] = 'a1c2d3e4f501'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Existing rows keep their full snapshot_data and are read as keyframes
+    with op.batch_alter_table('scenario_history', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('payload', sa.LargeBinary(), nullable=True))
+        batch_op.add_column(sa.Column('is_keyframe', sa.Boolean(), nullable=True))
+        batch_op.add_column(sa.Column('base_id', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('chain_depth', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('fk_scenario_history_base_id', 'scenario_history', ['base_id'], ['id'])
+
+
+def downgrade() -> None:
+    # Entries written as deltas/keyframes have no snapshot_data and lose their content here
+    with op.batch_alter_table('scenario_history', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_scenario_history_base_id', type_='foreignkey')
+        batch_op.drop_column('chain_depth')
+        batch_op.drop_column('base_id')
+        batch_op.drop_column('is_keyframe')
+        batch_op.drop_column('payload')
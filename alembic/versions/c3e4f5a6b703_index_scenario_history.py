@@ -0,0 +1,26 @@
+"""Index scenario_history on (scenario_id, id)
+
+Revision ID: c3e4f5a6b703
+Revises: b7d1e2f3a402
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3e4f5a6b703'
+down_revision: Union[str, None] = 'b7d1e2f3a402'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_scenario_history_scenario_id_id', 'scenario_history', ['scenario_id', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_scenario_history_scenario_id_id', table_name='scenario_history')
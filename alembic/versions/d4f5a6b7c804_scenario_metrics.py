@@ -0,0 +1,39 @@
+"""Stored headline metrics per scenario
+
+Revision ID: d4f5a6b7c804
+Revises: c3e4f5a6b703
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4f5a6b7c804'
+down_revision: Union[str, None] = 'c3e4f5a6b703'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('scenario_metrics',
+    sa.Column('scenario_id', sa.Integer(), nullable=False),
+    sa.Column('version', sa.BigInteger(), nullable=False),
+    sa.Column('months', sa.Integer(), nullable=False),
+    sa.Column('computed_at', sa.DateTime(), nullable=False),
+    sa.Column('current_net_worth', sa.Integer(), nullable=True),
+    sa.Column('final_net_worth', sa.Integer(), nullable=True),
+    sa.Column('final_liquid_assets', sa.Integer(), nullable=True),
+    sa.Column('debt_free_date', sa.Date(), nullable=True),
+    sa.Column('insolvency_date', sa.Date(), nullable=True),
+    sa.Column('tax_paid', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['scenario_id'], ['scenarios.id'], ),
+    sa.PrimaryKeyConstraint('scenario_id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('scenario_metrics')
@@ -5,3 +5,5 @@ from .scenarios import *
 from .rules import *
 from .tax_limits import *
 from .strategies import *
+from .export import *
+from .history import *
@@ -0,0 +1,100 @@
+import zlib
+from collections import defaultdict
+from typing import Iterable, Iterator
+
+from pydantic_core import to_json
+from sqlalchemy import select
+from sqlalchemy.orm import Session, selectinload
+
+from .. import models, schemas
+
+# Rows fetched per round trip while streaming a section
+EXPORT_BATCH_SIZE = 500
+
+# Flat sections of a ScenarioImport: (key, ORM model, import schema)
+_FLAT_SECTIONS = [
+    ("costs", models.Cost, schemas.ImportCost),
+    ("transfers", models.Transfer, schemas.ImportTransfer),
+    ("financial_events", models.FinancialEvent, schemas.ImportFinancialEvent),
+    ("tax_limits", models.TaxLimit, schemas.ImportTaxLimit),
+    ("automation_rules", models.AutomationRule, schemas.ImportAutomationRule),
+    ("chart_annotations", models.ChartAnnotation, schemas.ImportChartAnnotation),
+    ("decumulation_strategies", models.DecumulationStrategy, schemas.ImportDecumulationStrategy),
+]
+
+def _dump(schema_cls, obj, **extra) -> bytes:
+    values = {name: getattr(obj, name) for name in schema_cls.model_fields if name not in extra and hasattr(obj, name)}
+    return schema_cls.model_validate(dict(values, **extra)).model_dump_json().encode()
+
+def _section(key: str, items: Iterable[bytes], first: bool = False) -> Iterator[bytes]:
+    yield (b'' if first else b',') + b'"' + key.encode() + b'":['
+    for i, item in enumerate(items):
+        yield item if i == 0 else b',' + item
+    yield b']'
+
+def _stream(db: Session, model_cls, scenario_id: int):
+    # yield_per fetches in batches (server-side cursor where the driver supports it)
+    stmt = select(model_cls).where(model_cls.scenario_id == scenario_id).order_by(model_cls.id)
+    return db.execute(stmt, execution_options={"yield_per": EXPORT_BATCH_SIZE}).scalars()
+
+def iter_scenario_export(db: Session, scenario: models.Scenario) -> Iterator[bytes]:
+    """
+    Streams a scenario as JSON in exactly the shape ScenarioImport accepts, one entity at a time.
+    Ids are the scenario's own, so links between entities survive a re-import.
+    """
+    header = {"name": scenario.name, "description": scenario.description,
+              "start_date": scenario.start_date, "gbp_to_usd_rate": scenario.gbp_to_usd_rate}
+    yield b'{' + to_json(header)[1:-1] + b','
+
+    owners = (db.query(models.Owner).options(selectinload(models.Owner.income_sources))
+              .filter(models.Owner.scenario_id == scenario.id).order_by(models.Owner.id))
+    yield from _section("owners", (
+        _dump(schemas.ImportOwner, o, income_sources=[
+            schemas.ImportIncomeSource.model_validate(inc, from_attributes=True) for inc in o.income_sources])
+        for o in owners
+    ), first=True)
+
+    # Owner links as ids, fetched once rather than per account
+    account_owners = defaultdict(list)
+    links = (db.query(models.AccountOwner.account_id, models.AccountOwner.owner_id)
+             .join(models.Account, models.Account.id == models.AccountOwner.account_id)
+             .filter(models.Account.scenario_id == scenario.id))
+    for account_id, owner_id in links: account_owners[account_id].append(owner_id)
+    yield from _section("accounts", (
+        _dump(schemas.ImportAccount, a, owners=account_owners.get(a.id, []))
+        for a in _stream(db, models.Account, scenario.id)
+    ))
+
+    for key, model_cls, schema_cls in _FLAT_SECTIONS:
+        yield from _section(key, (_dump(schema_cls, obj) for obj in _stream(db, model_cls, scenario.id)))
+    yield b'}'
+
+def iter_all_scenarios_export(db: Session) -> Iterator[bytes]:
+    """Streams every scenario as newline-delimited JSON (one ScenarioImport document per line)."""
+    scenario_ids = [row.id for row in db.query(models.Scenario.id).order_by(models.Scenario.id)]
+    for scenario_id in scenario_ids:
+        scenario = db.get(models.Scenario, scenario_id)
+        if scenario is None: continue
+        yield from iter_scenario_export(db, scenario)
+        yield b'\n'
+        # Keep the identity map from growing across scenarios
+        db.expunge_all()
+
+def buffer_chunks(chunks: Iterable[bytes], size: int = 64 * 1024) -> Iterator[bytes]:
+    """Coalesces many small pieces into ~size-byte chunks so each write to the client carries real work."""
+    buffer, buffered = [], 0
+    for chunk in chunks:
+        buffer.append(chunk)
+        buffered += len(chunk)
+        if buffered >= size:
+            yield b''.join(buffer)
+            buffer, buffered = [], 0
+    if buffer: yield b''.join(buffer)
+
+def gzip_chunks(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    """Gzip-compresses a byte stream incrementally."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        out = compressor.compress(chunk)
+        if out: yield out
+    yield compressor.flush()
@@ -0,0 +1,274 @@
+import atexit
+import copy
+import json
+import logging
+import os
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from datetime import date
+from typing import Any, Dict, List, Optional, Set
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from .. import models, schemas
+from .scenarios import get_scenario_graph
+
+logger = logging.getLogger(__name__)
+
+# A full snapshot is stored every N entries; the rest are deltas against the previous entry
+HISTORY_KEYFRAME_INTERVAL = int(os.getenv("HISTORY_KEYFRAME_INTERVAL", "20"))
+# Entries kept per scenario; older ones are dropped by compact_history
+HISTORY_MAX_ENTRIES = int(os.getenv("HISTORY_MAX_ENTRIES", "200"))
+
+# --- JSON Patch (RFC 6902 subset: add / remove / replace) ---
+
+def _escape(token) -> str:
+    return str(token).replace("~", "~0").replace("/", "~1")
+
+def _unescape(token: str) -> str:
+    return token.replace("~1", "/").replace("~0", "~")
+
+def json_diff(old: Any, new: Any, path: str = "") -> List[Dict[str, Any]]:
+    """Operations that turn `old` into `new`. Lists are matched on common prefix/suffix, then index by index."""
+    if type(old) is not type(new):
+        return [{"op": "replace", "path": path, "value": new}]
+    if isinstance(old, dict):
+        ops = [{"op": "remove", "path": f"{path}/{_escape(k)}"} for k in old if k not in new]
+        for k, v in new.items():
+            if k not in old: ops.append({"op": "add", "path": f"{path}/{_escape(k)}", "value": v})
+            else: ops.extend(json_diff(old[k], v, f"{path}/{_escape(k)}"))
+        return ops
+    if isinstance(old, list):
+        prefix = 0
+        while prefix < len(old) and prefix < len(new) and old[prefix] == new[prefix]: prefix += 1
+        suffix = 0
+        while suffix < len(old) - prefix and suffix < len(new) - prefix and old[-1 - suffix] == new[-1 - suffix]: suffix += 1
+        old_mid, new_mid = len(old) - prefix - suffix, len(new) - prefix - suffix
+        common = min(old_mid, new_mid)
+        ops = []
+        for i in range(prefix, prefix + common):
+            ops.extend(json_diff(old[i], new[i], f"{path}/{i}"))
+        # Removals from the highest index down so earlier indices stay valid
+        for i in reversed(range(prefix + common, prefix + old_mid)):
+            ops.append({"op": "remove", "path": f"{path}/{i}"})
+        for i in range(prefix + common, prefix + new_mid):
+            ops.append({"op": "add", "path": f"{path}/{i}", "value": new[i]})
+        return ops
+    return [] if old == new else [{"op": "replace", "path": path, "value": new}]
+
+def apply_patch(doc: Any, ops: List[Dict[str, Any]], in_place: bool = False) -> Any:
+    """Applies json_diff output to a copy of `doc` (or to `doc` itself with in_place=True)."""
+    if not in_place: doc = copy.deepcopy(doc)
+    for op in ops:
+        if op["path"] == "":
+            doc = copy.deepcopy(op["value"])
+            continue
+        *parents, last = [_unescape(t) for t in op["path"].split("/")[1:]]
+        target = doc
+        for token in parents:
+            target = target[int(token)] if isinstance(target, list) else target[token]
+        if isinstance(target, list):
+            index = len(target) if last == "-" else int(last)
+            if op["op"] == "add": target.insert(index, copy.deepcopy(op["value"]))
+            elif op["op"] == "remove": del target[index]
+            else: target[index] = copy.deepcopy(op["value"])
+        else:
+            if op["op"] == "remove": del target[last]
+            else: target[last] = copy.deepcopy(op["value"])
+    return doc
+
+# --- Storage ---
+
+def _encode(value) -> bytes:
+    return zlib.compress(json.dumps(value, separators=(",", ":")).encode())
+
+def _decode(payload: bytes):
+    return json.loads(zlib.decompress(payload))
+
+def get_history_snapshot(db: Session, item: models.ScenarioHistory) -> Dict[str, Any]:
+    """Reconstructs the full scenario document of a history entry (nearest keyframe + deltas)."""
+    chain = []
+    while item.payload is not None and not item.is_keyframe:
+        chain.append(_decode(item.payload))
+        item = db.get(models.ScenarioHistory, item.base_id)
+        if item is None: raise ValueError("History chain is broken (base entry missing)")
+    # Entries written before delta encoding hold the full document in snapshot_data
+    doc = item.snapshot_data if item.payload is None else _decode(item.payload)
+    if item.payload is None: doc = copy.deepcopy(doc)
+    # The decoded document is private to this call, so patches can be applied in place
+    for ops in reversed(chain):
+        doc = apply_patch(doc, ops, in_place=True)
+    return doc
+
+def record_snapshot(db: Session, scenario_id: int, action: str, document: Dict[str, Any]) -> models.ScenarioHistory:
+    """Adds a history entry, as a keyframe every HISTORY_KEYFRAME_INTERVAL entries and a delta otherwise."""
+    previous = (db.query(models.ScenarioHistory).filter(models.ScenarioHistory.scenario_id == scenario_id)
+                .order_by(models.ScenarioHistory.id.desc()).first())
+    entry = models.ScenarioHistory(scenario_id=scenario_id, action_description=action, timestamp=date.today())
+    depth = (previous.chain_depth or 0) + 1 if previous is not None else 0
+    if previous is None or depth >= HISTORY_KEYFRAME_INTERVAL:
+        entry.is_keyframe, entry.chain_depth, entry.payload = True, 0, _encode(document)
+    else:
+        entry.is_keyframe, entry.chain_depth, entry.base_id = False, depth, previous.id
+        entry.payload = _encode(json_diff(get_history_snapshot(db, previous), document))
+    db.add(entry)
+    return entry
+
+def compact_history(db: Session, scenario_id: int, max_entries: int = HISTORY_MAX_ENTRIES) -> int:
+    """
+    Retention policy: keeps the newest `max_entries` entries of a scenario. The oldest survivor is rewritten
+    as a keyframe (if it isn't one) before older entries are deleted. Returns the number of entries removed.
+    """
+    ids = [row.id for row in db.query(models.ScenarioHistory.id).filter(models.ScenarioHistory.scenario_id == scenario_id)
+           .order_by(models.ScenarioHistory.id.desc())]
+    if len(ids) <= max_entries: return 0
+    cutoff = ids[max_entries - 1]
+    oldest_kept = db.get(models.ScenarioHistory, cutoff)
+    if not oldest_kept.is_keyframe:
+        doc = get_history_snapshot(db, oldest_kept)
+        oldest_kept.payload, oldest_kept.is_keyframe, oldest_kept.base_id, oldest_kept.chain_depth = _encode(doc), True, None, 0
+        oldest_kept.snapshot_data = None
+        db.flush()
+    removed = (db.query(models.ScenarioHistory)
+               .filter(models.ScenarioHistory.scenario_id == scenario_id, models.ScenarioHistory.id < cutoff)
+               .delete(synchronize_session=False))
+    return removed
+
+# --- Capture ---
+
+def scenario_document(db: Session, scenario_id: int) -> Optional[Dict[str, Any]]:
+    """The scenario as stored in history (schemas.Scenario in JSON mode), or None if it doesn't exist."""
+    scenario = get_scenario_graph(db, scenario_id)
+    if not scenario: return None
+    return schemas.Scenario.model_validate(scenario).model_dump(mode='json')
+
+def _write_entry(db: Session, scenario_id: int, action: str, document: Dict[str, Any]):
+    record_snapshot(db, scenario_id, action, document)
+    db.flush()
+    compact_history(db, scenario_id)
+    db.commit()
+
+class _Burst:
+    __slots__ = ("actions", "document", "deadline")
+
+    def __init__(self, action: str, document: Dict[str, Any], deadline: float):
+        self.actions, self.document, self.deadline = [action], document, deadline
+
+    @property
+    def label(self) -> str:
+        return self.actions[0] if len(self.actions) == 1 else f"{self.actions[0]} (+{len(self.actions) - 1} more)"
+
+class HistoryWriter:
+    """
+    Records "state before this change" history entries off the request path.
+
+    Edits to the same scenario arriving within `window` seconds of each other coalesce into one entry
+    holding the state before the first of them. After writing an entry, the writer keeps the scenario's
+    post-burst document (the "tip") so the next burst's starting state needs no serialization on the
+    request path; the tip is only trusted while its version matches Scenario.version.
+    A window <= 0 writes every entry synchronously (used by the tests).
+    """
+
+    def __init__(self, window: float, session_factory=None, max_tips: int = 32):
+        self.window = window
+        self.max_tips = max_tips
+        self._session_factory = session_factory
+        self._pending: Dict[int, _Burst] = {}
+        self._flushing: Set[int] = set()
+        self._tips: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+    def capture(self, db: Session, scenario_id: int, action: str):
+        """Call before mutating a scenario."""
+        if self.window <= 0:
+            document = scenario_document(db, scenario_id)
+            if document is not None: _write_entry(db, scenario_id, action, document)
+            return
+        with self._cond:
+            if self._join_burst(scenario_id, action): return
+
+        # Starting a new burst: the tip is the current state unless something changed it since
+        version = db.execute(select(models.Scenario.version).where(models.Scenario.id == scenario_id)).scalar()
+        if version is None: return
+        with self._cond:
+            tip = self._tips.get(scenario_id)
+        document = tip if tip is not None and tip.get("version") == version else scenario_document(db, scenario_id)
+        if document is None: return
+
+        with self._cond:
+            if self._join_burst(scenario_id, action): return
+            self._pending[scenario_id] = _Burst(action, document, time.monotonic() + self.window)
+            self._ensure_thread()
+            self._cond.notify_all()
+
+    def _join_burst(self, scenario_id: int, action: str) -> bool:
+        # Caller holds self._cond. Wait out an in-progress write so the new burst sees its tip
+        while scenario_id in self._flushing: self._cond.wait()
+        burst = self._pending.get(scenario_id)
+        if burst is None: return False
+        burst.actions.append(action)
+        burst.deadline = time.monotonic() + self.window
+        return True
+
+    def flush_all(self):
+        """Writes every pending burst now (shutdown, tests)."""
+        with self._cond:
+            due = list(self._pending.items())
+            self._pending.clear()
+            self._flushing.update(scenario_id for scenario_id, _ in due)
+        self._write(due)
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="history-writer", daemon=True)
+            self._thread.start()
+            atexit.register(self.flush_all)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending: self._cond.wait()
+                now = time.monotonic()
+                due = [(sid, b) for sid, b in self._pending.items() if b.deadline <= now]
+                if not due:
+                    self._cond.wait(min(b.deadline for b in self._pending.values()) - now)
+                    continue
+                for scenario_id, _ in due:
+                    del self._pending[scenario_id]
+                    self._flushing.add(scenario_id)
+            self._write(due)
+
+    def _write(self, bursts):
+        if not bursts: return
+        factory = self._session_factory
+        if factory is None:
+            from ..database import SessionLocal as factory
+        db = factory()
+        try:
+            for scenario_id, burst in bursts:
+                try:
+                    _write_entry(db, scenario_id, burst.label, burst.document)
+                    tip = scenario_document(db, scenario_id)
+                    with self._cond:
+                        if tip is not None:
+                            self._tips[scenario_id] = tip
+                            self._tips.move_to_end(scenario_id)
+                            while len(self._tips) > self.max_tips: self._tips.popitem(last=False)
+                except Exception:
+                    db.rollback()
+                    logger.exception("Failed to write history for scenario %s", scenario_id)
+        finally:
+            db.close()
+            with self._cond:
+                self._flushing.difference_update(scenario_id for scenario_id, _ in bursts)
+                self._cond.notify_all()
+
+HISTORY_WRITER = HistoryWriter(window=float(os.getenv("HISTORY_COALESCE_SECONDS", "2.0")))
+
+def create_scenario_snapshot(db: Session, scenario_id: int, action: str):
+    """Records the scenario's current state as the "before" of `action` (coalesced and written in the background)."""
+    HISTORY_WRITER.capture(db, scenario_id, action)
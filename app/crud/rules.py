@@ -1,6 +1,6 @@
 from sqlalchemy.orm import Session
 from .. import models, schemas
-from .scenarios import create_scenario_snapshot
+from .history import create_scenario_snapshot
 
 def get_rule(db: Session, rule_id: int):
     return db.query(models.AutomationRule).filter(models.AutomationRule.id == rule_id).first()
@@ -52,6 +52,8 @@ def reorder_rules(db: Session, rule_ids: list[int]):
 
     for index, rule_id in enumerate(rule_ids):
         db.query(models.AutomationRule).filter(models.AutomationRule.id == rule_id).update({"priority": index + 1})
+    # Bulk updates bypass the flush hook that versions scenarios
+    if first_rule: models.bump_scenario_version(db, [first_rule.scenario_id])
     
     db.commit()
     return True
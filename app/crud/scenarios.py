@@ -1,7 +1,9 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.orm import Session, selectinload, load_only
 from typing import Dict, Any, List, Optional
 from datetime import datetime, date
 from .. import models, schemas, enums
+from ..engine.overrides import OVERRIDE_TYPES, OverrideOverlay
 
 def _safe_parse_date(d):
     if d is None: return None
@@ -17,9 +19,72 @@ def _safe_parse_date(d):
 def get_scenario(db: Session, scenario_id: int):
     return db.query(models.Scenario).filter(models.Scenario.id == scenario_id).first()
 
+# Full scenario graph as serialized by schemas.Scenario and walked by the engine.
+# selectinload issues one query per relationship, independent of how many children there are.
+SCENARIO_GRAPH_OPTIONS = (
+    selectinload(models.Scenario.owners).selectinload(models.Owner.income_sources),
+    selectinload(models.Scenario.owners).selectinload(models.Owner.accounts),
+    selectinload(models.Scenario.accounts).selectinload(models.Account.owners),
+    selectinload(models.Scenario.costs),
+    selectinload(models.Scenario.transfers),
+    selectinload(models.Scenario.financial_events),
+    selectinload(models.Scenario.automation_rules),
+    selectinload(models.Scenario.tax_limits),
+    selectinload(models.Scenario.decumulation_strategies),
+    selectinload(models.Scenario.chart_annotations),
+)
+
+def get_scenario_graph(db: Session, scenario_id: int):
+    """Loads a scenario with every child collection eagerly (for serialization, projection and copying)."""
+    return db.query(models.Scenario).options(*SCENARIO_GRAPH_OPTIONS).filter(models.Scenario.id == scenario_id).first()
+
 def get_scenarios(db: Session, skip: int = 0, limit: int = 100):
     return db.query(models.Scenario).offset(skip).limit(limit).all()
 
+# Counted per scenario by get_scenario_summaries: key -> (model, scenario_id column)
+SUMMARY_COUNTS = {
+    "owners": (models.Owner, models.Owner.scenario_id),
+    "accounts": (models.Account, models.Account.scenario_id),
+    "income_sources": (models.IncomeSource, models.Owner.scenario_id),
+    "costs": (models.Cost, models.Cost.scenario_id),
+    "transfers": (models.Transfer, models.Transfer.scenario_id),
+    "financial_events": (models.FinancialEvent, models.FinancialEvent.scenario_id),
+    "automation_rules": (models.AutomationRule, models.AutomationRule.scenario_id),
+    "tax_limits": (models.TaxLimit, models.TaxLimit.scenario_id),
+    "chart_annotations": (models.ChartAnnotation, models.ChartAnnotation.scenario_id),
+    "decumulation_strategies": (models.DecumulationStrategy, models.DecumulationStrategy.scenario_id),
+}
+
+# Stored headline metrics reported by get_scenario_summaries
+SUMMARY_METRICS = ("current_net_worth", "final_net_worth", "final_liquid_assets", "debt_free_date", "insolvency_date", "tax_paid")
+
+def get_scenario_summaries(db: Session, skip: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
+    """
+    Header fields, entity counts and stored metrics (models.ScenarioMetrics) of each scenario, in one query.
+    Metrics computed at an older version are still returned, flagged metrics_stale.
+    """
+    counts = []
+    for key, (model_cls, scenario_col) in SUMMARY_COUNTS.items():
+        subquery = select(func.count(model_cls.id)).where(scenario_col == models.Scenario.id)
+        if model_cls is models.IncomeSource:
+            subquery = subquery.join(models.Owner, models.Owner.id == models.IncomeSource.owner_id)
+        counts.append(subquery.scalar_subquery().label(key))
+    header = [models.Scenario.id, models.Scenario.name, models.Scenario.description, models.Scenario.notes,
+              models.Scenario.start_date, models.Scenario.gbp_to_usd_rate, models.Scenario.version]
+    stored = [getattr(models.ScenarioMetrics, key) for key in SUMMARY_METRICS]
+    stmt = (select(*header, *counts, *stored, models.ScenarioMetrics.months.label("metrics_months"),
+                   models.ScenarioMetrics.version.label("metrics_version"))
+            .outerjoin(models.ScenarioMetrics, models.ScenarioMetrics.scenario_id == models.Scenario.id)
+            .order_by(models.Scenario.id).offset(skip).limit(limit))
+    summaries = []
+    for row in db.execute(stmt).mappings():
+        summary = {col.key: row[col.key] for col in header + stored}
+        summary["entity_counts"] = {key: row[key] for key in SUMMARY_COUNTS}
+        summary["metrics_months"] = row["metrics_months"]
+        summary["metrics_stale"] = row["metrics_version"] != row["version"]
+        summaries.append(summary)
+    return summaries
+
 def create_scenario(db: Session, scenario: schemas.ScenarioCreate):
     db_scenario = models.Scenario(**scenario.model_dump())
     db.add(db_scenario)
@@ -58,6 +123,7 @@ def delete_scenario(db: Session, scenario_id: int):
     db.query(models.ChartAnnotation).filter(models.ChartAnnotation.scenario_id == scenario_id).delete()
     db.query(models.DecumulationStrategy).filter(models.DecumulationStrategy.scenario_id == scenario_id).delete()
     db.query(models.ScenarioHistory).filter(models.ScenarioHistory.scenario_id == scenario_id).delete()
+    db.query(models.ScenarioMetrics).filter(models.ScenarioMetrics.scenario_id == scenario_id).delete()
     
     # 3. Delete Income Sources (linked to Owners)
     db.query(models.IncomeSource).filter(models.IncomeSource.owner_id.in_(
@@ -71,16 +137,35 @@ def delete_scenario(db: Session, scenario_id: int):
     db.commit()
     return db_scenario
 
+def _bulk_insert(db: Session, model_cls, rows: List[Dict[str, Any]], returning: bool = False) -> List[int]:
+    """executemany-style INSERT; with returning=True gives the new ids in the same order as rows."""
+    if not rows: return []
+    if not returning:
+        db.execute(insert(model_cls), rows)
+        return []
+    stmt = insert(model_cls).returning(model_cls.id, sort_by_parameter_order=True)
+    return list(db.execute(stmt, rows).scalars())
+
 def duplicate_scenario(db: Session, scenario_id: int, new_name: str = None, overrides: List[schemas.SimulationOverrideBase] = None):
-    original = get_scenario(db, scenario_id)
+    """
+    Copies a scenario and its whole graph (applying any simulation overrides) in one transaction.
+    Each table is written with a single bulk INSERT; new ids are remapped from RETURNING.
+    Raises ValueError, before writing anything, if an override value doesn't fit its column.
+    """
+    original = get_scenario_graph(db, scenario_id)
     if not original: return None
 
-    def get_overridden_val(entity_type, entity_id, field_name, default_val):
-        if not overrides: return default_val
-        for o in overrides:
-            if o.type == entity_type and o.id == entity_id and o.field == field_name:
-                return o.value
-        return default_val
+    overlay = _override_overlay(overrides)
+    key_columns = {'id', 'scenario_id', 'owner_id', 'account_id', 'salary_sacrifice_account_id', 'from_account_id',
+                   'to_account_id', 'source_account_id', 'target_account_id', 'payment_from_account_id', 'rsu_target_account_id'}
+
+    def copy_row(obj, kind: str = None, **links) -> Dict[str, Any]:
+        data = {c.name: getattr(obj, c.name) for c in obj.__table__.columns if c.name not in key_columns}
+        if kind:
+            for field, value in overlay.fields_for(kind, obj.id).items():
+                if field in data: data[field] = value
+        data.update(links)
+        return data
 
     final_name = new_name if new_name else f"Copy of {original.name}"
 
@@ -89,86 +174,114 @@ def duplicate_scenario(db: Session, scenario_id: int, new_name: str = None, over
         start_date=original.start_date, gbp_to_usd_rate=original.gbp_to_usd_rate, notes=original.notes
     )
     db.add(new_scenario); db.flush()
+    new_id = new_scenario.id
 
-    for lim in original.tax_limits:
-        val = get_overridden_val('tax_limit', lim.id, 'amount', lim.amount)
-        db.add(models.TaxLimit(scenario_id=new_scenario.id, name=lim.name, amount=val, wrappers=lim.wrappers, account_types=lim.account_types, start_date=lim.start_date, end_date=lim.end_date, frequency=lim.frequency))
-    
-    for strat in original.decumulation_strategies:
-        db.add(models.DecumulationStrategy(scenario_id=new_scenario.id, name=strat.name, strategy_type=strat.strategy_type, start_date=strat.start_date, end_date=strat.end_date, enabled=strat.enabled))
-
-    owner_map = {} 
-    account_map = {}
+    # Owners and accounts first: everything else links to them
+    new_owner_ids = _bulk_insert(db, models.Owner, [copy_row(o, scenario_id=new_id) for o in original.owners], returning=True)
+    owner_map = dict(zip((o.id for o in original.owners), new_owner_ids))
 
-    for owner in original.owners:
-        new_owner = models.Owner(name=owner.name, scenario_id=new_scenario.id, notes=owner.notes, birth_date=owner.birth_date, retirement_age=owner.retirement_age)
-        db.add(new_owner); db.flush(); owner_map[owner.id] = new_owner
+    new_account_ids = _bulk_insert(db, models.Account, [copy_row(a, 'account', scenario_id=new_id) for a in original.accounts], returning=True)
+    account_map = dict(zip((a.id for a in original.accounts), new_account_ids))
 
+    # Self-references between accounts, now that every new id is known
+    account_links = []
     for acc in original.accounts:
-        data = {c.name: getattr(acc, c.name) for c in acc.__table__.columns if c.name not in ['id', 'scenario_id', 'payment_from_account_id', 'rsu_target_account_id']}
-        for field in ['starting_balance', 'interest_rate', 'original_loan_amount', 'fixed_interest_rate', 'min_balance', 'book_cost']:
-             if field in data: data[field] = get_overridden_val('account', acc.id, field, data[field])
-        new_acc = models.Account(scenario_id=new_scenario.id, **data)
-        new_acc.owners = [owner_map[o.id] for o in acc.owners if o.id in owner_map]
-        db.add(new_acc); db.flush(); account_map[acc.id] = new_acc
-
-    for old_acc in original.accounts:
-        if old_acc.payment_from_account_id and old_acc.payment_from_account_id in account_map:
-            account_map[old_acc.id].payment_from_account_id = account_map[old_acc.payment_from_account_id].id
-        if old_acc.rsu_target_account_id and old_acc.rsu_target_account_id in account_map:
-            account_map[old_acc.id].rsu_target_account_id = account_map[old_acc.rsu_target_account_id].id
-        
-    for owner in original.owners:
-        for inc in owner.income_sources:
-            data = {c.name: getattr(inc, c.name) for c in inc.__table__.columns if c.name not in ['id', 'owner_id', 'account_id', 'salary_sacrifice_account_id']}
-            for field in ['net_value', 'salary_sacrifice_value', 'employer_pension_contribution', 'taxable_benefit_value']:
-                if field in data: data[field] = get_overridden_val('income', inc.id, field, data[field])
-            if inc.account_id in account_map:
-                new_inc = models.IncomeSource(owner_id=owner_map[owner.id].id, account_id=account_map[inc.account_id].id, **data)
-                if inc.salary_sacrifice_account_id and inc.salary_sacrifice_account_id in account_map:
-                    new_inc.salary_sacrifice_account_id = account_map[inc.salary_sacrifice_account_id].id
-                db.add(new_inc)
-
-    for cost in original.costs:
-        data = {c.name: getattr(cost, c.name) for c in cost.__table__.columns if c.name not in ['id', 'scenario_id', 'account_id']}
-        if 'value' in data: data['value'] = get_overridden_val('cost', cost.id, 'value', data['value'])
-        if cost.account_id in account_map: db.add(models.Cost(scenario_id=new_scenario.id, account_id=account_map[cost.account_id].id, **data))
-
-    for event in original.financial_events:
-        data = {c.name: getattr(event, c.name) for c in event.__table__.columns if c.name not in ['id', 'scenario_id', 'from_account_id', 'to_account_id']}
-        if 'value' in data: data['value'] = get_overridden_val('event', event.id, 'value', data['value'])
-        new_event = models.FinancialEvent(scenario_id=new_scenario.id, **data)
-        if event.from_account_id in account_map: new_event.from_account_id = account_map[event.from_account_id].id
-        if event.to_account_id in account_map: new_event.to_account_id = account_map[event.to_account_id].id
-        db.add(new_event)
-
-    for trans in original.transfers:
-        data = {c.name: getattr(trans, c.name) for c in trans.__table__.columns if c.name not in ['id', 'scenario_id', 'from_account_id', 'to_account_id']}
-        if 'value' in data: data['value'] = get_overridden_val('transfer', trans.id, 'value', data['value'])
-        if trans.from_account_id in account_map and trans.to_account_id in account_map:
-            db.add(models.Transfer(scenario_id=new_scenario.id, from_account_id=account_map[trans.from_account_id].id, to_account_id=account_map[trans.to_account_id].id, **data))
-
-    for rule in original.automation_rules:
-        r_data = {c.name: getattr(rule, c.name) for c in rule.__table__.columns if c.name not in ['id', 'scenario_id', 'source_account_id', 'target_account_id']}
-        for field in ['trigger_value', 'transfer_value', 'transfer_cap']:
-             if field in r_data: r_data[field] = get_overridden_val('rule', rule.id, field, r_data[field])
-        new_rule = models.AutomationRule(scenario_id=new_scenario.id, **r_data)
-        if rule.source_account_id in account_map: new_rule.source_account_id = account_map[rule.source_account_id].id
-        if rule.target_account_id in account_map: new_rule.target_account_id = account_map[rule.target_account_id].id
-        db.add(new_rule)
-    
-    for ann in original.chart_annotations:
-        db.add(models.ChartAnnotation(scenario_id=new_scenario.id, date=ann.date, label=ann.label, annotation_type=ann.annotation_type))
+        link = {}
+        if acc.payment_from_account_id in account_map: link['payment_from_account_id'] = account_map[acc.payment_from_account_id]
+        if acc.rsu_target_account_id in account_map: link['rsu_target_account_id'] = account_map[acc.rsu_target_account_id]
+        if link:
+            link['id'] = account_map[acc.id]
+            account_links.append(link)
+    if account_links: db.execute(update(models.Account), account_links)
+
+    _bulk_insert(db, models.AccountOwner, [
+        {'account_id': account_map[acc.id], 'owner_id': owner_map[o.id]}
+        for acc in original.accounts for o in acc.owners if o.id in owner_map
+    ])
+
+    _bulk_insert(db, models.IncomeSource, [
+        copy_row(inc, 'income', owner_id=owner_map[owner.id], account_id=account_map[inc.account_id],
+                 salary_sacrifice_account_id=account_map.get(inc.salary_sacrifice_account_id))
+        for owner in original.owners for inc in owner.income_sources if inc.account_id in account_map
+    ])
+
+    _bulk_insert(db, models.Cost, [
+        copy_row(c, 'cost', scenario_id=new_id, account_id=account_map[c.account_id])
+        for c in original.costs if c.account_id in account_map
+    ])
+
+    _bulk_insert(db, models.FinancialEvent, [
+        copy_row(e, 'event', scenario_id=new_id, from_account_id=account_map.get(e.from_account_id), to_account_id=account_map.get(e.to_account_id))
+        for e in original.financial_events
+    ])
+
+    _bulk_insert(db, models.Transfer, [
+        copy_row(t, 'transfer', scenario_id=new_id, from_account_id=account_map[t.from_account_id], to_account_id=account_map[t.to_account_id])
+        for t in original.transfers if t.from_account_id in account_map and t.to_account_id in account_map
+    ])
+
+    _bulk_insert(db, models.AutomationRule, [
+        copy_row(r, 'rule', scenario_id=new_id, source_account_id=account_map.get(r.source_account_id), target_account_id=account_map.get(r.target_account_id))
+        for r in original.automation_rules
+    ])
+
+    _bulk_insert(db, models.TaxLimit, [copy_row(lim, 'tax_limit', scenario_id=new_id) for lim in original.tax_limits])
+    _bulk_insert(db, models.DecumulationStrategy, [copy_row(s, 'strategy', scenario_id=new_id) for s in original.decumulation_strategies])
+    _bulk_insert(db, models.ChartAnnotation, [copy_row(a, scenario_id=new_id) for a in original.chart_annotations])
 
     db.commit()
-    db.refresh(new_scenario)
-    return new_scenario
+    return get_scenario_graph(db, new_id)
 
-    # RE-FETCH AGAIN to ensure final state is attached
-    scenario = get_scenario(db, scenario_id)
-    return scenario
+from sqlalchemy import Boolean, Date, DateTime, Float, Integer, String
 
-from sqlalchemy import Date, DateTime
+# Entity kinds of simulation overrides (engine.overrides.OVERRIDE_TYPES) and the tables they live in
+OVERRIDE_MODELS = {
+    "account": models.Account, "income": models.IncomeSource, "cost": models.Cost, "transfer": models.Transfer,
+    "event": models.FinancialEvent, "tax_limit": models.TaxLimit, "rule": models.AutomationRule,
+    "strategy": models.DecumulationStrategy,
+}
+
+def _coerce_override(kind: str, column, value):
+    """
+    An override value converted to the type `column` stores, so it can go straight into a bulk INSERT.
+    An empty string clears a non-text column (what the UI sends when a pinned input is emptied).
+    """
+    invalid = ValueError(f"Invalid value {value!r} for {kind} field '{column.name}'")
+    if value == "" and not isinstance(column.type, String): value = None
+    if value is None:
+        if not column.nullable: raise invalid
+        return None
+    col_type = column.type
+    if isinstance(col_type, (Date, DateTime)):
+        parsed = _safe_parse_date(value) if isinstance(value, (str, date)) else None
+        if parsed is None: raise invalid
+        return parsed
+    if isinstance(col_type, Boolean):
+        if isinstance(value, bool): return value
+        if isinstance(value, str) and value.lower() in ("true", "false"): return value.lower() == "true"
+        raise invalid
+    try:
+        if isinstance(col_type, Integer):
+            if isinstance(value, float) and not value.is_integer(): raise invalid
+            return int(value)
+        if isinstance(col_type, Float): return float(value)
+    except (TypeError, ValueError):
+        raise invalid
+    if isinstance(col_type, String) and not isinstance(value, str): raise invalid
+    return value
+
+def _override_overlay(overrides) -> OverrideOverlay:
+    """Fork overrides indexed like OverrideOverlay.from_overrides, with values coerced to their columns' types."""
+    entries: Dict[tuple, Dict[str, Any]] = {}
+    for override in overrides or []:
+        kind = OVERRIDE_TYPES.get(override.type)
+        model_cls = OVERRIDE_MODELS.get(kind)
+        if model_cls is None: continue
+        column = model_cls.__table__.columns.get(override.field)
+        # Fields that aren't columns were never copied
+        if column is None: continue
+        entries.setdefault((kind, override.id), {})[override.field] = _coerce_override(kind, column, override.value)
+    return OverrideOverlay(entries)
 
 def _filter_data(model_cls, data: Dict[str, Any]) -> Dict[str, Any]:
     """
@@ -199,10 +312,11 @@ def _filter_data(model_cls, data: Dict[str, Any]) -> Dict[str, Any]:
 
 def import_scenario_data(db: Session, scenario_id: int, data: schemas.ScenarioImport):
     """
-    Full-fidelity import of a scenario structure.
-    Recursively creates Owners, Accounts, Rules, Costs, etc.
-    Dependency Order: Owners -> Accounts -> Links -> [Income, Costs, Rules, etc.]
+    Full-fidelity import of a scenario structure, replacing its current contents in one transaction.
+    Dependency Order: Owners -> Accounts -> Links -> [Income, Costs, Rules, etc.], each written in bulk.
+    Accepts a validated ScenarioImport or a raw dict (e.g. a history snapshot).
     """
+    if isinstance(data, dict): data = schemas.validate_scenario_import(data)
     # 1. Fetch Scenario (initially)
     scenario = get_scenario(db, scenario_id)
     if not scenario: return None
@@ -234,209 +348,106 @@ def import_scenario_data(db: Session, scenario_id: int, data: schemas.ScenarioIm
             db.query(models.Owner.id).filter(models.Owner.scenario_id == scenario_id)
         )).delete(synchronize_session=False)
 
-        # 2d. Delete Owners and Accounts
-        accounts = db.query(models.Account).filter(models.Account.scenario_id == scenario_id).all()
-        for acc in accounts: db.delete(acc)
-        
-        owners = db.query(models.Owner).filter(models.Owner.scenario_id == scenario_id).all()
-        for own in owners: db.delete(own)
+        # 2d. Delete Owners and Accounts (with their link rows)
+        account_ids = db.query(models.Account.id).filter(models.Account.scenario_id == scenario_id)
+        db.query(models.AccountOwner).filter(models.AccountOwner.account_id.in_(account_ids)).delete(synchronize_session=False)
+        db.query(models.Account).filter(models.Account.scenario_id == scenario_id).delete(synchronize_session=False)
+        db.query(models.Owner).filter(models.Owner.scenario_id == scenario_id).delete(synchronize_session=False)
         
         db.flush()
         
-        # 3. Create Entities & Build Maps
-        owner_map = {} # old_id -> new_id
-        account_map = {} # old_id -> new_id
-        
-        # A. Owners (First pass - no income sources yet)
-        deferred_income_sources = [] # (new_owner_id, source_objects)
-
-        for owner_obj in data.owners:
-            od = owner_obj.model_dump()
-            old_id = od.pop("id", None)
-            
-            # Explicitly remove relation keys not in column list
-            # income_sources is in the Pydantic model (List) but not a column
-            # accounts is not in the Pydantic model but might be in the dict if dumped?
-            # Pydantic dump includes everything defined in the model.
-            
-            # Save income sources for later
-            inc_srcs = od.pop("income_sources", [])
-            
-            # Filter (Removes extra fields if any leached through)
-            filtered_od = _filter_data(models.Owner, od)
-            
-            db_owner = models.Owner(scenario_id=scenario_id, **filtered_od)
-            db.add(db_owner); db.flush()
-            if old_id: owner_map[old_id] = db_owner.id
-            
-            if inc_srcs:
-                deferred_income_sources.append((db_owner.id, inc_srcs))
-
-        # B. Accounts
-        deferred_account_links = [] # (db_acc, old_payment_id, old_rsu_id)
-        deferred_owner_links = [] # (db_acc, list_of_old_owner_ids)
+        # 3. Create Entities, one bulk INSERT per table; old -> new ids are resolved in memory
+        def rows_for(items, model_cls, exclude, **links):
+            return [dict(_filter_data(model_cls, item.model_dump(exclude=exclude)), **links) for item in items]
 
-        for acc_obj in data.accounts:
-            ad = acc_obj.model_dump()
-            old_id = ad.pop("id", None)
-            
-            # Extract special fields
-            old_owners = ad.pop("owners", []) # list of ID or object? Pydantic says List[Any]
-            old_payment_id = ad.pop("payment_from_account_id", None)
-            old_rsu_id = ad.pop("rsu_target_account_id", None)
-            
-            # Filter
-            filtered_ad = _filter_data(models.Account, ad)
+        # A. Owners
+        new_owner_ids = _bulk_insert(db, models.Owner, rows_for(data.owners, models.Owner, {"id", "income_sources"}, scenario_id=scenario_id), returning=True)
+        owner_map = {o.id: new_id for o, new_id in zip(data.owners, new_owner_ids) if o.id} # old_id -> new_id
 
-            db_acc = models.Account(scenario_id=scenario_id, **filtered_ad)
-            db.add(db_acc); db.flush()
-            if old_id: account_map[old_id] = db_acc.id
-
-            if old_payment_id or old_rsu_id:
-                deferred_account_links.append((db_acc, old_payment_id, old_rsu_id))
-            
-            if old_owners:
-                o_ids = []
-                for item in old_owners:
-                    if isinstance(item, dict): o_ids.append(item.get("id"))
-                    elif isinstance(item, int) or isinstance(item, str): o_ids.append(item)
-                    # Else? ignore
-                deferred_owner_links.append((db_acc, o_ids))
+        # B. Accounts (self-references and owner links resolved once all ids exist)
+        account_exclude = {"id", "owners", "payment_from_account_id", "rsu_target_account_id"}
+        new_account_ids = _bulk_insert(db, models.Account, rows_for(data.accounts, models.Account, account_exclude, scenario_id=scenario_id), returning=True)
+        account_map = {a.id: new_id for a, new_id in zip(data.accounts, new_account_ids) if a.id} # old_id -> new_id
 
         # C. Link Accounts (Owners & Self-refs)
-        for db_acc, o_ids in deferred_owner_links:
-            for old_oid in o_ids:
-                if old_oid in owner_map:
-                    owner = db.get(models.Owner, owner_map[old_oid])
-                    if owner: db_acc.owners.append(owner)
-        
-        for db_acc, pay_id, rsu_id in deferred_account_links:
-            if pay_id and pay_id in account_map: db_acc.payment_from_account_id = account_map[pay_id]
-            if rsu_id and rsu_id in account_map: db_acc.rsu_target_account_id = account_map[rsu_id]
+        account_links, owner_links = [], set()
+        for acc_obj, new_id in zip(data.accounts, new_account_ids):
+            link = {}
+            if acc_obj.payment_from_account_id in account_map: link["payment_from_account_id"] = account_map[acc_obj.payment_from_account_id]
+            if acc_obj.rsu_target_account_id in account_map: link["rsu_target_account_id"] = account_map[acc_obj.rsu_target_account_id]
+            if link: account_links.append(dict(link, id=new_id))
+
+            for item in acc_obj.owners or []:
+                # Owners may be given as objects or bare ids
+                old_oid = item.get("id") if isinstance(item, dict) else item
+                if old_oid in owner_map: owner_links.add((new_id, owner_map[old_oid]))
+        if account_links: db.execute(update(models.Account), account_links)
+        _bulk_insert(db, models.AccountOwner, [{"account_id": a, "owner_id": o} for a, o in sorted(owner_links)])
 
         # D. Income Sources (Now we have owners and accounts)
-        for new_owner_id, sources in deferred_income_sources:
-            # sources is a list of DICTS because it came from model_dump() of parent Owner
-            for sd in sources:
-                # no need to model_dump again if it's already a dict from parent dump
-                # BUT wait, Pydantic model_dump is recursive. So yes, sources are dicts.
-                
-                # Check if sources has keys or if it was objects.
-                # data.owners -> List[ImportOwner].
-                # owner_obj.model_dump() -> dict with "income_sources": [dict, dict]
-                # So sd is a dict.
-                
-                # sd might have ID we don't need for creation
-                if "id" in sd: del sd["id"]
-                # owner_id is not in Pydantic model ImportIncomeSource so likely not in sd
-                
-                old_acc_id = sd.pop("account_id", None)
-                old_sac_id = sd.pop("salary_sacrifice_account_id", None)
-                
-                # Filter
-                filtered_sd = _filter_data(models.IncomeSource, sd)
-
-                db_inc = models.IncomeSource(owner_id=new_owner_id, **filtered_sd)
-                if old_acc_id and old_acc_id in account_map: db_inc.account_id = account_map[old_acc_id]
-                if old_sac_id and old_sac_id in account_map: db_inc.salary_sacrifice_account_id = account_map[old_sac_id]
-                
-                db.add(db_inc)
+        income_exclude = {"account_id", "salary_sacrifice_account_id"}
+        _bulk_insert(db, models.IncomeSource, [
+            dict(_filter_data(models.IncomeSource, inc.model_dump(exclude=income_exclude)), owner_id=new_owner_id,
+                 account_id=account_map.get(inc.account_id), salary_sacrifice_account_id=account_map.get(inc.salary_sacrifice_account_id))
+            for owner_obj, new_owner_id in zip(data.owners, new_owner_ids) for inc in owner_obj.income_sources
+        ])
 
         # E. Costs
-        for item in data.costs:
-            d = item.model_dump()
-            old_acc_id = d.pop("account_id", None)
-            
-            # Filter
-            filtered_d = _filter_data(models.Cost, d)
-
-            obj = models.Cost(scenario_id=scenario_id, **filtered_d)
-            if old_acc_id and old_acc_id in account_map: obj.account_id = account_map[old_acc_id]
-            db.add(obj)
+        _bulk_insert(db, models.Cost, [
+            dict(_filter_data(models.Cost, c.model_dump(exclude={"account_id"})), scenario_id=scenario_id, account_id=account_map.get(c.account_id))
+            for c in data.costs
+        ])
 
         # F. Financial Events
-        for item in data.financial_events:
-            d = item.model_dump()
-            old_from = d.pop("from_account_id", None)
-            old_to = d.pop("to_account_id", None)
-            
-            # Filter
-            filtered_d = _filter_data(models.FinancialEvent, d)
-
-            obj = models.FinancialEvent(scenario_id=scenario_id, **filtered_d)
-            if old_from and old_from in account_map: obj.from_account_id = account_map[old_from]
-            if old_to and old_to in account_map: obj.to_account_id = account_map[old_to]
-            db.add(obj)
-
-        # G. Transfers
-        for item in data.transfers:
-            d = item.model_dump()
-            old_from = d.pop("from_account_id", None)
-            old_to = d.pop("to_account_id", None)
-            
-            # Filter
-            filtered_d = _filter_data(models.Transfer, d)
-
-            if old_from in account_map and old_to in account_map:
-                obj = models.Transfer(scenario_id=scenario_id, **filtered_d)
-                obj.from_account_id = account_map[old_from]
-                obj.to_account_id = account_map[old_to]
-                db.add(obj)
+        _bulk_insert(db, models.FinancialEvent, [
+            dict(_filter_data(models.FinancialEvent, e.model_dump(exclude={"from_account_id", "to_account_id"})), scenario_id=scenario_id,
+                 from_account_id=account_map.get(e.from_account_id), to_account_id=account_map.get(e.to_account_id))
+            for e in data.financial_events
+        ])
+
+        # G. Transfers (both ends must resolve)
+        _bulk_insert(db, models.Transfer, [
+            dict(_filter_data(models.Transfer, t.model_dump(exclude={"from_account_id", "to_account_id"})), scenario_id=scenario_id,
+                 from_account_id=account_map[t.from_account_id], to_account_id=account_map[t.to_account_id])
+            for t in data.transfers if t.from_account_id in account_map and t.to_account_id in account_map
+        ])
 
         # H. Automation Rules
-        for item in data.automation_rules:
-            d = item.model_dump()
-            old_src = d.pop("source_account_id", None)
-            old_tgt = d.pop("target_account_id", None)
-            
-            # Filter
-            filtered_d = _filter_data(models.AutomationRule, d)
-
-            obj = models.AutomationRule(scenario_id=scenario_id, **filtered_d)
-            if old_src and old_src in account_map: obj.source_account_id = account_map[old_src]
-            if old_tgt and old_tgt in account_map: obj.target_account_id = account_map[old_tgt]
-            db.add(obj)
-
-        # I. Tax Limits
-        for item in data.tax_limits:
-            d = item.model_dump()
-            # Filter
-            filtered_d = _filter_data(models.TaxLimit, d)
-            db.add(models.TaxLimit(scenario_id=scenario_id, **filtered_d))
-
-        # J. Decumulation Strategies
-        for item in data.decumulation_strategies:
-            d = item.model_dump()
-            # Filter
-            filtered_d = _filter_data(models.DecumulationStrategy, d)
-            db.add(models.DecumulationStrategy(scenario_id=scenario_id, **filtered_d))
-
-        # K. Chart Annotations
-        for item in data.chart_annotations:
-            d = item.model_dump()
-            # Filter
-            filtered_d = _filter_data(models.ChartAnnotation, d)
-            db.add(models.ChartAnnotation(scenario_id=scenario_id, **filtered_d))
-
+        _bulk_insert(db, models.AutomationRule, [
+            dict(_filter_data(models.AutomationRule, r.model_dump(exclude={"source_account_id", "target_account_id"})), scenario_id=scenario_id,
+                 source_account_id=account_map.get(r.source_account_id), target_account_id=account_map.get(r.target_account_id))
+            for r in data.automation_rules
+        ])
+
+        # I-K. Tax Limits, Decumulation Strategies, Chart Annotations
+        _bulk_insert(db, models.TaxLimit, rows_for(data.tax_limits, models.TaxLimit, None, scenario_id=scenario_id))
+        _bulk_insert(db, models.DecumulationStrategy, rows_for(data.decumulation_strategies, models.DecumulationStrategy, None, scenario_id=scenario_id))
+        _bulk_insert(db, models.ChartAnnotation, rows_for(data.chart_annotations, models.ChartAnnotation, None, scenario_id=scenario_id))
+
+        # Bulk writes bypass the flush hook that versions scenarios
+        models.bump_scenario_version(db, [scenario_id])
         db.commit()
     except Exception as e:
         db.rollback()
         raise e
         
     # RE-FETCH AGAIN to ensure final state is attached
-    scenario = get_scenario(db, scenario_id)
+    scenario = get_scenario_graph(db, scenario_id)
     return scenario
 
-def create_scenario_snapshot(db: Session, scenario_id: int, action: str):
-    scenario = get_scenario(db, scenario_id)
-    if not scenario: return
-    scenario_schema = schemas.Scenario.model_validate(scenario)
-    snapshot_data = scenario_schema.model_dump(mode='json')
-    db.add(models.ScenarioHistory(scenario_id=scenario_id, action_description=action, snapshot_data=snapshot_data, timestamp=date.today()))
-    db.commit()
-
-def get_scenario_history(db: Session, scenario_id: int):
-    return db.query(models.ScenarioHistory).filter(models.ScenarioHistory.scenario_id == scenario_id).order_by(models.ScenarioHistory.id.desc()).all()
+def get_scenario_history(db: Session, scenario_id: int, before_id: Optional[int] = None, limit: Optional[int] = None):
+    """
+    History entries newest first, without their (large) snapshot columns.
+    Keyset pagination: pass the last id of the previous page as before_id.
+    """
+    query = (db.query(models.ScenarioHistory)
+             .options(load_only(models.ScenarioHistory.id, models.ScenarioHistory.scenario_id,
+                                models.ScenarioHistory.timestamp, models.ScenarioHistory.action_description))
+             .filter(models.ScenarioHistory.scenario_id == scenario_id))
+    if before_id is not None: query = query.filter(models.ScenarioHistory.id < before_id)
+    query = query.order_by(models.ScenarioHistory.id.desc())
+    if limit is not None: query = query.limit(limit)
+    return query.all()
 
 def get_history_item(db: Session, history_id: int):
     return db.query(models.ScenarioHistory).filter(models.ScenarioHistory.id == history_id).first()
@@ -1,2 +1,9 @@
-from .core import run_projection, apply_simulation_overrides
+from .core import run_projection, rule_log_page
+from .probe import probe_projection, ProbeMonth, ProbeResult, PROBE_METRICS
+from .rule_logs import LOG_LEVELS
+from .overrides import OverrideOverlay
+from .view import ScenarioView, compile_scenario
 from .context import ProjectionContext
+from .reporting import render_projection_json
+from .cache import SCENARIO_CACHE, RULE_LOG_CACHE, get_compiled_scenario
+from .summary import METRICS_REFRESHER, refresh_scenario_metrics, summarize_projection
@@ -1,81 +1,77 @@
+from dataclasses import dataclass
+from datetime import date
+from functools import cached_property
+from typing import Callable, Dict, Iterable, List, Tuple
+
 from dateutil.relativedelta import relativedelta
-from app import enums, schemas
-from app.engine.context import ProjectionContext
 
-def detect_milestones(context: ProjectionContext):
-    
-    # 0. Retirement Party
-    # Iterate unique owners found on accounts.
-    seen_owners = set()
-    for acc in context.all_accounts:
-        if acc.owners:
-            for owner in acc.owners:
-                if owner.id in seen_owners: continue
-                seen_owners.add(owner.id)
-                
-                if owner.birth_date and owner.retirement_age:
-                    # Check age this month
-                    age_rel = relativedelta(context.month_start, owner.birth_date)
-                    # If exactly X years and 0 months
-                    if age_rel.years == owner.retirement_age and age_rel.months == 0:
-                        context.annotations.append(schemas.ProjectionAnnotation(date=context.month_start, label=f"Retirement: {owner.name}", type="milestone"))
+from app.engine.classes import AccountClass, AccountClasses
+
+@dataclass
+class ProjectionSeries:
+    """
+    What milestone detectors see once the projection has run. Month i (0-based) is the i-th projected month:
+    its opening native balances are balances[i], its closing ones balances[i + 1], and its snapshot
+    (GBP balances, liquid assets) is data_points[i + 1].
+    """
+    scenario: object
+    anchor: date
+    classes: AccountClasses
+    balances: List[Dict[int, int]]
+    data_points: List
+
+    @property
+    def months(self) -> int:
+        return len(self.balances) - 1
+
+    @cached_property
+    def liquid_and_liabilities(self) -> List[Tuple[int, int]]:
+        """(liquid assets, total debt) in GBP at the end of each month."""
+        return [(point.liquid_assets, self.classes.liability_total(point.account_balances)) for point in self.data_points[1:]]
+
+# A detector yields (month, label, type) in month order
+Milestone = Tuple[int, str, str]
+Detector = Callable[[ProjectionSeries], Iterable[Milestone]]
+
+def _month_offset(anchor: date, d: date) -> int:
+    return (d.year - anchor.year) * 12 + d.month - anchor.month
 
-    # 1. Debt Freedom - Individual
-    for acc in context.all_accounts:
-        if acc.account_type in [enums.AccountType.MORTGAGE, enums.AccountType.LOAN]:
-            curr = context.account_balances[acc.id]
-            prev = context.prev_balances.get(acc.id, acc.starting_balance)
-            
-            # Check for IMMEDIATE Crossover (Month 0)
-            if context.month_start == context.all_accounts[0].scenario.start_date: 
-                 if curr >= 0 and prev < 0: # Only if it was debt initially
-                     context.annotations.append(schemas.ProjectionAnnotation(date=context.month_start, label=f"Paid Off: {acc.name}", type="milestone"))
-            
-            # Normal Crossover
-            if prev < 0 and curr >= 0:
-                # Don't double count if it was immediate
-                if context.month_start != context.all_accounts[0].scenario.start_date:
-                    context.annotations.append(schemas.ProjectionAnnotation(date=context.month_start, label=f"Paid Off: {acc.name}", type="milestone"))
+def retirements(series: ProjectionSeries) -> Iterable[Milestone]:
+    for owner in series.scenario.owners:
+        if owner.birth_date and owner.retirement_age:
+            month = _month_offset(series.anchor, owner.birth_date + relativedelta(years=owner.retirement_age))
+            if 0 <= month < series.months:
+                yield month, f"{owner.name} Retires", "milestone"
 
-    # 2. RSU Cleared
-    for acc in context.all_accounts:
-        if acc.account_type == enums.AccountType.RSU_GRANT:
-            curr = context.account_balances[acc.id]
-            prev = context.prev_balances.get(acc.id, acc.starting_balance)
-            if prev > 0 and curr <= 0:
-                context.annotations.append(schemas.ProjectionAnnotation(date=context.month_start, label=f"Vested: {acc.name}", type="milestone"))
+def debts_cleared(series: ProjectionSeries) -> Iterable[Milestone]:
+    """A mortgage or loan going from owing to not owing (sign change of its native balance)."""
+    rows = series.balances
+    for acc in series.classes.accounts(AccountClass.DEBT):
+        previous = rows[0].get(acc.id, 0)
+        for month in range(series.months):
+            current = rows[month + 1].get(acc.id, 0)
+            if previous < 0 <= current:
+                yield month, f"{acc.name} Cleared", "success"
+            previous = current
 
-    # 3. Liquid vs Liabilities Crossover (Insolvency Flip)
-    curr_liquid = 0; curr_debt = 0; prev_liquid = 0; prev_debt = 0
-    for acc in context.all_accounts:
-        curr_bal = context.account_balances[acc.id]
-        prev_bal = context.prev_balances.get(acc.id, acc.starting_balance)
-        
-        # Only count CASH and INVESTMENT as "Liquid"
-        # Explicitly Exclude PENSION, PROPERTY, MAIN_RESIDENCE, RSU_GRANT
-        if acc.account_type in [enums.AccountType.CASH, enums.AccountType.INVESTMENT]:
-            
-            # FIX: Pension wrappers are NOT liquid, even if Type is Investment/Cash
-            if acc.tax_wrapper == enums.TaxWrapper.PENSION:
-                continue
+def liquid_exceeds_liabilities(series: ProjectionSeries) -> Iterable[Milestone]:
+    metrics = series.liquid_and_liabilities
+    for month in range(1, len(metrics)):
+        (prev_liquid, prev_debt), (liquid, debt) = metrics[month - 1], metrics[month]
+        if prev_liquid < prev_debt and liquid >= debt:
+            yield month, "Liquid Assets > Liabilities", "success"
 
-            curr_liquid += curr_bal
-            prev_liquid += prev_bal
-        elif acc.account_type in [enums.AccountType.MORTGAGE, enums.AccountType.LOAN]:
-            if curr_bal < 0: curr_debt += abs(curr_bal)
-            if prev_bal < 0: prev_debt += abs(prev_bal)
-    
-    # Milestone: Liquid Assets exceed Total Debt for the first time
-    if prev_liquid < prev_debt and curr_liquid >= curr_debt and prev_debt > 0:
-         # FIX: Check if already added to avoid duplicates from volatility
-         if not any(a.label == "Liquid assets exceed liabilities" for a in context.annotations):
-             context.annotations.append(schemas.ProjectionAnnotation(date=context.month_start, label="Liquid assets exceed liabilities", type="milestone"))
+def debt_free(series: ProjectionSeries) -> Iterable[Milestone]:
+    metrics = series.liquid_and_liabilities
+    for month in range(1, len(metrics)):
+        if metrics[month - 1][1] > 0 and metrics[month][1] == 0:
+            yield month, "Debt Free", "success"
 
-    # ALERT: Insolvency (Running out of money)
-    # Check if Liquid Assets drop below 0 (excluding debt) - this means even cash/investments are gone/overdrawn
-    # or strictly, if total liquid balance is negative.
-    if curr_liquid < 0:
-        # Check if we already have this alert for this month to avoid span spam
-        if not any(a.label == "Insolvency Risk" and a.date == context.month_start for a in context.annotations):
-             context.annotations.append(schemas.ProjectionAnnotation(date=context.month_start, label="Insolvency Risk", type="insolvency"))
+# Within a month, milestones are reported in detector order
+MILESTONE_DETECTORS: List[Detector] = [retirements, debts_cleared, liquid_exceeds_liabilities, debt_free]
 
+def detect_milestones(series: ProjectionSeries) -> List[Milestone]:
+    """All milestones of a finished projection, ordered by month (then detector, then account)."""
+    found = [milestone for detect in MILESTONE_DETECTORS for milestone in detect(series)]
+    found.sort(key=lambda milestone: milestone[0])
+    return found
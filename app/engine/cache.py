@@ -0,0 +1,115 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app import crud, metrics, models
+from .view import ScenarioView, compile_scenario
+from .overrides import OverrideOverlay
+
+DEFAULT_CACHE_SIZE = int(os.getenv("SCENARIO_CACHE_SIZE", "64"))
+RULE_LOG_CACHE_SIZE = int(os.getenv("RULE_LOG_CACHE_SIZE", "16"))
+
+class ScenarioCache:
+    """
+    Process-wide LRU of compiled, read-only scenario views keyed by (scenario id, version).
+    A scenario edit bumps its version, so stale entries are never served; they simply age out.
+    """
+
+    def __init__(self, maxsize: int = DEFAULT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[Tuple[int, int], ScenarioView]" = OrderedDict()
+        self._latest: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, scenario_id: int, version: int) -> Optional[ScenarioView]:
+        key = (scenario_id, version)
+        with self._lock:
+            view = self._entries.get(key)
+            if view is not None: self._entries.move_to_end(key)
+        metrics.record_cache_lookup("scenario", view is not None)
+        return view
+
+    def put(self, scenario_id: int, version: int, view: ScenarioView):
+        with self._lock:
+            # Only the newest version of a scenario is worth keeping
+            previous = self._latest.get(scenario_id)
+            if previous is not None and previous != version:
+                self._entries.pop((scenario_id, previous), None)
+            self._latest[scenario_id] = version
+            self._entries[(scenario_id, version)] = view
+            self._entries.move_to_end((scenario_id, version))
+            while len(self._entries) > self.maxsize:
+                (old_id, old_version), _ = self._entries.popitem(last=False)
+                if self._latest.get(old_id) == old_version: del self._latest[old_id]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._latest.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+SCENARIO_CACHE = ScenarioCache()
+
+def get_compiled_scenario(db: Session, scenario_id: int, cache: ScenarioCache = SCENARIO_CACHE) -> Optional[ScenarioView]:
+    """
+    Read-through lookup: one cheap version query on a hit, the full graph load + compile on a miss.
+    Returns None if the scenario does not exist.
+    """
+    version = db.execute(select(models.Scenario.version).where(models.Scenario.id == scenario_id)).scalar()
+    if version is None: return None
+    view = cache.get(scenario_id, version)
+    if view is not None: return view
+
+    db_scenario = crud.get_scenario_graph(db, scenario_id)
+    if db_scenario is None: return None
+    view = compile_scenario(db_scenario)
+    # Key by the version the graph was actually loaded at
+    cache.put(scenario_id, view.version, view)
+    return view
+
+class RuleLogCache:
+    """
+    Process-wide LRU of the rule log books of recent projections, keyed by (scenario id, version, months,
+    overrides), so paging and re-sorting the audit view reuse the projection /project already ran.
+    """
+
+    def __init__(self, maxsize: int = RULE_LOG_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(scenario, months: int, overrides) -> Optional[Hashable]:
+        """The cache key of a projection, or None if it can't be cached (not a compiled view, or a prebuilt overlay)."""
+        if not isinstance(scenario, ScenarioView) or isinstance(overrides, OverrideOverlay): return None
+        fields = tuple((o.type, o.id, o.field, repr(o.value)) for o in overrides or [])
+        return (scenario.id, scenario.version, months, fields)
+
+    def get(self, key: Optional[Hashable]):
+        if key is None: return None
+        with self._lock:
+            book = self._entries.get(key)
+            if book is not None: self._entries.move_to_end(key)
+        metrics.record_cache_lookup("rule_logs", book is not None)
+        return book
+
+    def put(self, key: Optional[Hashable], book):
+        if key is None: return
+        with self._lock:
+            self._entries[key] = book
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize: self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock: self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+RULE_LOG_CACHE = RuleLogCache()
@@ -1,8 +1,10 @@
 from dataclasses import dataclass, field
 from datetime import date
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 from app import models
 from dateutil.relativedelta import relativedelta
+from .ranges import MonthRanges
+from .classes import AccountClasses
 
 @dataclass
 class ProjectionContext:
@@ -17,18 +19,39 @@ class ProjectionContext:
     ytd_interest: Dict = field(default_factory=dict)
     ytd_gains: Dict = field(default_factory=dict)
     
-    # Reporting / Outputs
-    warnings: List = field(default_factory=list)
-    rule_logs: List = field(default_factory=list)
+    # Reporting / Outputs (warnings and annotations are kept as month ranges; see warn() / annotate())
+    warnings: MonthRanges = field(default_factory=MonthRanges)
+    rule_logs: List = field(default_factory=list)  # RuleLogEntry tuples, rendered by rule_logs.RuleLogBook
+    log_level: str = "full"
     mortgage_state: Dict = field(default_factory=dict)
     mortgage_stats: List = field(default_factory=list)
-    annotations: List = field(default_factory=list)
+    annotations: MonthRanges = field(default_factory=MonthRanges)
     data_points: List = field(default_factory=list)  # Fixed: Added this field
     
     # Helper Data
     all_accounts: List[models.Account] = field(default_factory=list)
+    # Account classification bitmasks (classes.AccountClass), built from all_accounts when not given
+    classes: Optional[AccountClasses] = None
     prev_balances: Dict[int, int] = field(default_factory=dict)
+    # Per-projection compiled forms of scenario entities, built by processors on first use (e.g. "rules")
+    compiled: Dict[str, Any] = field(default_factory=dict)
+    # Months since the projection anchor (the 1st of the start month)
+    month_index: int = 0
+
+    def __post_init__(self):
+        if self.classes is None: self.classes = AccountClasses(self.all_accounts)
+
+    def warn(self, account_id: int, code: str, message: str, source_type: str = "system", source_id: int = 0):
+        """Records a warning for this month; consecutive months with the same source and code become one range."""
+        fields = {"account_id": account_id, "code": code, "message": message, "source_type": source_type, "source_id": source_id}
+        self.warnings.add((source_type, source_id, account_id, code), self.month_index, self.month_start, lambda: fields)
+
+    def annotate(self, label: str, type: str = "default", when: Optional[date] = None):
+        """Records a chart annotation for this month (dated `when` if given), ranged like warn()."""
+        key = (label, type)
+        self.annotations.add(key, self.month_index, when or self.month_start, lambda: key)
 
     def advance_month(self):
         """Move the context date forward by one month."""
         self.month_start = self.month_start + relativedelta(months=1)
+        self.month_index += 1
@@ -1,93 +1,116 @@
 from sqlalchemy.orm import Session
-from typing import List, Any, Optional, Dict
+from typing import List, Any, Optional, Dict, Tuple
 from app import models, schemas, enums, utils
 from .context import ProjectionContext
-from .processors import income, costs, transfers, mortgage, tax, rsu, growth, rules, decumulation, events
-from .helpers import calculate_gbp_balances, _get_enum_value
+from .processors import mortgage
+from .pipeline import PIPELINE
+from .helpers import calculate_gbp_balances
+from .profiling import ProjectionProfiler
+from .rule_logs import RuleLogBook
+from .ranges import render_warnings, render_annotations
+from .analyzers import ProjectionSeries, detect_milestones
+from .classes import AccountClasses
+from .overrides import OverrideOverlay
+from .view import ScenarioView, compile_scenario
+from .quiet import quiet_schedule
+from .cache import RULE_LOG_CACHE, RuleLogCache
 from dateutil.relativedelta import relativedelta
 from datetime import date, datetime
 import logging
 
 logger = logging.getLogger(__name__)
 
-def apply_simulation_overrides(scenario: models.Scenario, overrides: List[schemas.SimulationOverride]):
-    
-    def _parse_val(field, val):
-        """Convert date strings to date objects if the field implies a date."""
-        if isinstance(val, str) and (field.endswith('_date') or field == 'birth_date'):
-            try:
-                # Try standard ISO format YYYY-MM-DD
-                return datetime.strptime(val, "%Y-%m-%d").date()
-            except ValueError:
-                return val # Return as is if parse fails
-        return val
-
-    for override in overrides:
-        val = _parse_val(override.field, override.value)
-        
-        if override.type == 'account':
-            acc = next((a for a in scenario.accounts if a.id == override.id), None)
-            if acc and hasattr(acc, override.field): setattr(acc, override.field, val)
-        elif override.type == 'income':
-            for owner in scenario.owners:
-                inc = next((i for i in owner.income_sources if i.id == override.id), None)
-                if inc and hasattr(inc, override.field): setattr(inc, override.field, val)
-        elif override.type == 'cost':
-            cost = next((c for c in scenario.costs if c.id == override.id), None)
-            if cost and hasattr(cost, override.field): setattr(cost, override.field, val)
-        elif override.type == 'transfer':
-            trans = next((t for t in scenario.transfers if t.id == override.id), None)
-            if trans and hasattr(trans, override.field): setattr(trans, override.field, val)
-        elif override.type == 'event':
-            evt = next((e for e in scenario.financial_events if e.id == override.id), None)
-            if evt and hasattr(evt, override.field): setattr(evt, override.field, val)
-        elif override.type == 'tax_limit':
-            limit = next((t for t in scenario.tax_limits if t.id == override.id), None)
-            if limit and hasattr(limit, override.field): setattr(limit, override.field, val)
-        elif override.type == 'rule':
-            rule = next((r for r in scenario.automation_rules if r.id == override.id), None)
-            if rule and hasattr(rule, override.field): setattr(rule, override.field, val)
-        elif override.type == 'strategy' or override.type == 'decumulation_strategy':
-            strat = next((s for s in scenario.decumulation_strategies if s.id == override.id), None)
-            if strat and hasattr(strat, override.field): setattr(strat, override.field, val)
-
-def run_projection(db: Session, scenario: models.Scenario, months: int, overrides: list = None) -> schemas.ProjectionResult:
-    if overrides is None: overrides = []
-    
-    # Apply overrides to the in-memory scenario object BEFORE processing starts
-    apply_simulation_overrides(scenario, overrides)
+def prepare_projection(scenario, overrides: Optional[list], log_level: str) -> Tuple[ScenarioView, ProjectionContext]:
+    """The compiled scenario (overrides applied) and a context holding its opening balances."""
+    overlay = overrides if isinstance(overrides, OverrideOverlay) else OverrideOverlay.from_overrides(overrides)
+    if overlay or not isinstance(scenario, ScenarioView):
+        scenario = compile_scenario(scenario, overlay)
     
     all_accounts = scenario.accounts
-    start_date = scenario.start_date
     initial_balances = {acc.id: acc.starting_balance for acc in all_accounts}
     initial_costs = {acc.id: (acc.book_cost if acc.book_cost is not None else acc.starting_balance) for acc in all_accounts}
     
     context = ProjectionContext(
-        month_start=start_date,
+        month_start=scenario.start_date,
         account_balances=initial_balances,
         account_book_costs=initial_costs,
         flows={},
-        all_accounts=all_accounts
+        all_accounts=all_accounts,
+        classes=AccountClasses(all_accounts),
+        log_level=log_level
     )
+    return scenario, context
+
+def begin_month(context: ProjectionContext, month_start: date, current_fy):
+    """Moves the context to `month_start`, resetting the year-to-date state on a new UK fiscal year. Returns the fiscal year."""
+    context.month_start = month_start
+    new_fy = utils.get_uk_fiscal_year(month_start)
+    if new_fy != current_fy:
+         context.ytd_contributions = {}
+         context.ytd_earnings = {}
+         context.ytd_interest = {}
+         context.ytd_gains = {}
+    return new_fy
+
+def month_processors(scenario, context: ProjectionContext) -> list:
+    """
+    The processors this month needs: the projection's pipeline (PIPELINE, less processors its scenario
+    has nothing for), cut down to the quiet processors in a quiet month (see quiet.QuietSchedule).
+    """
+    steps = context.compiled.get("pipeline")
+    if steps is None:
+        steps = context.compiled["pipeline"] = PIPELINE.pipeline(scenario, context.classes)
+    every_month, quiet = steps
+    return quiet if quiet_schedule(scenario, context).is_quiet(context) else every_month
+
+def run_projection(db: Session, scenario, months: int, overrides: list = None, profile: bool = False,
+                   log_level: str = "full") -> schemas.ProjectionResult:
+    """
+    Project `scenario` (an ORM Scenario or a compiled ScenarioView) forward `months` months.
+    Overrides are applied to a compiled copy; the scenario passed in is never modified.
+    log_level (rule_logs.LOG_LEVELS) controls how much of the rule execution log is returned.
+    Unless it is "off", the log is kept in RULE_LOG_CACHE for rule_log_page.
+    """
+    if profile:
+        with ProjectionProfiler() as profiler:
+            result, book = _run(scenario, months, overrides, profiler, log_level)
+            profiler.start("rule_logs")
+            result.rule_logs = book.render(log_level)
+            profiler.stop("rule_logs")
+        result.metadata["profile"] = profiler.report(months)
+    else:
+        result, book = _run(scenario, months, overrides, None, log_level)
+        result.rule_logs = book.render(log_level)
+    if log_level != "off": RULE_LOG_CACHE.put(RuleLogCache.key(scenario, months, overrides), book)
+    return result
+
+def rule_log_page(db: Session, scenario, months: int, overrides: list = None, offset: int = 0, limit: int = 100,
+                  sort: str = "date", descending: bool = False) -> schemas.RuleLogPage:
+    """
+    One sorted page of the rule execution log. The log of the same projection is taken from RULE_LOG_CACHE
+    when /project (or an earlier page) already ran it; otherwise this costs a full projection, and the log
+    is cached for the next page or sort.
+    """
+    key = RuleLogCache.key(scenario, months, overrides)
+    book = RULE_LOG_CACHE.get(key)
+    if book is None:
+        _, book = _run(scenario, months, overrides, None, "full")
+        RULE_LOG_CACHE.put(key, book)
+    return schemas.RuleLogPage(total=len(book), offset=offset, items=book.page(offset, limit, sort, descending))
+
+def _run(scenario, months: int, overrides: Optional[list], profiler: Optional[ProjectionProfiler],
+         log_level: str) -> Tuple[schemas.ProjectionResult, RuleLogBook]:
+    if profiler: profiler.start("setup")
+    scenario, context = prepare_projection(scenario, overrides, log_level)
+    all_accounts = scenario.accounts
+    start_date = scenario.start_date
+    classes = context.classes
     
-    for ann in scenario.chart_annotations:
-        context.annotations.append(schemas.ProjectionAnnotation(date=ann.date, label=ann.label, type=ann.annotation_type))
+    chart_annotations = [schemas.ProjectionAnnotation(date=ann.date, label=ann.label, type=ann.annotation_type) for ann in scenario.chart_annotations]
 
     # Initial Data Point
-    initial_breakdown, initial_total = calculate_gbp_balances(context.account_balances, all_accounts, scenario.gbp_to_usd_rate, start_date)
-    # Calculate Initial Liquid Assets
-    initial_liquid = 0
-    for acc in all_accounts:
-        val_gbp = initial_breakdown.get(acc.id, 0)
-        type_val = _get_enum_value(acc.account_type)
-        wrapper_val = _get_enum_value(acc.tax_wrapper)
-        is_liquid = True
-        if type_val in ["Mortgage", "Loan", "Property", "Main Residence", "RSU Grant"]:
-            is_liquid = False
-        if wrapper_val in ["Pension", "Lifetime ISA"]:
-            is_liquid = False
-        if is_liquid:
-            initial_liquid += val_gbp
+    initial_breakdown, initial_total = calculate_gbp_balances(context.account_balances, all_accounts, scenario.gbp_to_usd_rate, start_date, classes)
+    initial_liquid = classes.liquid_total(initial_breakdown)
 
     context.data_points.append(schemas.ProjectionDataPoint(
         date=start_date,
@@ -96,25 +119,18 @@ def run_projection(db: Session, scenario: models.Scenario, months: int, override
         account_balances=initial_breakdown,
         flows={}
     ))
+    if profiler: profiler.stop("setup")
 
     projection_anchor = start_date.replace(day=1)
     current_fy = utils.get_uk_fiscal_year(start_date)
-    
-    prev_metrics = {'liquid': 0, 'liability': 999999999999} 
+    # Opening balances of each month (then the closing ones), for the milestone post-pass
+    balance_rows = []
 
     for i in range(months):
         context.prev_balances = context.account_balances.copy()
+        balance_rows.append(context.prev_balances)
         projection_month_start = projection_anchor + relativedelta(months=i)
-        context.month_start = projection_month_start
-        
-        # FY Reset
-        new_fy = utils.get_uk_fiscal_year(projection_month_start)
-        if new_fy != current_fy:
-             context.ytd_contributions = {}
-             context.ytd_earnings = {}
-             context.ytd_interest = {}
-             context.ytd_gains = {}
-             current_fy = new_fy
+        current_fy = begin_month(context, projection_month_start, current_fy)
              
         # Reset Flows
         context.flows = {acc.id: {
@@ -124,100 +140,46 @@ def run_projection(db: Session, scenario: models.Scenario, months: int, override
         } for acc in all_accounts}
 
         # --- PROCESSORS ---
-        income.process_income(scenario, context)
-        costs.process_costs(scenario, context)
-        transfers.process_transfers(scenario, context)
-        events.process_events(scenario, context)
-        rsu.process_rsu_vesting(scenario, context)
-        mortgage.process_mortgages(scenario, context)
-        rules.process_rules(scenario, context)
-        decumulation.process_decumulation(scenario, context)
-        growth.process_growth(scenario, context)
+        processors = month_processors(scenario, context)
+        if profiler is None:
+            for _, process in processors: process(scenario, context)
+        else:
+            for name, process in processors: profiler.call(name, process, scenario, context)
         
-        # --- MILESTONE CHECKS ---
-        for owner in scenario.owners:
-            if owner.birth_date and owner.retirement_age:
-                ret_date = owner.birth_date + relativedelta(years=owner.retirement_age)
-                if ret_date.year == projection_month_start.year and ret_date.month == projection_month_start.month:
-                    context.annotations.append(schemas.ProjectionAnnotation(
-                        date=projection_month_start,
-                        label=f"{owner.name} Retires",
-                        type="milestone"
-                    ))
-
         # Snapshot
-        current_breakdown, current_total = calculate_gbp_balances(context.account_balances, all_accounts, scenario.gbp_to_usd_rate, projection_month_start)
+        if profiler: profiler.start("snapshot")
+        current_breakdown, current_total = calculate_gbp_balances(context.account_balances, all_accounts, scenario.gbp_to_usd_rate, projection_month_start, classes)
         end_of_month = projection_month_start + relativedelta(months=1, days=-1)
-        
-        # Metrics & Cleared Logic
-        liquid_val = 0
-        liability_val = 0
-        
-        for acc in all_accounts:
-            bal_pence = context.account_balances.get(acc.id, 0)
-            type_val = _get_enum_value(acc.account_type)
-            wrapper_val = _get_enum_value(acc.tax_wrapper)
-            
-            # Detect Mortgage Clearance
-            if type_val in ["Mortgage", "Loan"]:
-                prev_bal = context.prev_balances.get(acc.id, 0)
-                if prev_bal < 0 and bal_pence >= 0:
-                    context.annotations.append(schemas.ProjectionAnnotation(
-                        date=projection_month_start,
-                        label=f"{acc.name} Cleared",
-                        type="success"
-                    ))
-
-            val_gbp = bal_pence
-            if _get_enum_value(acc.currency) == "USD":
-                val_gbp = round(bal_pence / scenario.gbp_to_usd_rate)
+        liquid_val = classes.liquid_total(current_breakdown)
 
-            is_liquid = True
-            if type_val in ["Mortgage", "Loan", "Property", "Main Residence", "RSU Grant"]:
-                is_liquid = False
-            if wrapper_val in ["Pension", "Lifetime ISA"]:
-                is_liquid = False
-            
-            if is_liquid:
-                liquid_val += val_gbp
-            
-            if type_val in ["Mortgage", "Loan"] and bal_pence < 0:
-                liability_val += abs(val_gbp)
-
-        if i > 0:
-            if prev_metrics['liquid'] < prev_metrics['liability'] and liquid_val >= liability_val:
-                 context.annotations.append(schemas.ProjectionAnnotation(
-                     date=projection_month_start,
-                     label="Liquid Assets > Liabilities",
-                     type="success"
-                 ))
-            
-            if prev_metrics['liability'] > 0 and liability_val == 0:
-                 context.annotations.append(schemas.ProjectionAnnotation(
-                     date=projection_month_start,
-                     label="Debt Free", 
-                     type="success"
-                 ))
-
-        prev_metrics = {'liquid': liquid_val, 'liability': liability_val}
-
-        flows_for_schema = {acc_id: schemas.ProjectionFlows(**flow_data) for acc_id, flow_data in context.flows.items()}
+        # Values are engine-produced ints, so skip per-field validation in the hot loop
+        flows_for_schema = {acc_id: schemas.ProjectionFlows.model_construct(**flow_data) for acc_id, flow_data in context.flows.items()}
         
-        context.data_points.append(schemas.ProjectionDataPoint(
+        context.data_points.append(schemas.ProjectionDataPoint.model_construct(
             date=end_of_month,
             balance=current_total,
             liquid_assets=liquid_val, 
             account_balances=current_breakdown,
             flows=flows_for_schema
         ))
+        if profiler: profiler.stop("snapshot")
         
         context.advance_month()
+    balance_rows.append(context.account_balances)
+
+    # --- MILESTONES --- (post-pass over the month x account balances)
+    if profiler: profiler.start("milestones")
+    series = ProjectionSeries(scenario, projection_anchor, classes, balance_rows, context.data_points)
+    for month, label, kind in detect_milestones(series):
+        context.annotations.add((label, kind), month, projection_anchor + relativedelta(months=month), lambda: (label, kind))
+    if profiler: profiler.stop("milestones")
 
-    return schemas.ProjectionResult(
+    result = schemas.ProjectionResult(
         data_points=context.data_points,
-        warnings=context.warnings,
-        rule_logs=context.rule_logs,
+        warnings=render_warnings(context.warnings),
         mortgage_stats=context.mortgage_stats,
-        annotations=context.annotations,
+        mortgage_schedules=mortgage.render_schedules(context),
+        annotations=render_annotations(chart_annotations, context.annotations),
         metadata={"currency": "GBP"}
     )
+    return result, RuleLogBook(scenario, context.rule_logs)
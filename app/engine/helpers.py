@@ -1,5 +1,6 @@
 from app import models, enums
 from app.engine.context import ProjectionContext
+from app.engine.classes import AccountClass, AccountClasses
 from typing import List, Any
 from dateutil.relativedelta import relativedelta
 
@@ -8,18 +9,15 @@ def _get_enum_value(obj: Any) -> str:
     if obj is None: return None
     return obj.value if hasattr(obj, 'value') else str(obj)
 
-def calculate_disposal_impact(withdrawal_amount: int, current_balance: int, current_book_cost: int, account_type: Any, tax_wrapper: Any) -> tuple[int, int]:
-    # Robust Enum Access
-    wrapper_val = _get_enum_value(tax_wrapper)
-    type_val = _get_enum_value(account_type)
-    
-    # EXEMPTIONS: 
-    # 1. Tax Wrappers (ISA/Pension) - if wrapper is not None/Empty
-    if wrapper_val and wrapper_val != "None": return 0, 0
-    
-    # 2. Exempt Account Types
-    # Note: Ensure these match the string values in enums.py
-    if type_val in ["Cash", "Mortgage", "Loan", "Main Residence"]: return 0, 0
+def month_ordinal(d) -> int:
+    """Months since year 0 (year * 12 + month - 1): comparable and subtractable month numbers."""
+    return d.year * 12 + d.month - 1
+
+def calculate_disposal_impact(withdrawal_amount: int, current_balance: int, current_book_cost: int, account_class: int) -> tuple[int, int]:
+    # EXEMPTIONS (AccountClass.CGT_EXEMPT):
+    # 1. Tax Wrappers (ISA/Pension) - any wrapper other than None
+    # 2. Exempt Account Types: Cash, Mortgage, Loan, Main Residence
+    if account_class & AccountClass.CGT_EXEMPT: return 0, 0
     
     if current_balance <= 0 or withdrawal_amount <= 0: return 0, 0
     
@@ -30,19 +28,18 @@ def calculate_disposal_impact(withdrawal_amount: int, current_balance: int, curr
     gain = withdrawal_amount - cost_portion
     return cost_portion, gain
 
-def calculate_gbp_balances(current_balances, accounts, rate, month_start=None):
+def calculate_gbp_balances(current_balances, accounts, rate, month_start=None, classes: AccountClasses = None):
     gbp_balances = {}
     total = 0
-    account_map = {acc.id: acc for acc in accounts}
+    if classes is None: classes = AccountClasses(accounts)
+    account_map, masks = classes.by_id, classes.masks
     for acc_id, bal in current_balances.items():
         acc = account_map.get(acc_id)
         if not acc: continue
         val_gbp = bal
+        mask = masks[acc_id]
         
-        type_val = _get_enum_value(acc.account_type)
-        currency_val = _get_enum_value(acc.currency)
-        
-        if type_val == "RSU Grant":
+        if mask & AccountClass.RSU:
             if not acc.grant_date or not acc.unit_price: val_gbp = 0
             else:
                 months_elapsed = 0
@@ -54,8 +51,8 @@ def calculate_gbp_balances(current_balances, accounts, rate, month_start=None):
                 current_price = acc.unit_price * ((1 + monthly_rate) ** months_elapsed)
                 units = bal / 100.0
                 val_gbp = int(units * current_price)
-                if currency_val == "USD": val_gbp = round(val_gbp / rate)
-        elif currency_val == "USD":
+                if mask & AccountClass.USD: val_gbp = round(val_gbp / rate)
+        elif mask & AccountClass.USD:
             val_gbp = round(bal / rate)
             
         gbp_balances[acc_id] = val_gbp
@@ -64,13 +61,10 @@ def calculate_gbp_balances(current_balances, accounts, rate, month_start=None):
 
 def track_contribution(context: ProjectionContext, account_id: int, amount: int):
     if amount <= 0: return
-    acc = next((a for a in context.all_accounts if a.id == account_id), None)
-    if not acc: return
-    
-    # Robust Enum Access
+    # Only wrapped accounts count towards tax limits
+    if not context.classes.of(account_id) & AccountClass.WRAPPED: return
+    acc = context.classes.by_id[account_id]
     wrapper_val = _get_enum_value(acc.tax_wrapper)
-    
-    if not wrapper_val or wrapper_val == "None": return
 
     if acc.owners:
         owner_id = acc.owners[0].id
@@ -82,12 +76,11 @@ def track_contribution(context: ProjectionContext, account_id: int, amount: int)
         context.ytd_contributions[owner_id][key] = context.ytd_contributions[owner_id].get(key, 0) + amount
 
 def get_contribution_headroom(context: ProjectionContext, account_id: int, tax_limits: List[models.TaxLimit]):
-    acc = next((a for a in context.all_accounts if a.id == account_id), None)
-    if not acc: return 999999999999
-    
+    # Unknown and unwrapped accounts have no limit
+    if not context.classes.of(account_id) & AccountClass.WRAPPED: return 999999999999
+    acc = context.classes.by_id[account_id]
     wrapper_val = _get_enum_value(acc.tax_wrapper)
     
-    if not wrapper_val or wrapper_val == "None": return 999999999999
     if not acc.owners: return 0
     
     owner_id = acc.owners[0].id
@@ -0,0 +1,66 @@
+from datetime import datetime
+from types import MappingProxyType
+from typing import Any, Dict, Iterable, Mapping, Tuple
+
+# Override types accepted from the UI, mapped to the entity kind they target
+OVERRIDE_TYPES = {
+    "account": "account",
+    "income": "income",
+    "cost": "cost",
+    "transfer": "transfer",
+    "event": "event",
+    "tax_limit": "tax_limit",
+    "rule": "rule",
+    "strategy": "strategy",
+    "decumulation_strategy": "strategy",
+}
+
+_EMPTY: Mapping[str, Any] = MappingProxyType({})
+
+def _parse_val(field: str, val):
+    """Convert date strings to date objects if the field implies a date."""
+    if isinstance(val, str) and field.endswith('_date'):
+        try:
+            # Try standard ISO format YYYY-MM-DD
+            return datetime.strptime(val, "%Y-%m-%d").date()
+        except ValueError:
+            return val # Return as is if parse fails
+    return val
+
+class OverrideOverlay:
+    """
+    Immutable what-if overlay: field values indexed by (kind, entity id).
+    Built once per request and applied when compiling the engine view, so ORM objects are never touched.
+    """
+    __slots__ = ("_entries",)
+
+    def __init__(self, entries: Dict[Tuple[str, int], Dict[str, Any]] = None):
+        frozen = {key: MappingProxyType(dict(fields)) for key, fields in (entries or {}).items()}
+        object.__setattr__(self, "_entries", MappingProxyType(frozen))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("OverrideOverlay is immutable")
+
+    @classmethod
+    def from_overrides(cls, overrides: Iterable) -> "OverrideOverlay":
+        """Index a list of SimulationOverride-like objects (type, id, field, value). Later entries win."""
+        entries: Dict[Tuple[str, int], Dict[str, Any]] = {}
+        for override in overrides or []:
+            kind = OVERRIDE_TYPES.get(override.type)
+            if kind is None: continue
+            entries.setdefault((kind, override.id), {})[override.field] = _parse_val(override.field, override.value)
+        return cls(entries)
+
+    def fields_for(self, kind: str, entity_id: int) -> Mapping[str, Any]:
+        return self._entries.get((kind, entity_id), _EMPTY)
+
+    def get(self, kind: str, entity_id: int, field: str, default=None):
+        return self.fields_for(kind, entity_id).get(field, default)
+
+    def __bool__(self):
+        return bool(self._entries)
+
+    def __len__(self):
+        return len(self._entries)
+
+EMPTY_OVERLAY = OverrideOverlay()
@@ -0,0 +1,119 @@
+from dataclasses import dataclass
+from typing import Callable, Dict, FrozenSet, Iterable, List, Optional, Tuple
+from .classes import AccountClass, AccountClasses
+from .processors import income, costs, transfers, events, rsu, mortgage, rules, decumulation, growth, tax, assets
+
+# ProjectionContext state a processor can read or write
+STATE = frozenset((
+    "balances", "book_costs", "flows", "ytd_contributions", "ytd_earnings", "ytd_interest", "ytd_gains",
+    "warnings", "annotations", "rule_logs", "mortgage_state", "mortgage_stats",
+))
+
+# Scenario entities a processor can need, and whether a scenario has any
+ENTITIES: Dict[str, Callable[[object, AccountClasses], bool]] = {
+    "income_sources": lambda scenario, classes: any(owner.income_sources for owner in scenario.owners),
+    "costs": lambda scenario, classes: bool(scenario.costs),
+    "transfers": lambda scenario, classes: bool(scenario.transfers),
+    "financial_events": lambda scenario, classes: bool(scenario.financial_events),
+    "automation_rules": lambda scenario, classes: bool(scenario.automation_rules),
+    "rsu_grants": lambda scenario, classes: bool(classes.accounts(AccountClass.RSU)),
+    "mortgages": lambda scenario, classes: bool(classes.accounts(AccountClass.MORTGAGE)),
+    "cash_accounts": lambda scenario, classes: bool(classes.accounts(AccountClass.CASH)),
+    "growing_accounts": lambda scenario, classes: bool(classes.accounts(AccountClass.GROWS)),
+}
+
+# (name, process) pairs, as run by the monthly loop
+Steps = List[Tuple[str, Callable]]
+
+@dataclass(frozen=True)
+class Processor:
+    """
+    One monthly step of the projection. `reads` / `writes` name the ProjectionContext STATE it touches;
+    `needs` the ENTITIES it acts on (any of them; none: always relevant), so a projection whose scenario
+    has none of them leaves the processor out. `quiet` processors also run in quiet months
+    (quiet.QuietSchedule). Optional processors only run when a pipeline asks for them by name.
+    """
+    name: str
+    process: Callable
+    reads: FrozenSet[str]
+    writes: FrozenSet[str]
+    needs: Tuple[str, ...]
+    quiet: bool
+    optional: bool
+
+    def relevant(self, scenario, classes: AccountClasses) -> bool:
+        return not self.needs or any(ENTITIES[entity](scenario, classes) for entity in self.needs)
+
+class ProcessorRegistry:
+    """The processors of the monthly loop, in the order they run."""
+
+    def __init__(self):
+        self._processors: List[Processor] = []
+
+    def register(self, name: str, process: Callable, reads: Iterable[str] = (), writes: Iterable[str] = (),
+                 needs: Iterable[str] = (), quiet: bool = False, optional: bool = False,
+                 after: Optional[str] = None) -> Processor:
+        """Adds a processor at the end of the order, or straight after the processor named `after`."""
+        if self.get(name) is not None: raise ValueError(f"Processor {name} is already registered")
+        processor = Processor(name, process, frozenset(reads), frozenset(writes), tuple(needs), quiet, optional)
+        unknown = sorted((processor.reads | processor.writes) - STATE) + [entity for entity in processor.needs if entity not in ENTITIES]
+        if unknown: raise ValueError(f"Processor {name} declares unknown state or entities: {', '.join(unknown)}")
+        if after is None:
+            self._processors.append(processor)
+        else:
+            previous = self.get(after)
+            if previous is None: raise ValueError(f"No processor {after} to register {name} after")
+            self._processors.insert(self._processors.index(previous) + 1, processor)
+        return processor
+
+    def get(self, name: str) -> Optional[Processor]:
+        return next((processor for processor in self._processors if processor.name == name), None)
+
+    def __iter__(self):
+        return iter(self._processors)
+
+    def names(self) -> List[str]:
+        return [processor.name for processor in self._processors]
+
+    def pipeline(self, scenario, classes: AccountClasses, include: Iterable[str] = ()) -> Tuple[Steps, Steps]:
+        """(every month's steps, quiet months' steps) for one projection: its relevant processors, plus the optional ones in `include`."""
+        include = set(include)
+        selected = [processor for processor in self._processors
+                    if (not processor.optional or processor.name in include) and processor.relevant(scenario, classes)]
+        return ([(processor.name, processor.process) for processor in selected],
+                [(processor.name, processor.process) for processor in selected if processor.quiet])
+
+PIPELINE = ProcessorRegistry()
+PIPELINE.register("process_income", income.process_income,
+                  reads={"balances", "ytd_contributions", "ytd_earnings"},
+                  writes={"balances", "book_costs", "flows", "ytd_contributions", "ytd_earnings", "warnings"},
+                  needs=("income_sources",))
+PIPELINE.register("process_costs", costs.process_costs, reads={"balances"}, writes={"balances", "flows"}, needs=("costs",))
+PIPELINE.register("process_transfers", transfers.process_transfers,
+                  reads={"balances", "book_costs", "ytd_contributions", "ytd_earnings", "ytd_gains"},
+                  writes={"balances", "book_costs", "flows", "ytd_contributions", "ytd_gains", "warnings", "annotations"},
+                  needs=("transfers",))
+PIPELINE.register("process_events", events.process_events,
+                  reads={"balances", "book_costs", "ytd_contributions", "ytd_earnings", "ytd_gains"},
+                  writes={"balances", "book_costs", "flows", "ytd_contributions", "ytd_gains", "warnings", "annotations"},
+                  needs=("financial_events",))
+PIPELINE.register("process_rsu_vesting", rsu.process_rsu_vesting,
+                  reads={"balances", "ytd_earnings"}, writes={"balances", "flows", "ytd_earnings", "rule_logs"},
+                  needs=("rsu_grants",))
+PIPELINE.register("process_mortgages", mortgage.process_mortgages,
+                  reads={"balances"}, writes={"balances", "flows"}, needs=("mortgages",))
+PIPELINE.register("process_rules", rules.process_rules,
+                  reads={"balances", "book_costs", "ytd_contributions", "ytd_earnings", "ytd_gains", "mortgage_state"},
+                  writes={"balances", "book_costs", "flows", "ytd_contributions", "ytd_gains", "warnings",
+                          "rule_logs", "mortgage_state", "mortgage_stats"},
+                  needs=("automation_rules",))
+PIPELINE.register("process_decumulation", decumulation.process_decumulation,
+                  reads={"balances", "ytd_earnings"}, writes={"balances", "flows", "ytd_earnings"}, needs=("cash_accounts",))
+PIPELINE.register("process_growth", growth.process_growth,
+                  reads={"balances"}, writes={"balances", "flows", "ytd_interest"}, needs=("growing_accounts",), quiet=True)
+# Not run by default: the monthly loop resets the fiscal year itself (core.begin_month), and growth and
+# mortgage interest are charged by process_growth and process_mortgages
+PIPELINE.register("process_tax_year_end", tax.process_tax_year_end, optional=True,
+                  writes={"ytd_contributions", "ytd_earnings", "ytd_interest", "ytd_gains"})
+PIPELINE.register("process_interest", assets.process_interest, optional=True,
+                  reads={"balances", "ytd_earnings", "ytd_interest"}, writes={"balances", "flows", "ytd_interest"})
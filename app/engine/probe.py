@@ -0,0 +1,125 @@
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import date
+from functools import cached_property
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from dateutil.relativedelta import relativedelta
+from sqlalchemy.orm import Session
+
+from app import utils
+from .context import ProjectionContext
+from .core import prepare_projection, begin_month, month_processors
+from .helpers import calculate_gbp_balances
+
+# Metrics a probe can return; same names and meaning as summary.summarize_projection, up to the stop month
+PROBE_METRICS = ("current_net_worth", "final_net_worth", "final_liquid_assets", "debt_free_date", "insolvency_date", "tax_paid")
+# Metrics fixed by their first occurrence: once all requested ones are found, a probe without a predicate stops
+FIRST_DATE_METRICS = {"debt_free_date": lambda month: month.liabilities == 0,
+                      "insolvency_date": lambda month: month.liquid_assets < 0}
+# First-date metrics that stay None if the opening position already meets them (no debt: never "debt free")
+NONE_AT_START = frozenset(("debt_free_date",))
+
+@dataclass
+class ProbeMonth:
+    """
+    A probed projection at the end of one month, as the stop predicate and metrics see it. Index 0 is the
+    opening position (dated the start date, like data_points[0]); index i is the end of the i-th month.
+    `balances` are the engine's live native balances, so a ProbeMonth is only valid during the call it is
+    passed to. GBP values are computed on first use.
+    """
+    index: int
+    date: date
+    scenario: Any
+    context: ProjectionContext
+    # Start of the month being valued (RSU prices depend on it)
+    month_start: date
+
+    @property
+    def balances(self) -> Dict[int, int]:
+        return self.context.account_balances
+
+    @cached_property
+    def gbp(self) -> Tuple[Dict[int, int], int]:
+        return calculate_gbp_balances(self.context.account_balances, self.scenario.accounts, self.scenario.gbp_to_usd_rate,
+                                      self.month_start, self.context.classes)
+
+    @property
+    def account_balances(self) -> Dict[int, int]:
+        return self.gbp[0]
+
+    @property
+    def net_worth(self) -> int:
+        return self.gbp[1]
+
+    @property
+    def liquid_assets(self) -> int:
+        return self.context.classes.liquid_total(self.gbp[0])
+
+    @property
+    def liabilities(self) -> int:
+        return self.context.classes.liability_total(self.gbp[0])
+
+@dataclass
+class ProbeResult:
+    # The month index (and date) the predicate stopped at; None if it never did
+    stopped_at: Optional[int]
+    stopped_on: Optional[date]
+    # Months actually projected
+    months: int
+    metrics: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def stopped(self) -> bool:
+        return self.stopped_at is not None
+
+def probe_projection(db: Session, scenario, months: int, stop: Optional[Callable[[ProbeMonth], bool]] = None,
+                     metrics: Iterable[str] = (), overrides: list = None) -> ProbeResult:
+    """
+    Lean projection for solvers (goal seek, sweeps): runs the months of run_projection without building data
+    points, logs, annotations or milestones, and returns only the requested PROBE_METRICS.
+
+    `stop` sees each month's ProbeMonth and ends the projection the first time it returns True. Without one,
+    a probe asking only for FIRST_DATE_METRICS ends once they are all known.
+    """
+    metrics = tuple(metrics)
+    unknown = [name for name in metrics if name not in PROBE_METRICS]
+    if unknown: raise ValueError(f"Unknown projection metrics: {', '.join(unknown)}")
+
+    scenario, context = prepare_projection(scenario, overrides, "off")
+    # Processors only ever add to flows, so one set of running totals serves the whole probe
+    context.flows = {acc.id: defaultdict(int) for acc in scenario.accounts}
+    pending = {name: FIRST_DATE_METRICS[name] for name in metrics if name in FIRST_DATE_METRICS}
+    settles_early = stop is None and bool(metrics) and len(pending) == len(metrics)
+    values: Dict[str, Any] = {name: None for name in pending}
+
+    def observe(month: ProbeMonth) -> bool:
+        """Updates the metrics with `month`; True once the probe is decided."""
+        if month.index == 0 and "current_net_worth" in metrics: values["current_net_worth"] = month.net_worth
+        for name, found in list(pending.items()):
+            if found(month):
+                values[name] = None if month.index == 0 and name in NONE_AT_START else month.date
+                del pending[name]
+        if stop is not None: return bool(stop(month))
+        return settles_early and not pending
+
+    anchor = scenario.start_date.replace(day=1)
+    current_fy = utils.get_uk_fiscal_year(scenario.start_date)
+    month = ProbeMonth(0, scenario.start_date, scenario, context, scenario.start_date)
+    decided = observe(month)
+    i = 0
+    while not decided and i < months:
+        month_start = anchor + relativedelta(months=i)
+        current_fy = begin_month(context, month_start, current_fy)
+        for _, process in month_processors(scenario, context): process(scenario, context)
+        context.advance_month()
+        i += 1
+        month = ProbeMonth(i, month_start + relativedelta(months=1, days=-1), scenario, context, month_start)
+        decided = observe(month)
+
+    if "final_net_worth" in metrics: values["final_net_worth"] = month.net_worth
+    if "final_liquid_assets" in metrics: values["final_liquid_assets"] = month.liquid_assets
+    if "tax_paid" in metrics: values["tax_paid"] = sum(flow["tax"] + flow["cgt"] for flow in context.flows.values())
+    stopped = decided and stop is not None
+    return ProbeResult(stopped_at=month.index if stopped else None, stopped_on=month.date if stopped else None,
+                       months=i, metrics={name: values[name] for name in metrics})
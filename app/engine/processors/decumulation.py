@@ -1,7 +1,7 @@
 from app import models, enums
 from app.engine.context import ProjectionContext
 from app.services.tax import TaxService
-from app.engine.helpers import _get_enum_value
+from app.engine.classes import AccountClass
 
 def process_decumulation(scenario: models.Scenario, context: ProjectionContext):
     """
@@ -47,12 +47,11 @@ def process_decumulation(scenario: models.Scenario, context: ProjectionContext):
     total_deficit = 0
     cash_accounts = []
 
-    for acc in context.all_accounts:
-        if _get_enum_value(acc.account_type) == "Cash":
-            bal = context.account_balances.get(acc.id, 0)
-            if bal < 0:
-                total_deficit += abs(bal)
-                cash_accounts.append(acc) # These are where we need money
+    for acc in context.classes.accounts(AccountClass.CASH):
+        bal = context.account_balances.get(acc.id, 0)
+        if bal < 0:
+            total_deficit += abs(bal)
+            cash_accounts.append(acc) # These are where we need money
 
     if total_deficit <= 0:
         return
@@ -62,21 +61,19 @@ def process_decumulation(scenario: models.Scenario, context: ProjectionContext):
     gias = []
     pensions = []
 
-    for acc in context.all_accounts:
+    # Only Investment and Cash accounts are sold down (not Property/Mortgage)
+    for acc in context.classes.accounts(AccountClass.INVESTMENT | AccountClass.CASH):
         bal = context.account_balances.get(acc.id, 0)
         if bal <= 0: continue
 
-        # Check type/wrapper
-        a_type = _get_enum_value(acc.account_type)
-        wrapper = _get_enum_value(acc.tax_wrapper)
-
-        if a_type == "Investment" or a_type == "Cash": # Don't sell Property/Mortgage
-             if wrapper == "ISA":
-                 isas.append(acc)
-             elif wrapper == "Pension":
-                 pensions.append(acc)
-             elif wrapper == "General Investment Account" or wrapper == "None" or wrapper is None:
-                 gias.append(acc)
+        # Check wrapper
+        mask = context.classes.of(acc.id)
+        if mask & AccountClass.ISA:
+            isas.append(acc)
+        elif mask & AccountClass.PENSION:
+            pensions.append(acc)
+        elif not mask & AccountClass.WRAPPED:
+            gias.append(acc)
 
     # 3. Withdraw Logic (Revised Priority: GIA -> ISA -> Pension)
     remaining_deficit = total_deficit
@@ -17,7 +17,7 @@ def process_events(scenario: models.Scenario, context: ProjectionContext):
             continue
             
         if event.show_on_chart:
-            context.annotations.append(schemas.ProjectionAnnotation(date=event.event_date, label=event.name, type="transaction"))
+            context.annotate(event.name, "transaction", when=event.event_date)
         
         # Robust Type Check
         evt_type = str(event.event_type.value) if hasattr(event.event_type, 'value') else str(event.event_type)
@@ -29,7 +29,7 @@ def process_events(scenario: models.Scenario, context: ProjectionContext):
             if val > 0:
                  headroom = get_contribution_headroom(context, event.from_account_id, scenario.tax_limits)
                  if headroom < val:
-                     context.warnings.append(schemas.ProjectionWarning(date=context.month_start, account_id=event.from_account_id, message=f"Tax Limit: Event '{event.name}' exceeds allowance.", source_type="event", source_id=event.id))
+                     context.warn(event.from_account_id, "tax_limit_exceeded", f"Tax Limit: Event '{event.name}' exceeds allowance.", "event", event.id)
                  track_contribution(context, event.from_account_id, val)
             
             context.account_balances[event.from_account_id] += val
@@ -40,14 +40,14 @@ def process_events(scenario: models.Scenario, context: ProjectionContext):
             val = int(event.value)
             headroom = get_contribution_headroom(context, event.to_account_id, scenario.tax_limits)
             if headroom < val:
-                 context.warnings.append(schemas.ProjectionWarning(date=context.month_start, account_id=event.to_account_id, message=f"Tax Limit: Transfer Event '{event.name}' exceeds allowance.", source_type="event", source_id=event.id))
+                 context.warn(event.to_account_id, "tax_limit_exceeded", f"Tax Limit: Transfer Event '{event.name}' exceeds allowance.", "event", event.id)
             
-            from_acc = next((a for a in context.all_accounts if a.id == event.from_account_id), None)
+            from_acc = context.classes.by_id.get(event.from_account_id)
             cgt_tax = 0
             cost_portion = val 
             
             if from_acc:
-                cost_portion, gain = calculate_disposal_impact(val, context.account_balances[event.from_account_id], context.account_book_costs[event.from_account_id], from_acc.account_type, from_acc.tax_wrapper)
+                cost_portion, gain = calculate_disposal_impact(val, context.account_balances[event.from_account_id], context.account_book_costs[event.from_account_id], context.classes.of(from_acc.id))
                 
                 if gain > 0 and from_acc.owners:
                     num_owners = len(from_acc.owners)
@@ -1,48 +1,57 @@
+from typing import List, Optional, Tuple
 from app import models, enums
 from app.engine.context import ProjectionContext
+from app.engine.classes import AccountClass
 
-def process_growth(scenario: models.Scenario, context: ProjectionContext):
+def compile_growth(context: ProjectionContext) -> List[Tuple[int, float, Optional[int]]]:
     """
-    Apply monthly growth/interest to assets.
+    (account id, monthly growth factor, PSA owner id) of every account that grows. The PSA owner is set for
+    a Cash account NOT in a tax wrapper, whose interest counts towards the Personal Savings Allowance.
     """
-    for acc in context.all_accounts:
-        # 1. Skip types that don't grow via this processor
-        # Mortgages/Loans are handled in mortgage.py
-        # RSU Grants are share counts, they don't grow via interest (the price grows in valuation)
-        if acc.account_type in [enums.AccountType.MORTGAGE, enums.AccountType.LOAN, enums.AccountType.RSU_GRANT]:
-            continue
-            
+    # Only types that grow via this processor (AccountClass.GROWS)
+    # Mortgages/Loans are handled in mortgage.py
+    # RSU Grants are share counts, they don't grow via interest (the price grows in valuation)
+    growing = []
+    for acc in context.classes.accounts(AccountClass.GROWS):
         rate = acc.interest_rate
         if not rate or rate == 0:
             continue
-            
-        balance = context.account_balances.get(acc.id, 0)
+        # Formula: (1 + annual_rate)^(1/12) - 1
+        monthly_factor = (1 + (rate / 100.0)) ** (1.0/12.0)
+        psa_owner_id = None
+        if context.classes.of(acc.id) & (AccountClass.CASH | AccountClass.WRAPPED) == AccountClass.CASH and acc.owners:
+            psa_owner_id = acc.owners[0].id
+        growing.append((acc.id, monthly_factor, psa_owner_id))
+    return growing
+
+def process_growth(scenario: models.Scenario, context: ProjectionContext):
+    """
+    Apply monthly growth/interest to assets.
+    """
+    growing = context.compiled.get("growth")
+    if growing is None:
+        growing = context.compiled["growth"] = compile_growth(context)
+
+    for acc_id, monthly_factor, psa_owner_id in growing:
+        balance = context.account_balances.get(acc_id, 0)
         if balance == 0:
             continue
             
-        # 2. Calculate Monthly Growth
-        # Formula: (1 + annual_rate)^(1/12) - 1
-        monthly_factor = (1 + (rate / 100.0)) ** (1.0/12.0)
+        # Calculate Monthly Growth
         growth_amount = int(balance * (monthly_factor - 1))
         
         if growth_amount != 0:
-            # 3. Apply to Balance
-            context.account_balances[acc.id] += growth_amount
-            
-            # 4. Log Flow (for charts/reporting)
-            if acc.id in context.flows:
-                if 'growth' not in context.flows[acc.id]:
-                     context.flows[acc.id]['growth'] = 0.0
-                context.flows[acc.id]['growth'] += growth_amount
+            # Apply to Balance
+            context.account_balances[acc_id] += growth_amount
             
-            # 5. Tax Logic: Savings Interest
-            # If this is a Cash account and NOT in a tax wrapper, it counts towards the Personal Savings Allowance.
-            is_cash = (acc.account_type == enums.AccountType.CASH)
-            is_unwrapped = (not acc.tax_wrapper or acc.tax_wrapper == enums.TaxWrapper.NONE)
+            # Log Flow (for charts/reporting)
+            if acc_id in context.flows:
+                if 'growth' not in context.flows[acc_id]:
+                     context.flows[acc_id]['growth'] = 0.0
+                context.flows[acc_id]['growth'] += growth_amount
             
-            if is_cash and is_unwrapped:
-                 if acc.owners:
-                    owner_id = acc.owners[0].id
-                    if owner_id not in context.ytd_interest:
-                        context.ytd_interest[owner_id] = 0
-                    context.ytd_interest[owner_id] += growth_amount
+            # Tax Logic: Savings Interest
+            if psa_owner_id is not None:
+                if psa_owner_id not in context.ytd_interest:
+                    context.ytd_interest[psa_owner_id] = 0
+                context.ytd_interest[psa_owner_id] += growth_amount
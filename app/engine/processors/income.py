@@ -87,7 +87,7 @@ def process_income(scenario: models.Scenario, context: ProjectionContext):
 
             headroom = get_contribution_headroom(context, inc.account_id, scenario.tax_limits)
             if headroom < final_credit:
-                context.warnings.append(schemas.ProjectionWarning(date=context.month_start, account_id=inc.account_id, message=f"Tax Limit: Income '{inc.name}' exceeds allowance.", source_type="income", source_id=inc.id))
+                context.warn(inc.account_id, "tax_limit_exceeded", f"Tax Limit: Income '{inc.name}' exceeds allowance.", "income", inc.id)
 
             context.account_balances[inc.account_id] += final_credit
             context.account_book_costs[inc.account_id] += final_credit 
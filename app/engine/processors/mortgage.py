@@ -1,106 +1,140 @@
-from app import models, enums, utils
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+from app import models, schemas, utils
 from app.engine.context import ProjectionContext
 from dateutil.relativedelta import relativedelta
-from app.engine.helpers import _get_enum_value
+from app.engine.classes import AccountClass
+from app.engine.helpers import month_ordinal
+
+@dataclass
+class AmortisationSchedule:
+    """
+    Payment regime of one mortgage, with everything date-based resolved up front as month ordinals.
+
+    While fixed (or without a start date) the payment is level. In the variable period the balance is
+    re-amortised over the remaining term each month; the annuity factors for each remaining term are
+    computed once per rate. Regime changes are recorded as segments: start, end of the fixed period,
+    an overpayment (the balance is not what the schedule left it at) and the final payment.
+    """
+    account: models.Account
+    variable_rate: float
+    fixed_rate: Optional[float]
+    # First month ordinal of the variable period (None: no fixed period)
+    fixed_until: Optional[int]
+    # Month ordinal of the end of the term (None without a start date); remaining term = term_end - month
+    term_end: Optional[int]
+    # Level payment while fixed, or for the whole life of a mortgage without a start date
+    fixed_payment: int
+    amortising: bool
+    # Balance the schedule left the mortgage at last month, and whether that month was fixed (None: not started)
+    expected_balance: Optional[int] = None
+    fixed: Optional[bool] = None
+    # 1 - (1 + monthly rate) ** -remaining, by (rate, remaining)
+    _denominators: Dict[tuple, float] = field(default_factory=dict)
+    segments: List[schemas.MortgageScheduleSegment] = field(default_factory=list)
+
+    @classmethod
+    def compile(cls, acc: models.Account) -> "AmortisationSchedule":
+        variable_rate = acc.interest_rate or 0.0
+        fixed_until = None
+        if acc.mortgage_start_date and acc.fixed_rate_period_years and acc.fixed_interest_rate is not None:
+            fixed_end = acc.mortgage_start_date + relativedelta(years=acc.fixed_rate_period_years)
+            # Fixed for every month starting before fixed_end, i.e. including fixed_end's month unless it is the 1st
+            fixed_until = month_ordinal(fixed_end) + (1 if fixed_end.day > 1 else 0)
+        amortising = bool(acc.original_loan_amount and acc.amortisation_period_years)
+        term_end = None
+        if amortising and acc.mortgage_start_date:
+            term_end = month_ordinal(acc.mortgage_start_date + relativedelta(years=acc.amortisation_period_years))
+        fixed_payment = 0
+        if amortising and (fixed_until is not None or term_end is None):
+            rate = acc.fixed_interest_rate if fixed_until is not None else variable_rate
+            fixed_payment = utils.calculate_mortgage_payment(acc.original_loan_amount, rate, acc.amortisation_period_years)
+        return cls(account=acc, variable_rate=variable_rate, fixed_rate=acc.fixed_interest_rate, fixed_until=fixed_until,
+                   term_end=term_end, fixed_payment=fixed_payment, amortising=amortising)
+
+    def annuity_payment(self, balance: int, annual_rate: float, remaining: int) -> int:
+        """Level payment clearing `balance` (pence, positive) over `remaining` months at `annual_rate` percent."""
+        monthly_rate = annual_rate / 100 / 12
+        if monthly_rate <= 0: return round(balance / remaining)
+        denominator = self._denominators.get((annual_rate, remaining))
+        if denominator is None:
+            denominator = self._denominators[(annual_rate, remaining)] = 1 - (1 + monthly_rate) ** (-remaining)
+        return round(monthly_rate * balance / denominator)
+
+    def month(self, context: ProjectionContext, month: int, balance: int):
+        """(interest rate, scheduled payment) for this month, given the balance before payment (negative)."""
+        fixed = self.fixed_until is not None and month < self.fixed_until
+        rate = self.fixed_rate if fixed else self.variable_rate
+        remaining = None
+        if not self.amortising: payment = 0
+        elif fixed or self.term_end is None: payment = self.fixed_payment
+        else:
+            remaining = self.term_end - month
+            payment = abs(balance) if remaining <= 0 else self.annuity_payment(abs(balance), rate, remaining)
+
+        last = self.segments[-1] if self.segments else None
+        reason = None
+        if self.fixed is None: reason = "start"
+        elif fixed != self.fixed: reason = "fixed_period_end"
+        elif remaining is not None and remaining <= 0:
+            if last.reason != "final_payment": reason = "final_payment"
+        elif balance != self.expected_balance and payment != last.payment: reason = "overpayment"
+        self.fixed = fixed
+        if reason:
+            self.segments.append(schemas.MortgageScheduleSegment.model_construct(
+                date=context.month_start, reason=reason, interest_rate=rate, payment=payment,
+                balance=balance, remaining_months=remaining))
+        return rate, payment
 
 def process_mortgages(scenario: models.Scenario, context: ProjectionContext):
     """
     Calculate and apply mortgage payments (Capital + Interest) for the month.
     """
-    for acc in context.all_accounts:
-        type_val = _get_enum_value(acc.account_type)
-        if type_val != "Mortgage":
-            continue
-            
-        current_bal = context.account_balances.get(acc.id, 0)
-        
+    schedules: Dict[int, AmortisationSchedule] = context.compiled.get("mortgages")
+    if schedules is None:
+        schedules = context.compiled["mortgages"] = {
+            acc.id: AmortisationSchedule.compile(acc) for acc in context.classes.accounts(AccountClass.MORTGAGE)}
+    if not schedules: return
+    month = month_ordinal(context.month_start)
+
+    for acc_id, schedule in schedules.items():
+        current_bal = context.account_balances.get(acc_id, 0)
+
         # If already cleared (or positive), skip payment logic
         if current_bal >= 0:
             continue
-            
-        safe_interest_rate = acc.interest_rate or 0.0
-        
-        is_fixed_period = False
-        if acc.mortgage_start_date and acc.fixed_rate_period_years and acc.fixed_interest_rate is not None:
-            fixed_end_date = acc.mortgage_start_date + relativedelta(years=acc.fixed_rate_period_years)
-            if context.month_start < fixed_end_date:
-                safe_interest_rate = acc.fixed_interest_rate
-                is_fixed_period = True
-                
-        monthly_repayment = 0
-        if acc.original_loan_amount and acc.amortisation_period_years:
-            if is_fixed_period:
-                monthly_repayment = utils.calculate_mortgage_payment(acc.original_loan_amount, safe_interest_rate, acc.amortisation_period_years)
-            elif acc.mortgage_start_date:
-                loan_end_date = acc.mortgage_start_date + relativedelta(years=acc.amortisation_period_years)
-                delta = relativedelta(loan_end_date, context.month_start)
-                remaining_months = delta.years * 12 + delta.months
-                
-                if remaining_months > 0:
-                    monthly_rate = safe_interest_rate / 100 / 12
-                    interest_charged = abs(current_bal) * monthly_rate
-                    # Check for overpayments
-                    expected_bal = current_bal # Simplified for now
-                    
-                    if "interest" not in context.flows[acc.id]: context.flows[acc.id]["interest"] = 0
-                    # Double Interest Fix: Don't apply interest here, it is applied in the common block below.
-                    # context.flows[acc.id]["interest"] -= int(interest_charged)
-                    # context.account_balances[acc.id] -= int(interest_charged) 
-                    
-                    if monthly_rate > 0:
-                        numerator = monthly_rate * abs(current_bal)
-                        denominator = 1 - (1 + monthly_rate) ** (-remaining_months)
-                        monthly_repayment = round(numerator / denominator)
-                    else:
-                        monthly_repayment = round(abs(current_bal) / remaining_months)
-                else:
-                    monthly_repayment = abs(current_bal)
-            else:
-                monthly_repayment = utils.calculate_mortgage_payment(acc.original_loan_amount, safe_interest_rate, acc.amortisation_period_years)
-        
+
+        safe_interest_rate, monthly_repayment = schedule.month(context, month, current_bal)
+
         if monthly_repayment > 0:
             if (current_bal + monthly_repayment) > 0:
                 monthly_repayment = abs(current_bal)
-            
-            payment_account_id = acc.payment_from_account_id
+
+            payment_account_id = schedule.account.payment_from_account_id
             if payment_account_id and payment_account_id in context.account_balances:
                 context.account_balances[payment_account_id] -= monthly_repayment
                 if payment_account_id not in context.flows: context.flows[payment_account_id] = {}
                 if "mortgage_payments_out" not in context.flows[payment_account_id]: context.flows[payment_account_id]["mortgage_payments_out"] = 0
                 context.flows[payment_account_id]["mortgage_payments_out"] += monthly_repayment
 
-            context.account_balances[acc.id] += monthly_repayment
-            if acc.id not in context.flows: context.flows[acc.id] = {}
-            if "mortgage_repayments_in" not in context.flows[acc.id]: context.flows[acc.id]["mortgage_repayments_in"] = 0
-            context.flows[acc.id]["mortgage_repayments_in"] += monthly_repayment
-
-            # Calculate Interest Component for reporting
-            # Interest is charged on the balance BEFORE repayment, or after?
-            # The test 'test_run_projection_with_mortgage' implies interest is calculated on the reduced balance
-            # (Principal - Repayment).
+            context.account_balances[acc_id] += monthly_repayment
+            if acc_id not in context.flows: context.flows[acc_id] = {}
+            if "mortgage_repayments_in" not in context.flows[acc_id]: context.flows[acc_id]["mortgage_repayments_in"] = 0
+            context.flows[acc_id]["mortgage_repayments_in"] += monthly_repayment
 
+            # Model: 1. apply the repayment (balance moves towards 0), 2. charge interest on what is left
+            # (test_run_projection_with_mortgage expects interest on Principal - Repayment)
             monthly_interest_rate = safe_interest_rate / 100 / 12
-            # Balance after repayment is (current_bal + monthly_repayment)
-            # Since balances are negative, abs(current_bal + monthly_repayment) is the debt remaining.
-            interest_charge = abs(current_bal + monthly_repayment) * monthly_interest_rate
-
-            # Interest increases the debt (makes balance more negative)
-            # But here we are just tracking flows or adjusting balance?
-            # Standard Mortgage Model: Balance already includes interest accrual?
-            # Or do we add interest now?
-
-            # The model seems to be:
-            # 1. Apply Repayment (Balance goes UP towards 0)
-            # 2. Apply Interest (Balance goes DOWN away from 0)
-
-            # Currently we only applied repayment.
-            # We must apply interest charge.
-
-            interest_charge_int = int(interest_charge)
-            context.account_balances[acc.id] -= interest_charge_int
-
-            if "interest" not in context.flows[acc.id]: context.flows[acc.id]["interest"] = 0
-            # Interest is a cost, so negative flow? Or just magnitude?
-            # The test expects interest < 0?
-            # "test_engine_standard_mortgage asserts interest < 0"
-            context.flows[acc.id]["interest"] -= interest_charge_int
+            interest_charge_int = int(abs(current_bal + monthly_repayment) * monthly_interest_rate)
+            context.account_balances[acc_id] -= interest_charge_int
+
+            # Interest is a cost: tracked as a negative flow (test_engine_standard_mortgage asserts interest < 0)
+            if "interest" not in context.flows[acc_id]: context.flows[acc_id]["interest"] = 0
+            context.flows[acc_id]["interest"] -= interest_charge_int
+
+        schedule.expected_balance = context.account_balances[acc_id]
+
+def render_schedules(context: ProjectionContext) -> List[schemas.MortgageSchedule]:
+    """The regime changes of every mortgage the projection paid, for the mortgage analysis view."""
+    return [schemas.MortgageSchedule.model_construct(account_id=acc_id, account_name=schedule.account.name, segments=schedule.segments)
+            for acc_id, schedule in context.compiled.get("mortgages", {}).items() if schedule.segments]
@@ -1,157 +1,163 @@
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
 from app import models, enums, schemas
 from app.engine.context import ProjectionContext
-from dateutil.relativedelta import relativedelta
+from app.engine.rule_logs import LogReason, RuleLogEntry
+from app.engine.classes import AccountClass
+from app.engine.helpers import month_ordinal
 from app.services.tax import TaxService
 import logging
 
 logger = logging.getLogger(__name__)
 
+@dataclass
+class VestingTable:
+    """
+    One RSU grant compiled at projection start: target unvested units and vest price by months since grant
+    (the k-th month starts k whole months after the grant date). Only months on the vesting cadence are
+    eligible; past the last tranche the target stays at its final value.
+    """
+    account: models.Account
+    # month_ordinal of the month with months_elapsed == 0
+    base_month: int
+    quarterly: bool
+    # targets[k]: units still unvested after the vest k months in
+    targets: List[int]
+    price_gbp: int
+    growth_rate: float
+    _prices: Dict[int, int] = field(default_factory=dict)
+
+    def target(self, months_elapsed: int) -> int:
+        return self.targets[months_elapsed] if months_elapsed < len(self.targets) else self.targets[-1]
+
+    def price(self, months_elapsed: int) -> int:
+        price = self._prices.get(months_elapsed)
+        if price is None:
+            price = self._prices[months_elapsed] = int(self.price_gbp * (1 + self.growth_rate) ** (months_elapsed / 12.0))
+        return price
+
+def _vested_percent(schedule: list, months_elapsed: int) -> float:
+    """Cumulative percent vested after months_elapsed: whole tranches, plus the current year's tranche pro rata."""
+    target_vested_percent = 0.0
+    previous_years_end_month = 0
+    for tranche in sorted(schedule, key=lambda x: x.get('year', 99)):
+        year_end_month = tranche.get('year') * 12
+        percent = tranche.get('percent', 0)
+        if months_elapsed >= year_end_month:
+            target_vested_percent += percent
+        elif months_elapsed > previous_years_end_month:
+            months_into_year = months_elapsed - previous_years_end_month
+            fraction = months_into_year / 12.0 # Simple linear for both
+            target_vested_percent += (percent * fraction)
+            break
+        previous_years_end_month = year_end_month
+    return target_vested_percent
+
+def compile_grant(scenario: models.Scenario, acc: models.Account) -> Optional[VestingTable]:
+    """The grant's vesting table, or None if it never vests (no grant date or schedule)."""
+    if not acc.grant_date or not acc.vesting_schedule: return None
+    schedule = acc.vesting_schedule
+    if not isinstance(schedule, list): return None
+
+    # Robust Cadence Get
+    cadence = getattr(acc, 'vesting_cadence', 'monthly')
+    if hasattr(cadence, 'value'): cadence = cadence.value
+    cadence = str(cadence) if cadence else 'monthly'
+
+    # Grant Jan 1 -> Feb 1 is 1 month in. A grant later in the month completes its first month on the
+    # 1st of the month after next (relativedelta(current_month, grant_date) counting whole months).
+    base_month = month_ordinal(acc.grant_date) + (1 if acc.grant_date.day > 1 else 0)
+
+    # --- FIX: Divide stored balance by 100 to get actual units ---
+    # DB stores '401' as '40100' (pence logic). We need '401'.
+    original_units = acc.starting_balance / 100.0
+    # Every tranche has fully vested after the last one's year
+    last_month = max(0, max(tranche.get('year') * 12 for tranche in schedule))
+    targets = [int(original_units * (1.0 - (_vested_percent(schedule, months_elapsed) / 100.0)))
+               for months_elapsed in range(last_month + 1)]
+
+    # Price is in Pence (e.g. 1000p = £10). Value = Units * Price (Pence) = Pence Value
+    unit_price = acc.unit_price if acc.unit_price is not None else 0
+    price_gbp = unit_price
+    if acc.currency == enums.Currency.USD:
+        rate = scenario.gbp_to_usd_rate if scenario.gbp_to_usd_rate and scenario.gbp_to_usd_rate > 0 else 1.25
+        price_gbp = int(unit_price / rate)
+
+    return VestingTable(account=acc, base_month=base_month, quarterly=(cadence == 'quarterly'), targets=targets,
+                        price_gbp=price_gbp, growth_rate=(acc.interest_rate or 0.0) / 100.0)
+
+def compile_grants(scenario: models.Scenario, context: ProjectionContext) -> List[VestingTable]:
+    tables = []
+    for acc in context.classes.accounts(AccountClass.RSU):
+        try:
+            table = compile_grant(scenario, acc)
+        except Exception as e:
+            logger.error(f"Error compiling RSU {acc.name} ({acc.id}): {e}", exc_info=True)
+            continue
+        if table is not None: tables.append(table)
+    return tables
+
 def process_rsu_vesting(scenario: models.Scenario, context: ProjectionContext):
     """
     Process RSU vesting events.
-    Handles 'monthly' and 'quarterly' vesting cadences.
+    Handles 'monthly' and 'quarterly' vesting cadences, from the grants' compiled vesting tables.
     """
-    for acc in context.all_accounts:
-        if acc.account_type != enums.AccountType.RSU_GRANT: continue
-        
-        try:
-            if not acc.grant_date or not acc.vesting_schedule: continue
-            schedule = acc.vesting_schedule
-            if not isinstance(schedule, list): continue
-            
-            unit_price = acc.unit_price if acc.unit_price is not None else 0
-            current_month = context.month_start
-            grant_date = acc.grant_date
-            
-            # Robust Cadence Get
-            cadence = getattr(acc, 'vesting_cadence', 'monthly')
-            if hasattr(cadence, 'value'): cadence = cadence.value
-            cadence = str(cadence) if cadence else 'monthly'
-            
-            is_quarterly = (cadence == 'quarterly')
-            
-            delta = relativedelta(current_month, grant_date)
-            months_elapsed = delta.years * 12 + delta.months
-            
-            # FIX: If we are exactly on the start date, months_elapsed might be 0, but if we vest immediately?
-            # Usually grants have a cliff.
-            # The issue "date logic in rsu.py might be off by one month" implies we might need to check if we are AT the month.
+    tables = context.compiled.get("rsu")
+    if tables is None:
+        tables = context.compiled["rsu"] = compile_grants(scenario, context)
+    if not tables: return
+    month = month_ordinal(context.month_start)
 
-            # If the grant date is 2024-01-01, and current month is 2025-01-01. Delta is 1 year exactly.
-            # But relativedelta(2025-01-01, 2024-01-01) gives 1 year. months_elapsed = 12.
-            # This seems correct for "vesting starts after 1 year".
+    for table in tables:
+        months_elapsed = month - table.base_month
+        if months_elapsed <= 0: continue
+        if table.quarterly and (months_elapsed % 3 != 0): continue
 
-            # However, if the vesting is monthly starting from grant date?
-            # Usually RSU grants have a "Vesting Start Date" which is Grant Date.
-            # And the first vest is usually after 1 month or 1 year cliff.
+        acc = table.account
+        target_remaining_units = table.target(months_elapsed)
 
-            # If standard monthly vesting:
-            # Grant Jan 1. Feb 1 (1 month later) -> 1/48th vests.
+        # Fetch current balance (units * 100) from Simulation State
+        current_units = context.account_balances.get(acc.id, 0) / 100.0
+        units_to_vest = current_units - target_remaining_units
 
-            if months_elapsed <= 0: continue
+        if units_to_vest > current_units: units_to_vest = current_units
+        if units_to_vest <= 0: continue
 
-            if is_quarterly and (months_elapsed % 3 != 0): 
-                continue
+        gross_value = int(units_to_vest * table.price(months_elapsed))
 
-            target_vested_percent = 0.0
-            sorted_schedule = sorted(schedule, key=lambda x: x.get('year', 99))
-            previous_years_end_month = 0
-            
-            for tranche in sorted_schedule:
-                year_num = tranche.get('year')
-                percent = tranche.get('percent', 0)
-                year_end_month = year_num * 12
-                year_start_month = previous_years_end_month
-                
-                if months_elapsed >= year_end_month:
-                    target_vested_percent += percent
-                elif months_elapsed > year_start_month:
-                    months_into_year = months_elapsed - year_start_month
-                    fraction = months_into_year / 12.0 # Simple linear for both
-                    target_vested_percent += (percent * fraction)
-                    break 
-                previous_years_end_month = year_end_month
-
-            # --- FIX: Divide stored balance by 100 to get actual units ---
-            # DB stores '401' as '40100' (pence logic). We need '401'.
-            original_units = acc.starting_balance / 100.0
-            
-            target_remaining_units = int(original_units * (1.0 - (target_vested_percent / 100.0)))
-            
-            # Fetch current balance (units * 100) from Simulation State
-            current_units_raw = context.account_balances.get(acc.id, 0)
-            current_units = current_units_raw / 100.0
-            
-            units_to_vest = current_units - target_remaining_units
-            
-            if units_to_vest > current_units: units_to_vest = current_units
-            if units_to_vest <= 0: continue
-
-            # Calculate Value
-            # Price is in Pence (e.g. 1000p = £10). 
-            # Value = Units * Price (Pence) = Pence Value
-            price_gbp = unit_price 
-            if acc.currency == enums.Currency.USD:
-                rate = scenario.gbp_to_usd_rate if scenario.gbp_to_usd_rate and scenario.gbp_to_usd_rate > 0 else 1.25
-                price_gbp = int(unit_price / rate)
-                
-            years_float = months_elapsed / 12.0
-            growth_rate = (acc.interest_rate or 0.0) / 100.0
-            growth_factor = (1 + growth_rate) ** years_float
-            current_price_gbp = int(price_gbp * growth_factor)
-            
-            gross_value = int(units_to_vest * current_price_gbp)
-            
-            # Tax Logic
-            owner_id = acc.owners[0].id if acc.owners else None
-            tax_deducted = 0
-            ni_deducted = 0
-            
-            if owner_id:
-                if owner_id not in context.ytd_earnings:
-                    context.ytd_earnings[owner_id] = {'taxable': 0, 'ni': 0}
-                ytd = context.ytd_earnings[owner_id]
-                current_taxable = ytd['taxable']
-                tax_before = TaxService._calculate_income_tax(current_taxable / 100.0) * 100
-                tax_after = TaxService._calculate_income_tax((current_taxable + gross_value) / 100.0) * 100
-                income_tax_due = int(tax_after - tax_before)
-                ni_due = int(gross_value * 0.02)
-                
-                tax_deducted = income_tax_due
-                ni_deducted = ni_due
-                
-                context.ytd_earnings[owner_id]['taxable'] += gross_value
-                context.flows[acc.id]['tax'] += (tax_deducted + ni_deducted)
-
-            net_proceeds = gross_value - tax_deducted - ni_deducted
+        # Tax Logic
+        owner_id = acc.owners[0].id if acc.owners else None
+        tax_deducted = 0
+        ni_deducted = 0
+        
+        if owner_id:
+            if owner_id not in context.ytd_earnings:
+                context.ytd_earnings[owner_id] = {'taxable': 0, 'ni': 0}
+            ytd = context.ytd_earnings[owner_id]
+            current_taxable = ytd['taxable']
+            tax_before = TaxService._calculate_income_tax(current_taxable / 100.0) * 100
+            tax_after = TaxService._calculate_income_tax((current_taxable + gross_value) / 100.0) * 100
+            income_tax_due = int(tax_after - tax_before)
+            ni_due = int(gross_value * 0.02)
             
-            # Execute Movements
-            # We deduct units (x100) from RSU account
-            units_to_remove_raw = int(units_to_vest * 100)
-            context.account_balances[acc.id] -= units_to_remove_raw
+            tax_deducted = income_tax_due
+            ni_deducted = ni_due
             
-            target_id = acc.rsu_target_account_id
-            if target_id and target_id in context.account_balances:
-                context.account_balances[target_id] += net_proceeds
-                context.flows[target_id]['transfers_in'] += net_proceeds
-
-            # Log the event
-            # Using dict as intermediate, context expects lists which get validated later.
-            # However, core.py validates against ProjectionResult -> rule_logs: List[RuleExecutionLog]
-            # RuleExecutionLog has: date, rule_type, action, amount, source_account, target_account, reason
-
-            # The test just checks `log.rule_type == "RSU Vest"`.
-
-            context.rule_logs.append({
-                "date": context.month_start,
-                "rule_type": "RSU Vest",
-                "action": "Vest",
-                "amount": net_proceeds,
-                "source_account": acc.name,
-                "target_account": "Target", # We could lookup target name
-                "reason": f"Vested {units_to_vest:.2f} units"
-            })
+            context.ytd_earnings[owner_id]['taxable'] += gross_value
+            context.flows[acc.id]['tax'] += (tax_deducted + ni_deducted)
+
+        net_proceeds = gross_value - tax_deducted - ni_deducted
         
-        except Exception as e:
-            logger.error(f"Error processing RSU {acc.name} ({acc.id}): {e}", exc_info=True)
-            continue
+        # Execute Movements
+        # We deduct units (x100) from RSU account
+        units_to_remove_raw = int(units_to_vest * 100)
+        context.account_balances[acc.id] -= units_to_remove_raw
+        
+        target_id = acc.rsu_target_account_id
+        if target_id and target_id in context.account_balances:
+            context.account_balances[target_id] += net_proceeds
+            context.flows[target_id]['transfers_in'] += net_proceeds
+
+        if context.log_level != "off":
+            logged_target = target_id if target_id and target_id in context.account_balances else None
+            context.rule_logs.append(RuleLogEntry(context.month_index, acc.id, net_proceeds, LogReason.RSU_VEST, logged_target, units_to_vest))
@@ -1,112 +1,164 @@
-from app import models, enums, utils, schemas
+from dataclasses import dataclass
+from typing import FrozenSet, List, Optional
+from app import models, schemas
 from app.engine.context import ProjectionContext
-from app.engine.helpers import _get_enum_value, get_contribution_headroom, track_contribution, calculate_disposal_impact
+from app.engine.rule_logs import LogReason, RuleLogEntry, TRIMMED
+from app.engine.classes import AccountClass
+from app.engine.helpers import _get_enum_value, month_ordinal, get_contribution_headroom, track_contribution, calculate_disposal_impact
 from app.services.tax import TaxService
 
-def process_rules(scenario: models.Scenario, context: ProjectionContext):
+QUARTER_MONTHS = frozenset((1, 4, 7, 10))
+RULE_KINDS = ("sweep", "top_up", "transfer", "mortgage_smart")
+
+@dataclass(frozen=True)
+class RuleOp:
+    """One automation rule with everything that doesn't change month to month resolved up front."""
+    rule: models.AutomationRule
+    kind: str
+    # Fire months: ordinal window (year * 12 + month - 1) and months of the year (None = every month)
+    first_month: Optional[int]
+    last_month: Optional[int]
+    months_of_year: Optional[FrozenSet[int]]
+    source_id: int
+    target_id: Optional[int]
+    source_account: Optional[models.Account]
+    trigger: int
+    transfer_value: int
+    # mortgage_smart: allowance percentage and the month its allowance resets
+    percentage: float
+    reset_month: int
+    state_key: str
+    target_is_mortgage: bool
+
+    def fires(self, month: int, month_of_year: int) -> bool:
+        if self.first_month is not None and month < self.first_month: return False
+        if self.last_month is not None and month > self.last_month: return False
+        return self.months_of_year is None or month_of_year in self.months_of_year
+
+def compile_rules(scenario: models.Scenario, context: ProjectionContext) -> List[RuleOp]:
+    """Deduplicated, priority-ordered rule program; rules that can never fire are dropped."""
     seen_ids = set(); unique_rules = []
     for r in scenario.automation_rules:
         if r.id not in seen_ids: unique_rules.append(r); seen_ids.add(r.id)
-    
-    sorted_rules = sorted(unique_rules, key=lambda r: r.priority)
-    
-    for rule in sorted_rules:
-        # Date checks
-        if rule.start_date and context.month_start < rule.start_date.replace(day=1): continue
-        if rule.end_date and context.month_start > rule.end_date: continue
-
-        # Robust Cadence
-        cadence_str = _get_enum_value(rule.cadence)
-        should_run = False
-        
+
+    accounts = {a.id: a for a in context.all_accounts}
+    scenario_accounts = {a.id: a for a in scenario.accounts}
+    program = []
+    for rule in sorted(unique_rules, key=lambda r: r.priority):
+        kind = _get_enum_value(rule.rule_type)
+        cadence = _get_enum_value(rule.cadence)
+        if kind not in RULE_KINDS: continue
+
         start_month = rule.start_date.month if rule.start_date else 1
-        start_year = rule.start_date.year if rule.start_date else context.month_start.year # Default to current year if None? Or meaningless for 'once'?
+        first = month_ordinal(rule.start_date) if rule.start_date else None
+        # Every month whose 1st is on or before end_date, i.e. up to and including end_date's month
+        last = month_ordinal(rule.end_date) if rule.end_date else None
+        if cadence == 'once':
+            # Fires in its start month only (never without a start date)
+            if first is None: continue
+            months_of_year, last = None, first if last is None else min(first, last)
+        elif cadence == 'monthly': months_of_year = None
+        elif cadence == 'quarterly': months_of_year = QUARTER_MONTHS
+        elif cadence == 'annually': months_of_year = frozenset((start_month,))
+        else: continue
+        if first is not None and last is not None and last < first: continue
 
-        if cadence_str == 'once':
-            if rule.start_date and context.month_start.year == start_year and context.month_start.month == start_month: should_run = True
-        elif cadence_str == 'monthly': should_run = True
-        elif cadence_str == 'quarterly' and context.month_start.month in [1, 4, 7, 10]: should_run = True
-        elif cadence_str == 'annually' and context.month_start.month == start_month: should_run = True 
-        
-        if not should_run: continue
+        target = scenario_accounts.get(rule.target_account_id)
+        program.append(RuleOp(
+            rule=rule, kind=kind, first_month=first, last_month=last, months_of_year=months_of_year,
+            source_id=rule.source_account_id, target_id=rule.target_account_id,
+            source_account=accounts.get(rule.source_account_id),
+            trigger=int(rule.trigger_value), transfer_value=int(rule.transfer_value or 0),
+            percentage=rule.transfer_value or 10.0, reset_month=start_month, state_key=f"rule_{rule.id}",
+            target_is_mortgage=target is not None and bool(context.classes.of(target.id) & AccountClass.MORTGAGE),
+        ))
+    return program
+
+def process_rules(scenario: models.Scenario, context: ProjectionContext):
+    program = context.compiled.get("rules")
+    if program is None:
+        program = context.compiled["rules"] = compile_rules(scenario, context)
+    if not program: return
 
-        source_id = rule.source_account_id
-        target_id = rule.target_account_id
+    month = month_ordinal(context.month_start)
+    month_of_year = context.month_start.month
+    balances = context.account_balances
+
+    for op in program:
+        if not op.fires(month, month_of_year): continue
+
+        rule = op.rule
+        source_id = op.source_id
+        target_id = op.target_id
         
-        if source_id not in context.account_balances: continue
+        if source_id not in balances: continue
         
-        source_bal = context.account_balances[source_id]
-        target_bal = context.account_balances.get(target_id, 0)
-        source_acc = next((a for a in context.all_accounts if a.id == source_id), None)
+        source_bal = balances[source_id]
+        target_bal = balances.get(target_id, 0)
+        source_acc = op.source_account
         
-        # Robust Rule Type
-        rule_type_str = _get_enum_value(rule.rule_type)
-        trigger_pence = int(rule.trigger_value)
+        rule_type_str = op.kind
+        trigger_pence = op.trigger
         
         transfer_amount = 0
-        reason = ""
+        reason = 0
 
         if rule_type_str == 'sweep':
             if source_bal > trigger_pence:
                 transfer_amount = source_bal - trigger_pence
-                reason = "Sweep"
+                reason = LogReason.SWEEP
         elif rule_type_str == 'top_up' and target_id:
             if target_bal < trigger_pence:
                 deficit = trigger_pence - target_bal
                 transfer_amount = min(deficit, source_bal) if source_bal > 0 else 0
-                reason = "Top-Up"
+                reason = LogReason.TOP_UP
         elif rule_type_str == 'transfer': # Smart Transfer
-            fixed_val = int(rule.transfer_value or 0)
+            fixed_val = op.transfer_value
             if source_bal >= (trigger_pence + fixed_val):
                 transfer_amount = fixed_val
-                reason = "Smart Transfer"
-            else:
-                reason = "Skipped: Low Funds"
+                reason = LogReason.SMART_TRANSFER
         elif rule_type_str == 'mortgage_smart' and target_id:
-             if target_id in context.account_balances and context.account_balances[target_id] < 0:
-                mortgage_bal = abs(context.account_balances[target_id])
-                percentage = rule.transfer_value or 10.0
-                state_key = f"rule_{rule.id}"
+             if target_id in balances and balances[target_id] < 0:
+                mortgage_bal = abs(balances[target_id])
+                percentage = op.percentage
+                state_key = op.state_key
                 
                 # Init Mortgage Rule State
                 if state_key not in context.mortgage_state:
                     context.mortgage_state[state_key] = {"allowance": 0, "paid": 0}
                 
-                rule_month = rule.start_date.month if rule.start_date else 1
+                rule_month = op.reset_month
                 
                 # Annual Reset of Allowance
-                if context.month_start.month == rule_month:
-                    if state_key in context.mortgage_state:
-                        prev = context.mortgage_state[state_key]
-                        if prev["allowance"] > 0:
-                            context.mortgage_stats.append(schemas.MortgageStat(
-                                year_start=context.month_start.year - 1, 
-                                rule_id=rule.id, 
-                                rule_name=rule.name or "Overpayment Rule", 
-                                allowance=prev["allowance"], 
-                                paid=prev["paid"], 
-                                headroom=(prev["allowance"] - prev["paid"])
-                            ))
+                if month_of_year == rule_month:
+                    prev = context.mortgage_state[state_key]
+                    if prev["allowance"] > 0:
+                        context.mortgage_stats.append(schemas.MortgageStat(
+                            year_start=context.month_start.year - 1, 
+                            rule_id=rule.id, 
+                            rule_name=rule.name or "Overpayment Rule", 
+                            allowance=prev["allowance"], 
+                            paid=prev["paid"], 
+                            headroom=(prev["allowance"] - prev["paid"])
+                        ))
                     allowance = int(mortgage_bal * (percentage / 100.0))
                     context.mortgage_state[state_key] = {"allowance": allowance, "paid": 0}
 
                 state = context.mortgage_state[state_key]
                 remaining = state["allowance"] - state["paid"]
                 
-                months_until = (rule_month - context.month_start.month) % 12
+                months_until = (rule_month - month_of_year) % 12
                 if months_until == 0: months_until = 12
                 
                 if remaining > 0:
                     monthly_slice = int(remaining / months_until)
                     if source_bal >= (trigger_pence + monthly_slice):
                         transfer_amount = monthly_slice
-                        current_debt = abs(context.account_balances[target_id])
+                        current_debt = abs(balances[target_id])
                         if transfer_amount > current_debt: transfer_amount = current_debt
                         
-                        context.mortgage_state[state_key]["paid"] += transfer_amount
-                        reason = "Smart Smooth"
-                    else:
-                        reason = "Skipped: Low Funds"
+                        state["paid"] += transfer_amount
+                        reason = LogReason.SMART_SMOOTH
 
         # Execute Transfer
         if target_id and transfer_amount > 0:
@@ -114,17 +166,16 @@ def process_rules(scenario: models.Scenario, context: ProjectionContext):
             if headroom < 999999999999:
                 if headroom <= 0:
                     transfer_amount = 0
-                    reason = "Skipped: Tax Limit Reached"
-                    context.warnings.append(schemas.ProjectionWarning(date=context.month_start, account_id=target_id, message=f"Tax Limit: Rule '{rule.name}' skipped.", source_type="rule", source_id=rule.id))
+                    context.warn(target_id, "tax_limit_skipped", f"Tax Limit: Rule '{rule.name}' skipped.", "rule", rule.id)
                 elif transfer_amount > headroom:
                     transfer_amount = headroom
-                    reason += " (Trimmed)"
-                    context.warnings.append(schemas.ProjectionWarning(date=context.month_start, account_id=target_id, message=f"Tax Limit: Rule '{rule.name}' trimmed.", source_type="rule", source_id=rule.id))
+                    reason |= TRIMMED
+                    context.warn(target_id, "tax_limit_trimmed", f"Tax Limit: Rule '{rule.name}' trimmed.", "rule", rule.id)
 
         if transfer_amount > 0:
             cgt_tax = 0
             if source_acc:
-                cost_portion, gain = calculate_disposal_impact(transfer_amount, source_bal, context.account_book_costs[source_id], source_acc.account_type, source_acc.tax_wrapper)
+                cost_portion, gain = calculate_disposal_impact(transfer_amount, source_bal, context.account_book_costs[source_id], context.classes.of(source_id))
                 
                 if gain > 0 and source_acc.owners:
                     num_owners = len(source_acc.owners)
@@ -141,25 +192,24 @@ def process_rules(scenario: models.Scenario, context: ProjectionContext):
                 context.account_book_costs[source_id] -= cost_portion
 
             # Perform Move
-            context.account_balances[source_id] -= transfer_amount
+            balances[source_id] -= transfer_amount
             context.flows[source_id]["transfers_out"] += transfer_amount
             context.flows[source_id]["cgt"] += cgt_tax
             
-            target_name = "External"
-            if target_id and target_id in context.account_balances:
+            logged_target = None
+            if target_id and target_id in balances:
                 net_received = transfer_amount - cgt_tax
-                context.account_balances[target_id] += net_received
+                balances[target_id] += net_received
                 context.account_book_costs[target_id] += net_received
                 
                 context.flows[target_id]["transfers_in"] += net_received
                 track_contribution(context, target_id, net_received)
                 
-                acc = next((a for a in scenario.accounts if a.id == target_id), None)
-                if acc: target_name = acc.name
-                if acc and _get_enum_value(acc.account_type) == "Mortgage":
+                logged_target = target_id
+                if op.target_is_mortgage:
                     context.flows[target_id]["mortgage_repayments_in"] += net_received
             else:
                  context.flows[source_id]["events"] += transfer_amount
                  
-            src_name = next((a.name for a in scenario.accounts if a.id == source_id), "?")
-            context.rule_logs.append(schemas.RuleExecutionLog(date=context.month_start, rule_type=rule_type_str, action=f"Moved {utils.format_currency(transfer_amount)}", amount=int(transfer_amount), source_account=src_name, target_account=target_name, reason=reason))
+            if context.log_level != "off":
+                context.rule_logs.append(RuleLogEntry(context.month_index, rule.id, int(transfer_amount), reason, logged_target))
@@ -37,14 +37,14 @@ def process_transfers(scenario: models.Scenario, context: ProjectionContext):
             
         if should:
             if transfer.show_on_chart:
-                context.annotations.append(schemas.ProjectionAnnotation(date=context.month_start, label=transfer.name, type="transaction"))
+                context.annotate(transfer.name, "transaction")
             
             headroom = get_contribution_headroom(context, transfer.to_account_id, scenario.tax_limits)
             if headroom < value:
-                context.warnings.append(schemas.ProjectionWarning(date=context.month_start, account_id=transfer.to_account_id, message=f"Tax Limit: Transfer exceeds allowance.", source_type="transfer", source_id=transfer.id))
+                context.warn(transfer.to_account_id, "tax_limit_exceeded", "Tax Limit: Transfer exceeds allowance.", "transfer", transfer.id)
 
             cgt_tax = 0
-            cost_portion, gain = calculate_disposal_impact(value, context.account_balances[from_account.id], context.account_book_costs[from_account.id], from_account.account_type, from_account.tax_wrapper)
+            cost_portion, gain = calculate_disposal_impact(value, context.account_balances[from_account.id], context.account_book_costs[from_account.id], context.classes.of(from_account.id))
             
             if gain > 0 and from_account.owners:
                 num_owners = len(from_account.owners)
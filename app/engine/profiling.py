@@ -0,0 +1,122 @@
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from app.services.tax import TaxService
+
+# The profiler of the projection currently running in this context (None when profiling is off)
+_active_profiler: ContextVar[Optional["ProjectionProfiler"]] = ContextVar("active_profiler", default=None)
+
+TAX_SERVICE_METHODS = [
+    "calculate_capital_gains_tax",
+    "calculate_savings_tax",
+    "calculate_payroll_deductions",
+    "calculate_tax_on_vest",
+    "_calculate_income_tax",
+    "_calculate_national_insurance",
+]
+
+class ProjectionProfiler:
+    """
+    Collects cumulative wall time and call counts for one projection run.
+    Only created when profiling is requested, so the unprofiled engine pays nothing.
+    """
+
+    def __init__(self):
+        self.sections: Dict[str, Dict[str, Dict[str, float]]] = {"processors": {}, "phases": {}, "tax": {}}
+        self._open: Dict[str, float] = {}
+        self._started = time.perf_counter()
+        self._token = None
+
+    def record(self, group: str, name: str, elapsed: float):
+        entry = self.sections[group].get(name)
+        if entry is None:
+            entry = self.sections[group][name] = {"calls": 0, "seconds": 0.0}
+        entry["calls"] += 1
+        entry["seconds"] += elapsed
+
+    def call(self, name: str, fn, *args):
+        t0 = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            self.record("processors", name, time.perf_counter() - t0)
+
+    def start(self, phase: str):
+        self._open[phase] = time.perf_counter()
+
+    def stop(self, phase: str):
+        self.record("phases", phase, time.perf_counter() - self._open.pop(phase))
+
+    def __enter__(self):
+        _acquire_tax_instrumentation()
+        self._token = _active_profiler.set(self)
+        return self
+
+    def __exit__(self, *exc):
+        _active_profiler.reset(self._token)
+        _release_tax_instrumentation()
+        return False
+
+    def report(self, months: int) -> dict:
+        total = time.perf_counter() - self._started
+        out = {
+            "months": months,
+            "total_ms": round(total * 1000, 3),
+            "months_per_second": round(months / total, 1) if total > 0 else None,
+        }
+        for group, entries in self.sections.items():
+            out[group] = {
+                name: {
+                    "calls": int(e["calls"]),
+                    "total_ms": round(e["seconds"] * 1000, 3),
+                    "mean_us": round(e["seconds"] / e["calls"] * 1e6, 2) if e["calls"] else 0,
+                }
+                for name, e in sorted(entries.items(), key=lambda kv: -kv[1]["seconds"])
+            }
+        return out
+
+
+# --- TaxService instrumentation ---
+# Timing wrappers are installed on TaxService only while at least one profiled projection
+# is running, and they only record into the profiler bound to the caller's context.
+_instrument_lock = threading.Lock()
+_instrument_depth = 0
+_original_methods: Dict[str, staticmethod] = {}
+
+def _timed(name: str, fn):
+    label = f"TaxService.{name}"
+
+    def wrapper(*args, **kwargs):
+        profiler = _active_profiler.get()
+        if profiler is None:
+            return fn(*args, **kwargs)
+        t0 = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            profiler.record("tax", label, time.perf_counter() - t0)
+
+    wrapper.__name__ = fn.__name__
+    wrapper.__doc__ = fn.__doc__
+    return wrapper
+
+def _acquire_tax_instrumentation():
+    global _instrument_depth
+    with _instrument_lock:
+        if _instrument_depth == 0:
+            for name in TAX_SERVICE_METHODS:
+                original = TaxService.__dict__[name]
+                _original_methods[name] = original
+                setattr(TaxService, name, staticmethod(_timed(name, original.__func__)))
+        _instrument_depth += 1
+
+def _release_tax_instrumentation():
+    global _instrument_depth
+    with _instrument_lock:
+        _instrument_depth -= 1
+        if _instrument_depth == 0:
+            for name, original in _original_methods.items():
+                setattr(TaxService, name, original)
+            _original_methods.clear()
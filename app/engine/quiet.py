@@ -0,0 +1,92 @@
+from dataclasses import dataclass
+from typing import Iterable, Optional, Tuple
+from app import models
+from .context import ProjectionContext
+from .classes import AccountClass
+from .helpers import _get_enum_value, month_ordinal
+from .processors import rules, rsu
+
+# No scheduled entity ever stops (something open-ended recurs forever)
+NEVER = None
+
+def _last_month(start, end, cadence: str) -> Optional[int]:
+    """Last month ordinal a dated, cadenced entity can act in (NEVER if open-ended)."""
+    if cadence == 'once':
+        return month_ordinal(start) if end is None else min(month_ordinal(start), month_ordinal(end))
+    return NEVER if end is None else month_ordinal(end)
+
+def _scheduled_ends(scenario: models.Scenario, context: ProjectionContext) -> Iterable[Optional[int]]:
+    for owner in scenario.owners:
+        for inc in owner.income_sources:
+            if inc.start_date is None: continue
+            yield _last_month(inc.start_date, inc.end_date, _get_enum_value(inc.cadence))
+    for cost in scenario.costs:
+        if cost.start_date is None: continue
+        yield _last_month(cost.start_date, cost.end_date, _get_enum_value(cost.cadence))
+    for transfer in scenario.transfers:
+        yield _last_month(transfer.start_date, transfer.end_date, _get_enum_value(transfer.cadence))
+    for event in scenario.financial_events:
+        if event.event_date is not None: yield month_ordinal(event.event_date)
+    for op in context.compiled["rules"]:
+        yield op.last_month
+    for table in context.compiled["rsu"]:
+        # Past its last tranche the grant's target is constant (only a balance above it vests; see is_quiet)
+        yield table.base_month + len(table.targets) - 1
+
+def _drawable(mask: int) -> bool:
+    return bool(mask & (AccountClass.ISA | AccountClass.PENSION)) or not mask & AccountClass.WRAPPED
+
+@dataclass
+class QuietSchedule:
+    """
+    When a month can be "quiet": nothing but growth happens in it. Quiet months run the growth processor
+    alone (the quiet processors of pipeline.PIPELINE), which is most of late-life and goal-seek projections.
+
+    Statically, every income, cost, transfer, event, rule and RSU tranche must be past its last month.
+    The rest depends on the balances at the start of the month: a debt still being paid, a cash deficit
+    that decumulation has something to sell down for, or RSU units above the grant's final target all
+    keep the month busy.
+    """
+    # Quiet is possible from this month ordinal on (None: never)
+    quiet_from: Optional[int]
+    # (account id, final unvested target) of every compiled grant
+    grants: Tuple[Tuple[int, int], ...]
+    cash_ids: Tuple[int, ...]
+    # Accounts decumulation sells down (GIA, ISA or pension)
+    drawable_ids: Tuple[int, ...]
+    mortgage_ids: Tuple[int, ...]
+
+    @classmethod
+    def compile(cls, scenario: models.Scenario, context: ProjectionContext) -> "QuietSchedule":
+        # Shared with the processors, which then skip their own compile
+        if context.compiled.get("rules") is None: context.compiled["rules"] = rules.compile_rules(scenario, context)
+        if context.compiled.get("rsu") is None: context.compiled["rsu"] = rsu.compile_grants(scenario, context)
+        last = month_ordinal(context.month_start) - 1
+        for end in _scheduled_ends(scenario, context):
+            if end is NEVER:
+                last = NEVER
+                break
+            last = max(last, end)
+        return cls(quiet_from=None if last is NEVER else last + 1,
+                   grants=tuple((table.account.id, table.targets[-1]) for table in context.compiled["rsu"]),
+                   cash_ids=context.classes.ids(AccountClass.CASH),
+                   drawable_ids=tuple(acc.id for acc in context.classes.accounts(AccountClass.INVESTMENT | AccountClass.CASH)
+                                      if _drawable(context.classes.of(acc.id))),
+                   mortgage_ids=context.classes.ids(AccountClass.MORTGAGE))
+
+    def is_quiet(self, context: ProjectionContext) -> bool:
+        if self.quiet_from is None or month_ordinal(context.month_start) < self.quiet_from: return False
+        balances = context.account_balances
+        for acc_id in self.mortgage_ids:
+            if balances.get(acc_id, 0) < 0: return False
+        if any(balances.get(acc_id, 0) < 0 for acc_id in self.cash_ids):
+            if any(balances.get(acc_id, 0) > 0 for acc_id in self.drawable_ids): return False
+        for acc_id, target in self.grants:
+            if balances.get(acc_id, 0) / 100.0 - target > 0: return False
+        return True
+
+def quiet_schedule(scenario: models.Scenario, context: ProjectionContext) -> QuietSchedule:
+    schedule = context.compiled.get("quiet")
+    if schedule is None:
+        schedule = context.compiled["quiet"] = QuietSchedule.compile(scenario, context)
+    return schedule
@@ -0,0 +1,54 @@
+from datetime import date
+from typing import Any, Callable, Dict, Hashable, List, Tuple
+
+from app import schemas
+
+class MonthRanges:
+    """
+    Collects items that recur month after month under a key, as contiguous month ranges.
+    Repeats within the same month fold into the current range; a gap of a month or more starts a new one.
+    The payload is built once per range, by the factory passed to add().
+    """
+
+    def __init__(self):
+        # key -> [payload, first_month, last_month, first_date, last_date, months, seq]
+        self._open: Dict[Hashable, list] = {}
+        self._closed: List[list] = []
+        self._seq = 0
+
+    def add(self, key: Hashable, month: int, when: date, payload: Callable[[], Any]):
+        current = self._open.get(key)
+        if current is not None and month - current[2] <= 1:
+            if month != current[2]:
+                current[2] = month
+                current[5] += 1
+            current[4] = when
+            return
+        if current is not None: self._closed.append(current)
+        self._seq += 1
+        self._open[key] = [payload(), month, month, when, when, 1, self._seq]
+
+    def seen(self, key: Hashable) -> bool:
+        return key in self._open
+
+    def __len__(self):
+        return len(self._closed) + len(self._open)
+
+    def ranges(self) -> List[Tuple[Any, date, date, int]]:
+        """(payload, first date, last date, months) in the order ranges started."""
+        entries = sorted(self._closed + list(self._open.values()), key=lambda r: (r[1], r[6]))
+        return [(r[0], r[3], r[4], r[5]) for r in entries]
+
+def render_warnings(collected: MonthRanges) -> List[schemas.ProjectionWarning]:
+    warnings = []
+    for fields, first, last, months in collected.ranges():
+        warnings.append(schemas.ProjectionWarning.model_construct(
+            date=first, end_date=last if months > 1 else None, count=months, **fields))
+    return warnings
+
+def render_annotations(static: List[schemas.ProjectionAnnotation], collected: MonthRanges) -> List[schemas.ProjectionAnnotation]:
+    annotations = list(static)
+    for (label, kind), first, last, months in collected.ranges():
+        annotations.append(schemas.ProjectionAnnotation.model_construct(
+            date=first, end_date=last if months > 1 else None, count=months, label=label, type=kind))
+    return annotations
@@ -1,5 +1,14 @@
 from dateutil.relativedelta import relativedelta
-from app import enums
+from app import enums, schemas
+
+def render_projection_json(result: schemas.ProjectionResult, include_metadata: bool = False) -> bytes:
+    """
+    Serialize a projection straight to JSON bytes.
+    The result is built from engine-produced values, so we go through the pydantic-core
+    serializer directly instead of letting FastAPI re-validate it against the response_model.
+    """
+    exclude = None if include_metadata else {"metadata"}
+    return schemas.ProjectionResult.__pydantic_serializer__.to_json(result, exclude=exclude)
 
 def calculate_gbp_balances(current_balances, accounts, rate, month_start=None):
     gbp_balances = {}
@@ -0,0 +1,119 @@
+import enum
+from datetime import date
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from dateutil.relativedelta import relativedelta
+
+from app import schemas, utils
+from .helpers import _get_enum_value
+
+# Projection request option: no log, one aggregated entry per rule/flow, or every execution
+LOG_LEVELS = ("off", "summary", "full")
+
+class LogReason(enum.IntEnum):
+    SWEEP = 1
+    TOP_UP = 2
+    SMART_TRANSFER = 3
+    SMART_SMOOTH = 4
+    RSU_VEST = 5
+
+# Or-ed into the reason when a tax limit cut the amount down
+TRIMMED = 0x100
+
+REASON_LABELS = {
+    LogReason.SWEEP: "Sweep",
+    LogReason.TOP_UP: "Top-Up",
+    LogReason.SMART_TRANSFER: "Smart Transfer",
+    LogReason.SMART_SMOOTH: "Smart Smooth",
+}
+
+class RuleLogEntry(NamedTuple):
+    """
+    What the engine records per execution. rule_id is the AutomationRule id, or the RSU grant account id
+    for RSU_VEST entries; target_id is None when the money left the scenario.
+    """
+    month: int
+    rule_id: int
+    amount: int
+    reason: int
+    target_id: Optional[int]
+    units: float = 0.0
+
+SORT_KEYS = ("date", "rule_type", "source_account", "target_account", "amount", "reason")
+# Sort keys taken from RuleLogBook._labels, by position in its tuple
+LABEL_COLUMNS = {"rule_type": 0, "source_account": 1, "target_account": 2, "reason": 3}
+
+class RuleLogBook:
+    """Turns recorded RuleLogEntry tuples into RuleExecutionLog rows, only for the rows asked for."""
+
+    def __init__(self, scenario, entries: List[RuleLogEntry]):
+        self.entries = entries
+        self._anchor = scenario.start_date.replace(day=1)
+        self._accounts = {a.id: a.name for a in scenario.accounts}
+        self._rules = {r.id: (_get_enum_value(r.rule_type), self._accounts.get(r.source_account_id, "?"))
+                       for r in scenario.automation_rules}
+        self._dates: Dict[int, date] = {}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _date(self, month: int) -> date:
+        d = self._dates.get(month)
+        if d is None: d = self._dates[month] = self._anchor + relativedelta(months=month)
+        return d
+
+    def _labels(self, entry: RuleLogEntry) -> Tuple[str, str, str, str]:
+        """(rule_type, source_account, target_account, reason)"""
+        reason = entry.reason & ~TRIMMED
+        if reason == LogReason.RSU_VEST:
+            target = self._accounts.get(entry.target_id, "External") if entry.target_id is not None else "External"
+            return "RSU Vest", self._accounts.get(entry.rule_id, "?"), target, f"Vested {entry.units:.2f} units"
+        rule_type, source = self._rules.get(entry.rule_id, ("?", "?"))
+        target = self._accounts.get(entry.target_id, "External") if entry.target_id is not None else "External"
+        label = REASON_LABELS.get(reason, "")
+        if entry.reason & TRIMMED: label += " (Trimmed)"
+        return rule_type, source, target, label
+
+    def materialize(self, entry: RuleLogEntry) -> schemas.RuleExecutionLog:
+        rule_type, source, target, reason = self._labels(entry)
+        action = "Vest" if entry.reason == LogReason.RSU_VEST else f"Moved {utils.format_currency(entry.amount)}"
+        return schemas.RuleExecutionLog.model_construct(
+            date=self._date(entry.month), rule_type=rule_type, action=action, amount=entry.amount,
+            source_account=source, target_account=target, reason=reason)
+
+    def full(self) -> List[schemas.RuleExecutionLog]:
+        return [self.materialize(entry) for entry in self.entries]
+
+    def summary(self) -> List[schemas.RuleExecutionLog]:
+        """One row per (rule, target, reason): total amount, execution count and first/last month."""
+        groups: Dict[tuple, list] = {}
+        for entry in self.entries:
+            key = (entry.rule_id, entry.target_id, entry.reason)
+            group = groups.get(key)
+            if group is None: groups[key] = [entry, entry.amount, 1, entry.month, entry.units]
+            else:
+                group[1] += entry.amount; group[2] += 1; group[3] = entry.month; group[4] += entry.units
+        rows = []
+        for first, total, count, last_month, units in groups.values():
+            rule_type, source, target, reason = self._labels(first._replace(units=units))
+            rows.append(schemas.RuleExecutionLog.model_construct(
+                date=self._date(first.month), last_date=self._date(last_month), count=count,
+                rule_type=rule_type, action=f"Moved {utils.format_currency(total)} in {count} executions",
+                amount=total, source_account=source, target_account=target, reason=reason))
+        return rows
+
+    def render(self, level: str) -> List[schemas.RuleExecutionLog]:
+        if level == "full": return self.full()
+        if level == "summary": return self.summary()
+        return []
+
+    def page(self, offset: int = 0, limit: int = 100, sort: str = "date", descending: bool = False) -> List[schemas.RuleExecutionLog]:
+        """A sorted slice of the full log; only the rows on the page are materialized."""
+        if sort == "date": key = lambda e: e.month
+        elif sort == "amount": key = lambda e: e.amount
+        else:
+            column = LABEL_COLUMNS[sort]
+            key = lambda e: self._labels(e)[column].lower()
+        # Stable sort keeps execution order within equal keys, for either direction
+        ordered = sorted(self.entries, key=key, reverse=descending) if sort != "date" or descending else self.entries
+        return [self.materialize(entry) for entry in ordered[offset:offset + limit]]
@@ -0,0 +1,168 @@
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Optional
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from app import models, schemas
+from .cache import get_compiled_scenario
+from .classes import AccountClasses
+from .probe import probe_projection, PROBE_METRICS
+
+logger = logging.getLogger(__name__)
+
+# Horizon of the baseline projection the headline metrics describe
+METRICS_HORIZON_MONTHS = int(os.getenv("METRICS_HORIZON_MONTHS", "600"))
+# Seconds a scenario must be left alone before its metrics are recomputed; < 0 disables the worker
+METRICS_REFRESH_DELAY = float(os.getenv("METRICS_REFRESH_DELAY", "5.0"))
+# Local hour at which every scenario is re-checked (catches changes missed while the worker was down)
+METRICS_NIGHTLY_HOUR = int(os.getenv("METRICS_NIGHTLY_HOUR", "3"))
+
+def summarize_projection(scenario, result: schemas.ProjectionResult) -> Dict[str, Any]:
+    """Headline KPIs of a projection: net worth, liquidity, debt-free and insolvency dates, tax paid."""
+    points = result.data_points
+    liabilities = AccountClasses(scenario.accounts).liability_total
+
+    # Debt free: the first month liabilities reach zero (None if there were none to start with)
+    debt_free_date = None
+    if liabilities(points[0].account_balances) != 0:
+        debt_free_date = next((point.date for point in points[1:] if liabilities(point.account_balances) == 0), None)
+    insolvency_date = next((point.date for point in points if point.liquid_assets < 0), None)
+    tax_paid = sum(flow.tax + flow.cgt for point in points for flow in point.flows.values())
+    return {
+        "current_net_worth": points[0].balance,
+        "final_net_worth": points[-1].balance,
+        "final_liquid_assets": points[-1].liquid_assets,
+        "debt_free_date": debt_free_date,
+        "insolvency_date": insolvency_date,
+        "tax_paid": tax_paid,
+    }
+
+def refresh_scenario_metrics(db: Session, scenario_id: int, months: int = METRICS_HORIZON_MONTHS,
+                             force: bool = False) -> Optional[models.ScenarioMetrics]:
+    """Recomputes a scenario's stored metrics if they are missing or stale. Returns the row (None if no scenario)."""
+    view = get_compiled_scenario(db, scenario_id)
+    if view is None: return None
+    row = db.get(models.ScenarioMetrics, scenario_id)
+    if row is not None and not force and row.version == view.version and row.months == months:
+        return row
+    # Same values as summarize_projection, without the data points and rule logs of a full run
+    values = probe_projection(db, view, months, metrics=PROBE_METRICS).metrics
+    if row is None:
+        row = models.ScenarioMetrics(scenario_id=scenario_id)
+        db.add(row)
+    row.version, row.months, row.computed_at = view.version, months, datetime.now()
+    for key, value in values.items(): setattr(row, key, value)
+    db.commit()
+    return row
+
+class MetricsRefresher:
+    """
+    Background worker keeping ScenarioMetrics in step with Scenario.version.
+
+    Committed sessions schedule the scenarios whose version they bumped; a scenario is recomputed once it
+    has been left alone for `delay` seconds, so a burst of edits costs one projection. A nightly pass
+    re-checks every scenario. A delay < 0 disables the worker (used by the tests).
+    """
+
+    def __init__(self, delay: float, session_factory=None, months: int = METRICS_HORIZON_MONTHS):
+        self.delay = delay
+        self.months = months
+        self._session_factory = session_factory
+        self._pending: Dict[int, float] = {}
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._nightly: Optional[threading.Thread] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.delay >= 0
+
+    def schedule(self, scenario_ids: Iterable[int]):
+        if not self.enabled: return
+        with self._cond:
+            deadline = time.monotonic() + self.delay
+            for scenario_id in scenario_ids: self._pending[scenario_id] = deadline
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="metrics-refresh", daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+
+    def _factory(self):
+        if self._session_factory is not None: return self._session_factory
+        from ..database import SessionLocal
+        return SessionLocal
+
+    def _session(self) -> Session:
+        return self._factory()()
+
+    def watches(self, session: Session) -> bool:
+        """Only commits against the worker's own database schedule refreshes (not scripts using another engine)."""
+        return session.bind is self._factory().kw.get("bind")
+
+    def refresh(self, scenario_ids: Iterable[int], force: bool = False) -> int:
+        """Refreshes the given scenarios now. Returns how many were processed without error."""
+        done = 0
+        db = self._session()
+        try:
+            for scenario_id in scenario_ids:
+                try:
+                    refresh_scenario_metrics(db, scenario_id, self.months, force=force)
+                    done += 1
+                except Exception:
+                    db.rollback()
+                    logger.exception("Failed to refresh metrics for scenario %s", scenario_id)
+        finally:
+            db.close()
+        return done
+
+    def refresh_all(self, force: bool = False) -> int:
+        """Batch refresh of every scenario (only stale ones unless force=True)."""
+        db = self._session()
+        try:
+            scenario_ids = list(db.execute(select(models.Scenario.id).order_by(models.Scenario.id)).scalars())
+        finally:
+            db.close()
+        return self.refresh(scenario_ids, force=force)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending: self._cond.wait()
+                now = time.monotonic()
+                due = [sid for sid, deadline in self._pending.items() if deadline <= now]
+                if not due:
+                    self._cond.wait(min(self._pending.values()) - now)
+                    continue
+                for scenario_id in due: del self._pending[scenario_id]
+            self.refresh(due)
+
+    def start_nightly(self, hour: int = METRICS_NIGHTLY_HOUR):
+        if not self.enabled or (self._nightly is not None and self._nightly.is_alive()): return
+        self._nightly = threading.Thread(target=self._run_nightly, args=(hour,), name="metrics-nightly", daemon=True)
+        self._nightly.start()
+
+    def _run_nightly(self, hour: int):
+        while True:
+            now = datetime.now()
+            next_run = now.replace(hour=hour, minute=0, second=0, microsecond=0)
+            if next_run <= now: next_run += timedelta(days=1)
+            time.sleep((next_run - now).total_seconds())
+            refreshed = self.refresh_all()
+            logger.info("Nightly metrics refresh checked %s scenarios", refreshed)
+
+METRICS_REFRESHER = MetricsRefresher(delay=METRICS_REFRESH_DELAY)
+
+@event.listens_for(Session, "after_commit")
+def _schedule_metrics_refresh(session):
+    scenario_ids = session.info.pop("bumped_scenario_ids", None)
+    if scenario_ids and METRICS_REFRESHER.enabled and METRICS_REFRESHER.watches(session):
+        METRICS_REFRESHER.schedule(scenario_ids)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_bumped_scenarios(session):
+    session.info.pop("bumped_scenario_ids", None)
@@ -0,0 +1,72 @@
+from typing import Any, Dict, List, Mapping, Optional
+
+from sqlalchemy import inspect
+
+from .overrides import OverrideOverlay, EMPTY_OVERLAY
+
+class EntityView:
+    """
+    Read-only copy of one ORM row's column values (with any overrides applied) as seen by the engine.
+    Relationship collections are plain lists of other views.
+    """
+
+    def __init__(self, values: Dict[str, Any]):
+        object.__setattr__(self, "_columns", tuple(values))
+        self.__dict__.update(values)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is read-only")
+
+    def __repr__(self):
+        return f"<{type(self).__name__} id={self.__dict__.get('id')}>"
+
+class ScenarioView(EntityView):
+    """Compiled scenario graph. Safe to share between concurrent projections."""
+
+def _values(source, overrides: Mapping[str, Any]) -> Dict[str, Any]:
+    if isinstance(source, EntityView):
+        values = {name: source.__dict__[name] for name in source._columns}
+    else:
+        values = {attr.key: getattr(source, attr.key) for attr in inspect(source).mapper.column_attrs}
+    for field, value in overrides.items():
+        if field in values: values[field] = value
+    return values
+
+def _link(view: EntityView, **relations):
+    view.__dict__.update(relations)
+    return view
+
+def compile_scenario(scenario, overlay: Optional[OverrideOverlay] = None) -> ScenarioView:
+    """
+    Snapshot a scenario (ORM object or an existing view) into an immutable engine view,
+    applying the override overlay. The source is only read, never modified.
+    """
+    overlay = overlay or EMPTY_OVERLAY
+
+    def build(items, kind) -> List[EntityView]:
+        return [EntityView(_values(item, overlay.fields_for(kind, item.id))) for item in items]
+
+    owners = [EntityView(_values(o, {})) for o in scenario.owners]
+    accounts = build(scenario.accounts, "account")
+    owner_by_id = {o.id: o for o in owners}
+    account_by_id = {a.id: a for a in accounts}
+
+    for src, view in zip(scenario.owners, owners):
+        _link(view,
+              income_sources=build(src.income_sources, "income"),
+              accounts=[account_by_id[a.id] for a in src.accounts if a.id in account_by_id])
+    for src, view in zip(scenario.accounts, accounts):
+        _link(view, owners=[owner_by_id[o.id] for o in src.owners if o.id in owner_by_id])
+
+    return _link(
+        ScenarioView(_values(scenario, {})),
+        owners=owners,
+        accounts=accounts,
+        costs=build(scenario.costs, "cost"),
+        transfers=build(scenario.transfers, "transfer"),
+        financial_events=build(scenario.financial_events, "event"),
+        automation_rules=build(scenario.automation_rules, "rule"),
+        tax_limits=build(scenario.tax_limits, "tax_limit"),
+        decumulation_strategies=build(scenario.decumulation_strategies, "strategy"),
+        chart_annotations=build(scenario.chart_annotations, "annotation"),
+    )
@@ -1,14 +1,40 @@
 import os
+import time
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse, JSONResponse
-from .routers import scenarios, owners, accounts, projections, rules, transfers, financial_events, costs, income_sources, tax_limits, strategies
+from .routers import scenarios, owners, accounts, projections, rules, transfers, financial_events, costs, income_sources, tax_limits, strategies, metrics as metrics_router
 from .database import engine, Base
+from . import metrics, engine as projection_engine
 
 # Create tables (if not exist)
 Base.metadata.create_all(bind=engine)
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Nightly batch refresh of stored scenario metrics (no-op when the worker is disabled)
+    projection_engine.METRICS_REFRESHER.start_nightly()
+    yield
+
+app = FastAPI(lifespan=lifespan)
+
+# --- REQUEST METRICS ---
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    query_counter = [0]
+    token = metrics.request_query_count.set(query_counter)
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        metrics.request_query_count.reset(token)
+        route_label = metrics.route_template(request.scope)
+        metrics.HTTP_REQUEST_SECONDS.observe(time.perf_counter() - start, method=request.method, route=route_label, status=status)
+        metrics.HTTP_REQUEST_QUERIES.observe(query_counter[0], method=request.method, route=route_label)
 
 # Include Routers with explicit /api prefix
 app.include_router(scenarios.router, prefix="/api", tags=["scenarios"])
@@ -22,6 +48,7 @@ app.include_router(rules.router, prefix="/api", tags=["rules"])
 app.include_router(tax_limits.router, prefix="/api", tags=["tax_limits"])
 app.include_router(strategies.router, prefix="/api", tags=["strategies"]) # <--- NEW ROUTER
 app.include_router(projections.router, prefix="/api", tags=["projections"])
+app.include_router(metrics_router.router, prefix="/api", tags=["metrics"])
 
 # --- MOUNTS ---
 
@@ -0,0 +1,200 @@
+"""
+In-process metrics registry rendered in the Prometheus text exposition format.
+Values live for the lifetime of the process (one registry per worker).
+"""
+import threading
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _format_labels(labelnames: Sequence[str], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra: parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_value(value: float) -> str:
+    if value == float("inf"): return "+Inf"
+    if float(value).is_integer(): return str(int(value))
+    return repr(float(value))
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"] + self._samples()
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def _samples(self):
+        with self._lock: items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}" for k, v in items]
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # key -> [bucket counts..., sum, count]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound: state[i] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def count(self, **labels) -> int:
+        state = self._values.get(self._key(labels))
+        return state[-1] if state else 0
+
+    def _samples(self):
+        with self._lock: items = sorted((k, list(v)) for k, v in self._values.items())
+        lines = []
+        for key, state in items:
+            for bound, cumulative in zip(self.buckets, state):
+                le = 'le="%s"' % _format_value(bound)
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(state[-2])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {state[-1]}")
+        return lines
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, cls, name, *args, **kwargs):
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = cls(name, *args, **kwargs)
+            return self._metrics[name]
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def render(self) -> str:
+        with self._lock: metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+REGISTRY = MetricsRegistry()
+
+# --- HTTP ---
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "marty_http_request_duration_seconds", "HTTP request latency by route template.", ["method", "route", "status"])
+HTTP_REQUEST_QUERIES = REGISTRY.histogram(
+    "marty_http_request_sql_queries", "SQL statements executed per HTTP request.", ["method", "route"],
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500, 1000))
+
+# --- Engine ---
+PROJECTION_SECONDS = REGISTRY.histogram(
+    "marty_projection_duration_seconds", "Wall time of run_projection calls.")
+PROJECTION_MONTHS = REGISTRY.counter(
+    "marty_projection_months_total", "Projection months computed.")
+PROJECTION_SECONDS_TOTAL = REGISTRY.counter(
+    "marty_projection_seconds_total", "Cumulative wall time spent in run_projection.")
+PROJECTION_THROUGHPUT = REGISTRY.histogram(
+    "marty_projection_months_per_second", "Projection throughput per run.",
+    buckets=(50, 100, 250, 500, 1000, 2500, 5000, 10000, 25000, 50000))
+PROJECTION_ENTITIES = REGISTRY.histogram(
+    "marty_projection_scenario_entities", "Scenario complexity (accounts, incomes, costs, transfers, events, rules) per run.",
+    buckets=(5, 10, 25, 50, 100, 250, 500, 1000))
+
+# --- Database ---
+SQL_QUERIES = REGISTRY.counter("marty_sql_queries_total", "SQL statements executed.")
+
+# --- Caches ---
+CACHE_REQUESTS = REGISTRY.counter("marty_cache_requests_total", "Cache lookups by cache and result.", ["cache", "result"])
+
+def record_cache_lookup(cache: str, hit: bool):
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
+
+def scenario_entity_count(scenario) -> int:
+    return (len(scenario.accounts) + len(scenario.costs) + len(scenario.transfers) + len(scenario.financial_events)
+            + len(scenario.automation_rules) + sum(len(o.income_sources) for o in scenario.owners))
+
+def record_projection(months: int, seconds: float, entities: int):
+    PROJECTION_SECONDS.observe(seconds)
+    PROJECTION_MONTHS.inc(months)
+    PROJECTION_SECONDS_TOTAL.inc(seconds)
+    PROJECTION_ENTITIES.observe(entities)
+    if seconds > 0 and months > 0:
+        PROJECTION_THROUGHPUT.observe(months / seconds)
+
+def route_template(scope) -> str:
+    """
+    Label for a request by route template (e.g. /api/scenarios/{scenario_id}) to keep cardinality bounded.
+    The matched route's template may leave out the prefix its router was included under (/api), so the
+    label is the template's segments, by position, after whatever leads up to them in the request path.
+    """
+    route = scope.get("route")
+    if route is None: return "unmatched"
+    template = (getattr(route, "path_format", None) or getattr(route, "path", "")).split("/")
+    segments = scope.get("path", "").split("/")
+    # Both split with a leading "" (paths start with "/"), which the prefix keeps
+    return "/".join(segments[:max(1, len(segments) - len(template) + 1)] + template[1:])
+
+# --- SQL statement counting ---
+# Per-request counter, bound by the HTTP middleware
+request_query_count: ContextVar[Optional[List[int]]] = ContextVar("request_query_count", default=None)
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    SQL_QUERIES.inc()
+    counter = request_query_count.get()
+    if counter is not None:
+        counter[0] += 1
@@ -1,6 +1,7 @@
-from sqlalchemy import Column, Integer, String, Float, Date, Boolean, ForeignKey, JSON
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, BigInteger, String, Float, Date, DateTime, Boolean, ForeignKey, JSON, LargeBinary, Index, event, select, update
+from sqlalchemy.orm import relationship, Session
 from .database import Base
+import time
 
 class Account(Base):
     __tablename__ = "accounts"
@@ -174,6 +175,11 @@ class AutomationRule(Base):
     priority = Column(Integer, default=0)
     notes = Column(String, nullable=True)
 
+def _initial_version():
+    # Start from a microsecond timestamp rather than 1: SQLite can reuse the id of a deleted
+    # scenario, and (id, version) must never repeat for the compiled-scenario cache to be safe.
+    return time.time_ns() // 1000
+
 class Scenario(Base):
     __tablename__ = "scenarios"
     id = Column(Integer, primary_key=True, index=True)
@@ -182,6 +188,8 @@ class Scenario(Base):
     start_date = Column(Date)
     gbp_to_usd_rate = Column(Float, default=1.25)
     notes = Column(String, nullable=True)
+    # Bumped on every change to the scenario or its children; keys the compiled-scenario cache
+    version = Column(BigInteger, nullable=False, default=_initial_version, server_default="1")
     
     owners = relationship("Owner", backref="scenario", cascade="all, delete-orphan")
     accounts = relationship("Account", backref="scenario", cascade="all, delete-orphan")
@@ -195,8 +203,64 @@ class Scenario(Base):
 
 class ScenarioHistory(Base):
     __tablename__ = "scenario_history"
+    # Keyset pagination of a scenario's history walks this index backwards
+    __table_args__ = (Index("ix_scenario_history_scenario_id_id", "scenario_id", "id"),)
     id = Column(Integer, primary_key=True, index=True)
     scenario_id = Column(Integer, ForeignKey("scenarios.id"))
     action_description = Column(String)
-    snapshot_data = Column(JSON)
+    # Full document; only set on entries written before delta encoding
+    snapshot_data = Column(JSON, nullable=True)
     timestamp = Column(Date)
+    # zlib-compressed JSON: the full document for keyframes, a JSON Patch against base_id otherwise
+    payload = Column(LargeBinary, nullable=True)
+    is_keyframe = Column(Boolean, default=False)
+    base_id = Column(Integer, ForeignKey("scenario_history.id"), nullable=True)
+    chain_depth = Column(Integer, default=0)
+
+class ScenarioMetrics(Base):
+    """Headline KPIs of a scenario's baseline projection, refreshed in the background (engine.summary)."""
+    __tablename__ = "scenario_metrics"
+    scenario_id = Column(Integer, ForeignKey("scenarios.id"), primary_key=True)
+    # Scenario.version the row was computed from; a mismatch means the row is stale
+    version = Column(BigInteger, nullable=False)
+    months = Column(Integer, nullable=False)
+    computed_at = Column(DateTime, nullable=False)
+    current_net_worth = Column(Integer)
+    final_net_worth = Column(Integer)
+    final_liquid_assets = Column(Integer)
+    debt_free_date = Column(Date, nullable=True)
+    insolvency_date = Column(Date, nullable=True)
+    tax_paid = Column(Integer)
+
+# --- Scenario versioning ---
+# Entities whose changes alter what a scenario projects (ScenarioHistory is deliberately excluded)
+VERSIONED_MODELS = (Scenario, Owner, Account, IncomeSource, Cost, Transfer, FinancialEvent,
+                    TaxLimit, DecumulationStrategy, ChartAnnotation, AutomationRule)
+
+def bump_scenario_version(session: Session, scenario_ids=(), owner_ids=()):
+    """Increments Scenario.version for the given scenarios (and the scenarios owning the given owners)."""
+    scenario_ids, owner_ids = set(scenario_ids) - {None}, set(owner_ids) - {None}
+    if owner_ids:
+        scenario_ids.update(session.execute(select(Owner.scenario_id).where(Owner.id.in_(owner_ids))).scalars())
+    if not scenario_ids: return
+    # Collected for after-commit listeners (background metrics refresh)
+    session.info.setdefault("bumped_scenario_ids", set()).update(scenario_ids)
+    session.execute(update(Scenario).where(Scenario.id.in_(scenario_ids)).values(version=Scenario.version + 1),
+                    execution_options={"synchronize_session": False})
+    # Loaded scenarios pick up the new value on next access
+    for scenario_id in scenario_ids:
+        obj = session.identity_map.get(Scenario.__mapper__.identity_key_from_primary_key((scenario_id,)))
+        if obj is not None: session.expire(obj, ["version"])
+
+@event.listens_for(Session, "before_flush")
+def _bump_versions_on_flush(session, flush_context, instances):
+    scenario_ids, owner_ids = set(), set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if not isinstance(obj, VERSIONED_MODELS): continue
+        if isinstance(obj, Scenario):
+            if obj not in session.new and obj not in session.deleted: scenario_ids.add(obj.id)
+        elif isinstance(obj, IncomeSource):
+            owner_ids.add(obj.owner_id)
+        else:
+            scenario_ids.add(obj.scenario_id)
+    bump_scenario_version(session, scenario_ids, owner_ids)
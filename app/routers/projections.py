@@ -1,39 +1,70 @@
-from fastapi import APIRouter, Depends, HTTPException, Body, Query
+from fastapi import APIRouter, Depends, HTTPException, Body, Query, Response
 from sqlalchemy.orm import Session
-from typing import Optional
+from typing import Literal, Optional
 import sys
+import time
 
-from .. import crud, engine
+from .. import crud, engine, metrics
 from ..database import get_db
-from ..schemas.projection import Projection, ProjectionRequest
+from ..schemas.projection import ProjectionResult, ProjectionRequest, RuleLogPage
 
 router = APIRouter(
     prefix="/projections",
     tags=["projections"],
 )
 
-@router.post("/{scenario_id}/project", response_model=Projection)
+# response_model is kept for the OpenAPI schema only; the handler returns pre-serialized bytes.
+@router.post("/{scenario_id}/project", response_model=ProjectionResult)
 def project_scenario(
     scenario_id: int, 
     # Standard Query Param
     months: int = Query(12),
+    # Per-processor timings in metadata.profile
+    profile: bool = Query(False),
+    # Rule execution log: off, summary (one row per rule/flow) or full (every execution)
+    log_level: Literal["off", "summary", "full"] = Query("full"),
     # Body Payload - OPTIONAL
     payload: Optional[ProjectionRequest] = Body(default=None),
     db: Session = Depends(get_db)
 ):
-    db_scenario = crud.get_scenario(db, scenario_id=scenario_id)
+    db_scenario = engine.get_compiled_scenario(db, scenario_id)
     if db_scenario is None:
         raise HTTPException(status_code=404, detail="Scenario not found")
 
     final_months = months
+    overrides = []
 
     if payload:
-        # 1. Apply Overrides
-        if payload.overrides:
-            engine.apply_simulation_overrides(db_scenario, payload.overrides)
+        # 1. Overrides are applied to the engine's compiled copy, not the ORM objects
+        overrides = payload.overrides
         
         # 2. Determine Duration override
         if payload.simulation_months is not None:
             final_months = payload.simulation_months
 
-    return engine.run_projection(db=db, scenario=db_scenario, months=final_months)
+    started = time.perf_counter()
+    result = engine.run_projection(db=db, scenario=db_scenario, months=final_months, overrides=overrides, profile=profile, log_level=log_level)
+    metrics.record_projection(final_months, time.perf_counter() - started, metrics.scenario_entity_count(db_scenario))
+    return Response(content=engine.render_projection_json(result, include_metadata=profile), media_type="application/json")
+
+@router.post("/{scenario_id}/rule_logs", response_model=RuleLogPage)
+def project_rule_logs(
+    scenario_id: int,
+    months: int = Query(12),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    sort: Literal["date", "rule_type", "source_account", "target_account", "amount", "reason"] = Query("date"),
+    desc: bool = Query(False),
+    payload: Optional[ProjectionRequest] = Body(default=None),
+    db: Session = Depends(get_db)
+):
+    """
+    One page of the rule execution log of the projection /project would run for the same inputs. Served from
+    the engine's rule log cache when that projection already ran; otherwise the first page runs it.
+    """
+    db_scenario = engine.get_compiled_scenario(db, scenario_id)
+    if db_scenario is None:
+        raise HTTPException(status_code=404, detail="Scenario not found")
+    overrides = payload.overrides if payload else []
+    if payload and payload.simulation_months is not None: months = payload.simulation_months
+    return engine.rule_log_page(db, db_scenario, months, overrides=overrides, offset=offset, limit=limit, sort=sort, descending=desc)
@@ -1,6 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, Body
+from fastapi import APIRouter, Depends, HTTPException, Query, Body, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic_core import from_json
+from sqlalchemy import select
 from sqlalchemy.orm import Session
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from datetime import datetime, date
 from .. import models, schemas, database, engine, crud
 from ..database import get_db
@@ -14,12 +18,52 @@ from ..schemas.legacy import normalize_legacy_data
 def read_scenarios(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
     return crud.get_scenarios(db, skip=skip, limit=limit)
 
+@router.get("/summary", response_model=List[schemas.ScenarioSummary])
+def read_scenario_summaries(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+    """Lightweight listing for the scenario picker (no nested entities, no projections)."""
+    return crud.get_scenario_summaries(db, skip=skip, limit=limit)
+
+# --- EXPORT ROUTES (declared before /{scenario_id}) ---
+def _export_response(chunks, filename: str, media_type: str, compress: bool) -> StreamingResponse:
+    chunks = crud.buffer_chunks(chunks)
+    if compress:
+        chunks, media_type, filename = crud.gzip_chunks(chunks), "application/gzip", f"{filename}.gz"
+    return StreamingResponse(chunks, media_type=media_type, headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+@router.get("/export")
+def export_all_scenarios(gzip: bool = Query(False), db: Session = Depends(get_db)):
+    """Backup of every scenario as NDJSON, one importable document per line."""
+    return _export_response(crud.iter_all_scenarios_export(db), "marty_scenarios.ndjson", "application/x-ndjson", gzip)
+
+@router.get("/{scenario_id}/export")
+def export_scenario(scenario_id: int, gzip: bool = Query(False), db: Session = Depends(get_db)):
+    db_scenario = crud.get_scenario(db, scenario_id)
+    if not db_scenario: raise HTTPException(status_code=404, detail="Scenario not found")
+    return _export_response(crud.iter_scenario_export(db, db_scenario), f"marty_scenario_{scenario_id}.json", "application/json", gzip)
+
 @router.get("/{scenario_id}", response_model=schemas.Scenario)
 def read_scenario(scenario_id: int, db: Session = Depends(get_db)):
-    db_scenario = crud.get_scenario(db, scenario_id)
+    db_scenario = engine.get_compiled_scenario(db, scenario_id)
     if not db_scenario: raise HTTPException(status_code=404, detail="Scenario not found")
     return db_scenario
 
+@router.get("/{scenario_id}/metrics", response_model=schemas.ScenarioMetrics)
+def read_scenario_metrics(scenario_id: int, db: Session = Depends(get_db)):
+    """
+    Stored headline metrics. Computed on the spot only the first time; afterwards a stale row is
+    returned (stale=true) while the background worker recomputes it.
+    """
+    version = db.execute(select(models.Scenario.version).where(models.Scenario.id == scenario_id)).scalar()
+    if version is None: raise HTTPException(status_code=404, detail="Scenario not found")
+    row = db.get(models.ScenarioMetrics, scenario_id)
+    if row is None or not engine.METRICS_REFRESHER.enabled:
+        row = engine.refresh_scenario_metrics(db, scenario_id, engine.METRICS_REFRESHER.months)
+    elif row.version != version:
+        engine.METRICS_REFRESHER.schedule([scenario_id])
+    result = schemas.ScenarioMetrics.model_validate(row)
+    result.stale = row.version != version
+    return result
+
 @router.post("/", response_model=schemas.Scenario)
 def create_scenario(scenario: schemas.ScenarioCreate, db: Session = Depends(get_db)):
     # Optional: Apply to manually created scenarios too? 
@@ -34,16 +78,27 @@ def fork_scenario(scenario_id: int, req: schemas.ScenarioForkRequest, db: Sessio
     if os.getenv("ENVIRONMENT") == "development" and not new_name.startswith("dev_"):
         new_name = f"dev_{new_name}"
         
-    new_scen = crud.duplicate_scenario(db, scenario_id, new_name=new_name, overrides=req.overrides)
+    try:
+        new_scen = crud.duplicate_scenario(db, scenario_id, new_name=new_name, overrides=req.overrides)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
     if not new_scen: raise HTTPException(404, "Scenario not found")
     if req.description:
         new_scen.description = req.description
         db.commit()
-        db.refresh(new_scen)
+        new_scen = crud.get_scenario_graph(db, new_scen.id)
     return new_scen
 
 @router.post("/import_new", response_model=schemas.Scenario)
-def import_new_scenario(request_data: Dict[str, Any] = Body(...), is_legacy: bool = Query(False), db: Session = Depends(get_db)):
+async def import_new_scenario(request: Request, is_legacy: bool = Query(False), db: Session = Depends(get_db)):
+    # 0. Parse the raw body directly (no intermediate Dict[str, Any] validation pass)
+    try:
+        request_data = from_json(await request.body())
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=f"Invalid JSON: {str(e)}")
+    return await run_in_threadpool(_import_new_scenario, request_data, is_legacy, db)
+
+def _import_new_scenario(request_data: Dict[str, Any], is_legacy: bool, db: Session):
     # 1. Legacy Normalization (Before Validation)
     if is_legacy:
         # We process the raw dict to fix types (Float -> Int Pence)
@@ -51,9 +106,9 @@ def import_new_scenario(request_data: Dict[str, Any] = Body(...), is_legacy: boo
     else:
         clean_data = request_data
 
-    # 2. Strict Validation using Pydantic
+    # 2. Strict Validation, one entity list (and chunk) at a time
     try:
-        scenario_import = schemas.ScenarioImport.model_validate(clean_data)
+        scenario_import = schemas.validate_scenario_import(clean_data)
     except ValueError as e:
         raise HTTPException(status_code=422, detail=f"Validation Error: {str(e)}")
     
@@ -97,17 +152,29 @@ def update_scenario(scenario_id: int, scenario: schemas.ScenarioUpdate, db: Sess
 
 # --- HISTORY ROUTES ---
 @router.get("/{scenario_id}/history", response_model=List[schemas.ScenarioHistory])
-def get_history(scenario_id: int, db: Session = Depends(get_db)):
-    return crud.get_scenario_history(db, scenario_id)
+def get_history(
+    scenario_id: int,
+    response: Response,
+    # Keyset pagination: pass the X-Next-Before header of the previous page
+    before: Optional[int] = Query(None),
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db)
+):
+    items = crud.get_scenario_history(db, scenario_id, before_id=before, limit=limit + 1)
+    if len(items) > limit:
+        items = items[:limit]
+        response.headers["X-Next-Before"] = str(items[-1].id)
+    return items
 
 @router.post("/{scenario_id}/history/{history_id}/restore", response_model=schemas.Scenario)
 def restore_history(scenario_id: int, history_id: int, db: Session = Depends(get_db)):
     history_item = crud.get_history_item(db, history_id)
     if not history_item: raise HTTPException(404, "History item not found")
     
-    snapshot = history_item.snapshot_data
+    snapshot = crud.get_history_snapshot(db, history_item)
     # Note: We probably don't need to re-tag history restores as they are likely already tagged or internal
     new_scenario = crud.create_scenario(db, schemas.ScenarioCreate(name=f"Restored: {snapshot['name']}", start_date=snapshot['start_date']))
-    crud.import_scenario_data(db, new_scenario.id, snapshot)
+    # Snapshots are plain dicts; import validates them like any other payload
+    restored = crud.import_scenario_data(db, new_scenario.id, dict(snapshot, name=new_scenario.name))
     
-    return new_scenario
+    return restored
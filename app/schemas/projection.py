@@ -26,11 +26,17 @@ class ProjectionWarning(BaseModel):
     message: str
     source_type: str = "system"
     source_id: int = 0
+    code: Optional[str] = None
+    # Repeats in consecutive months are reported once: last month of the range and its length
+    end_date: Optional[date] = None
+    count: int = 1
 
 class ProjectionAnnotation(BaseModel):
     date: date
     label: str
     type: str = "default" 
+    end_date: Optional[date] = None
+    count: int = 1
 
 class RuleExecutionLog(BaseModel):
     date: date
@@ -40,6 +46,9 @@ class RuleExecutionLog(BaseModel):
     source_account: str
     target_account: str
     reason: str
+    # Summary-level rows aggregate several executions: count and the month of the last one
+    count: int = 1
+    last_date: Optional[date] = None
 
 class MortgageStat(BaseModel):
     year_start: int
@@ -49,6 +58,20 @@ class MortgageStat(BaseModel):
     paid: Money
     headroom: Money
 
+class MortgageScheduleSegment(BaseModel):
+    # From this month on the mortgage pays `payment` a month at `interest_rate` until the next segment
+    date: date
+    reason: str  # start, fixed_period_end, overpayment, final_payment
+    interest_rate: float
+    payment: Money
+    balance: Money  # Opening balance of the month (negative while owed)
+    remaining_months: Optional[int] = None  # Term left, when the payment is re-amortised over it
+
+class MortgageSchedule(BaseModel):
+    account_id: int
+    account_name: str
+    segments: List[MortgageScheduleSegment] = []
+
 class ProjectionDataPoint(BaseModel):
     date: date
     balance: Money
@@ -62,6 +85,7 @@ class Projection(BaseModel):
     annotations: List[ProjectionAnnotation] = []
     rule_logs: List[RuleExecutionLog] = [] 
     mortgage_stats: List[MortgageStat] = []
+    mortgage_schedules: List[MortgageSchedule] = []
 
 # Added to support the Engine's return type which includes metadata
 class ProjectionResult(Projection):
@@ -77,3 +101,8 @@ class SimulationOverride(BaseModel):
 class ProjectionRequest(BaseModel):
     simulation_months: Optional[int] = None
     overrides: List[SimulationOverride] = []
+
+class RuleLogPage(BaseModel):
+    total: int
+    offset: int
+    items: List[RuleExecutionLog]
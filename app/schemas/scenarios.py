@@ -1,4 +1,4 @@
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, TypeAdapter, ValidationError
 from typing import Optional, List, Dict, Any
 from datetime import date, datetime
 from ..enums import AccountType, Cadence, Currency, TaxWrapper
@@ -64,6 +64,7 @@ class ScenarioUpdate(BaseModel):
 
 class Scenario(ScenarioBase):
     id: int
+    version: int
     owners: List[Owner] = []
     accounts: List[Account] = []
     costs: List[Cost] = []
@@ -75,6 +76,36 @@ class Scenario(ScenarioBase):
     decumulation_strategies: List[DecumulationStrategy] = []
     model_config = ConfigDict(from_attributes=True)
 
+class ScenarioMetricsBase(BaseModel):
+    current_net_worth: Optional[int] = None
+    final_net_worth: Optional[int] = None
+    final_liquid_assets: Optional[int] = None
+    debt_free_date: Optional[date] = None
+    insolvency_date: Optional[date] = None
+    tax_paid: Optional[int] = None
+
+class ScenarioMetrics(ScenarioMetricsBase):
+    scenario_id: int
+    version: int
+    months: int
+    computed_at: datetime
+    # True when the scenario has changed since these were computed (a refresh is pending)
+    stale: bool = False
+    model_config = ConfigDict(from_attributes=True)
+
+class ScenarioSummary(ScenarioMetricsBase):
+    """Scenario picker row: header fields, entity counts and stored headline metrics (None until computed)."""
+    id: int
+    name: str
+    description: Optional[str] = None
+    notes: Optional[str] = None
+    start_date: date
+    gbp_to_usd_rate: float = 1.25
+    version: int
+    entity_counts: Dict[str, int] = {}
+    metrics_months: Optional[int] = None
+    metrics_stale: bool = True
+
 class ScenarioHistory(BaseModel):
     id: int
     scenario_id: int
@@ -225,3 +256,45 @@ class ScenarioImport(BaseModel):
     automation_rules: List[ImportAutomationRule] = []
     chart_annotations: List[ImportChartAnnotation] = []
     decumulation_strategies: List[ImportDecumulationStrategy] = []
+
+# Entity lists of a ScenarioImport, validated chunk by chunk by validate_scenario_import
+IMPORT_SECTIONS = {
+    "owners": TypeAdapter(List[ImportOwner]),
+    "accounts": TypeAdapter(List[ImportAccount]),
+    "costs": TypeAdapter(List[ImportCost]),
+    "transfers": TypeAdapter(List[ImportTransfer]),
+    "financial_events": TypeAdapter(List[ImportFinancialEvent]),
+    "tax_limits": TypeAdapter(List[ImportTaxLimit]),
+    "automation_rules": TypeAdapter(List[ImportAutomationRule]),
+    "chart_annotations": TypeAdapter(List[ImportChartAnnotation]),
+    "decumulation_strategies": TypeAdapter(List[ImportDecumulationStrategy]),
+}
+IMPORT_CHUNK_SIZE = 500
+
+class _ImportHeader(BaseModel):
+    name: str
+    description: Optional[str] = None
+    start_date: date
+    gbp_to_usd_rate: Optional[float] = 1.25
+
+def validate_scenario_import(data: Dict[str, Any], chunk_size: int = IMPORT_CHUNK_SIZE) -> ScenarioImport:
+    """
+    Equivalent to ScenarioImport.model_validate(data), but validates each entity list in chunks
+    and stops at the first bad chunk, reporting the section and item index (e.g. "financial_events[1234]").
+    """
+    if not isinstance(data, dict): raise ValueError("Import payload must be a JSON object")
+    header = _ImportHeader.model_validate({k: data[k] for k in _ImportHeader.model_fields if k in data})
+    sections = {}
+    for section, adapter in IMPORT_SECTIONS.items():
+        items = data.get(section) or []
+        if not isinstance(items, list): raise ValueError(f"{section}: expected a list")
+        validated = []
+        for offset in range(0, len(items), chunk_size):
+            try:
+                validated.extend(adapter.validate_python(items[offset:offset + chunk_size]))
+            except ValidationError as e:
+                err = e.errors()[0]
+                index, *field = err["loc"]
+                raise ValueError(f"{section}[{offset + index}]{''.join(f'.{f}' for f in field)}: {err['msg']}") from None
+        sections[section] = validated
+    return ScenarioImport.model_construct(**header.model_dump(), **sections)
@@ -0,0 +1,184 @@
+"""
+Macro benchmarks for the projection engine.
+
+Times `engine.run_projection` and the `/project` endpoint across synthetic households
+(small / medium / huge) and horizons (12 / 120 / 600 months), reporting months/second
+and peak traced memory. Results are written as JSON so runs can be compared.
+
+Usage:
+    python -m benchmarks.bench_engine
+    python -m benchmarks.bench_engine --sizes small medium --horizons 12 120 --repeat 5
+    python -m benchmarks.bench_engine --compare benchmarks/results/previous.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Dict, List
+
+# Keep the app's default engine off the real database file
+os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import engine as app_engine, models  # noqa: F401 (models registers tables)
+from app.database import Base, get_db
+from benchmarks.synthetic import PRESETS, generate_household
+
+DEFAULT_SIZES = ["small", "medium", "huge"]
+DEFAULT_HORIZONS = [12, 120, 600]
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+def _make_session_factory():
+    db_engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=db_engine)
+    return sessionmaker(autocommit=False, autoflush=False, bind=db_engine)
+
+
+def _time_runs(fn, repeat: int) -> List[float]:
+    timings = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - t0)
+    return timings
+
+
+def _peak_memory(fn) -> int:
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def _summarise(timings: List[float], months: int, peak_bytes: int) -> Dict:
+    best = min(timings)
+    median = statistics.median(timings)
+    return {
+        "best_s": round(best, 6),
+        "median_s": round(median, 6),
+        "months_per_s": round(months / median, 1) if median else None,
+        "peak_mem_kb": round(peak_bytes / 1024, 1),
+    }
+
+
+def bench_engine(session_factory, scenario_id: int, months: int, repeat: int) -> Dict:
+    def run():
+        db = session_factory()
+        try:
+            scenario = db.get(models.Scenario, scenario_id)
+            app_engine.run_projection(db, scenario, months=months)
+        finally:
+            db.close()
+
+    run()  # warm-up
+    return _summarise(_time_runs(run, repeat), months, _peak_memory(run))
+
+
+def bench_endpoint(session_factory, scenario_id: int, months: int, repeat: int) -> Dict:
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    def override_get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    try:
+        client = TestClient(app)
+
+        def run():
+            res = client.post(f"/api/projections/{scenario_id}/project?months={months}", json={})
+            assert res.status_code == 200, res.text
+
+        run()
+        return _summarise(_time_runs(run, repeat), months, _peak_memory(run))
+    finally:
+        app.dependency_overrides.pop(get_db, None)
+
+
+def run_suite(sizes: List[str], horizons: List[int], repeat: int, include_endpoint: bool = True) -> Dict:
+    session_factory = _make_session_factory()
+    results = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "repeat": repeat,
+        "cases": [],
+    }
+    for size in sizes:
+        db = session_factory()
+        scenario = generate_household(db, PRESETS[size], name=f"bench_{size}")
+        scenario_id = scenario.id
+        entity_count = len(scenario.accounts) + len(scenario.costs) + len(scenario.transfers) + \
+            len(scenario.financial_events) + len(scenario.automation_rules) + \
+            sum(len(o.income_sources) for o in scenario.owners)
+        db.close()
+
+        for months in horizons:
+            case = {"size": size, "months": months, "entities": entity_count,
+                    "engine": bench_engine(session_factory, scenario_id, months, repeat)}
+            if include_endpoint:
+                case["endpoint"] = bench_endpoint(session_factory, scenario_id, months, repeat)
+            results["cases"].append(case)
+            _print_case(case)
+    return results
+
+
+def _print_case(case: Dict, baseline: Dict = None):
+    line = f"{case['size']:>7} {case['months']:>4}m  engine {case['engine']['median_s'] * 1000:9.1f} ms " \
+           f"({case['engine']['months_per_s']:>9} m/s, {case['engine']['peak_mem_kb']:>9} KB)"
+    if "endpoint" in case:
+        line += f"  /project {case['endpoint']['median_s'] * 1000:9.1f} ms"
+    if baseline:
+        ratio = baseline["engine"]["median_s"] / case["engine"]["median_s"] if case["engine"]["median_s"] else 0
+        line += f"  [{ratio:.2f}x vs baseline]"
+    print(line)
+
+
+def compare(current: Dict, baseline: Dict):
+    index = {(c["size"], c["months"]): c for c in baseline.get("cases", [])}
+    print(f"\nComparison against baseline from {baseline.get('timestamp')}:")
+    for case in current["cases"]:
+        _print_case(case, index.get((case["size"], case["months"])))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Marty engine macro benchmarks")
+    parser.add_argument("--sizes", nargs="+", default=DEFAULT_SIZES, choices=sorted(PRESETS))
+    parser.add_argument("--horizons", nargs="+", type=int, default=DEFAULT_HORIZONS)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--no-endpoint", action="store_true", help="Only time run_projection")
+    parser.add_argument("--output", help="Where to write the JSON results (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--compare", help="Previous results JSON to compare against")
+    args = parser.parse_args()
+
+    results = run_suite(args.sizes, args.horizons, args.repeat, include_endpoint=not args.no_endpoint)
+
+    output = args.output
+    if not output:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,280 @@
+"""
+Deterministic synthetic household generator.
+
+Builds a realistic scenario graph (owners, accounts of every type, incomes, costs,
+transfers, events, rules, RSU grants, mortgages, tax limits) directly through the ORM
+so the engine and the API can be exercised at scale. The same spec + seed always
+produces the same scenario.
+"""
+import random
+from dataclasses import dataclass, replace
+from datetime import date
+from typing import Dict, List
+
+from sqlalchemy.orm import Session
+
+from app import models, enums
+
+
+@dataclass(frozen=True)
+class HouseholdSpec:
+    owners: int = 2
+    cash_accounts: int = 2
+    investment_accounts: int = 1
+    isa_accounts: int = 1
+    pension_accounts: int = 1
+    property_accounts: int = 0
+    mortgages: int = 1
+    rsu_grants: int = 0
+    usd_accounts: int = 0
+    incomes_per_owner: int = 1
+    costs: int = 5
+    transfers: int = 2
+    events: int = 2
+    rules: int = 2
+    start_date: date = date(2025, 1, 1)
+    seed: int = 42
+
+
+PRESETS: Dict[str, HouseholdSpec] = {
+    "small": HouseholdSpec(),
+    "medium": HouseholdSpec(
+        owners=2, cash_accounts=4, investment_accounts=3, isa_accounts=2, pension_accounts=2,
+        property_accounts=1, mortgages=2, rsu_grants=3, usd_accounts=1, incomes_per_owner=2,
+        costs=25, transfers=8, events=20, rules=10,
+    ),
+    "huge": HouseholdSpec(
+        owners=4, cash_accounts=10, investment_accounts=8, isa_accounts=6, pension_accounts=6,
+        property_accounts=3, mortgages=4, rsu_grants=10, usd_accounts=4, incomes_per_owner=3,
+        costs=120, transfers=40, events=200, rules=35,
+    ),
+}
+
+
+def get_spec(name: str, **changes) -> HouseholdSpec:
+    """Returns a preset spec, optionally with some fields replaced."""
+    return replace(PRESETS[name], **changes)
+
+
+def _add(db: Session, obj):
+    db.add(obj)
+    return obj
+
+
+def generate_household(db: Session, spec: HouseholdSpec, name: str = None) -> models.Scenario:
+    """
+    Creates a complete scenario for the given spec and commits it.
+    Returns the persisted Scenario.
+    """
+    rng = random.Random(spec.seed)
+    start = spec.start_date
+
+    scenario = _add(db, models.Scenario(
+        name=name or f"Synthetic Household (seed {spec.seed})",
+        description="Generated by benchmarks.synthetic",
+        start_date=start,
+        gbp_to_usd_rate=1.25,
+    ))
+    db.flush()
+
+    # --- Owners ---
+    owners: List[models.Owner] = []
+    for i in range(spec.owners):
+        owners.append(_add(db, models.Owner(
+            scenario_id=scenario.id,
+            name=f"Owner {i + 1}",
+            birth_date=date(1960 + rng.randint(0, 30), rng.randint(1, 12), 1),
+            retirement_age=rng.choice([57, 60, 65, 67]),
+        )))
+    db.flush()
+
+    def pick_owner():
+        return owners[rng.randrange(len(owners))]
+
+    def new_account(**kwargs) -> models.Account:
+        owner = kwargs.pop("owner", None) or pick_owner()
+        balance = kwargs.get("starting_balance", 0)
+        kwargs.setdefault("book_cost", balance)
+        acc = _add(db, models.Account(scenario_id=scenario.id, **kwargs))
+        acc.owners = [owner]
+        return acc
+
+    # --- Accounts ---
+    cash: List[models.Account] = []
+    for i in range(spec.cash_accounts):
+        cash.append(new_account(
+            name=f"Cash {i + 1}", account_type=enums.AccountType.CASH.value,
+            tax_wrapper=enums.TaxWrapper.NONE.value, currency="GBP",
+            starting_balance=rng.randint(5_000, 50_000) * 100,
+            interest_rate=round(rng.uniform(0.0, 4.5), 2), min_balance=0,
+            owner=owners[i % len(owners)],
+        ))
+    investments: List[models.Account] = []
+    for i in range(spec.investment_accounts):
+        balance = rng.randint(10_000, 250_000) * 100
+        investments.append(new_account(
+            name=f"GIA {i + 1}", account_type=enums.AccountType.INVESTMENT.value,
+            tax_wrapper=enums.TaxWrapper.NONE.value, currency="GBP",
+            starting_balance=balance, book_cost=int(balance * rng.uniform(0.5, 0.95)),
+            interest_rate=round(rng.uniform(3.0, 8.0), 2),
+        ))
+    isas: List[models.Account] = []
+    for i in range(spec.isa_accounts):
+        isas.append(new_account(
+            name=f"ISA {i + 1}", account_type=enums.AccountType.INVESTMENT.value,
+            tax_wrapper=enums.TaxWrapper.ISA.value, currency="GBP",
+            starting_balance=rng.randint(5_000, 150_000) * 100,
+            interest_rate=round(rng.uniform(3.0, 7.0), 2),
+        ))
+    pensions: List[models.Account] = []
+    for i in range(spec.pension_accounts):
+        pensions.append(new_account(
+            name=f"Pension {i + 1}", account_type=enums.AccountType.PENSION.value,
+            tax_wrapper=enums.TaxWrapper.PENSION.value, currency="GBP",
+            starting_balance=rng.randint(20_000, 500_000) * 100,
+            interest_rate=round(rng.uniform(4.0, 7.0), 2),
+            owner=owners[i % len(owners)],
+        ))
+    for i in range(spec.property_accounts):
+        new_account(
+            name=f"Property {i + 1}",
+            account_type=(enums.AccountType.MAIN_RESIDENCE if i == 0 else enums.AccountType.PROPERTY).value,
+            tax_wrapper=enums.TaxWrapper.NONE.value, currency="GBP",
+            starting_balance=rng.randint(250_000, 900_000) * 100,
+            interest_rate=round(rng.uniform(1.0, 4.0), 2),
+        )
+    usd: List[models.Account] = []
+    for i in range(spec.usd_accounts):
+        usd.append(new_account(
+            name=f"USD Brokerage {i + 1}", account_type=enums.AccountType.INVESTMENT.value,
+            tax_wrapper=enums.TaxWrapper.NONE.value, currency="USD",
+            starting_balance=rng.randint(10_000, 200_000) * 100,
+            interest_rate=round(rng.uniform(4.0, 9.0), 2),
+        ))
+    db.flush()
+
+    mortgages: List[models.Account] = []
+    for i in range(spec.mortgages):
+        loan = rng.randint(150_000, 600_000) * 100
+        term = rng.choice([20, 25, 30, 35])
+        mortgage_start = date(start.year - rng.randint(0, 5), rng.randint(1, 12), 1)
+        mortgages.append(new_account(
+            name=f"Mortgage {i + 1}", account_type=enums.AccountType.MORTGAGE.value,
+            tax_wrapper=enums.TaxWrapper.NONE.value, currency="GBP",
+            starting_balance=-int(loan * rng.uniform(0.6, 1.0)), original_loan_amount=loan,
+            amortisation_period_years=term, mortgage_start_date=mortgage_start,
+            interest_rate=round(rng.uniform(4.5, 7.0), 2),
+            fixed_interest_rate=round(rng.uniform(1.5, 5.0), 2), fixed_rate_period_years=rng.choice([2, 5]),
+            payment_from_account_id=cash[i % len(cash)].id if cash else None,
+        ))
+    rsu_grants: List[models.Account] = []
+    for i in range(spec.rsu_grants):
+        rsu_grants.append(new_account(
+            name=f"RSU Grant {i + 1}", account_type=enums.AccountType.RSU_GRANT.value,
+            tax_wrapper=enums.TaxWrapper.NONE.value, currency=rng.choice(["GBP", "USD"]),
+            starting_balance=rng.randint(100, 2_000) * 100,
+            interest_rate=round(rng.uniform(0.0, 12.0), 2),
+            grant_date=date(start.year - rng.randint(0, 3), rng.randint(1, 12), 1),
+            unit_price=rng.randint(1_000, 40_000),
+            vesting_schedule=[{"year": y, "percent": 25} for y in range(1, 5)],
+            vesting_cadence=rng.choice(["monthly", "quarterly"]),
+            rsu_target_account_id=cash[i % len(cash)].id if cash else None,
+        ))
+    db.flush()
+
+    liquid = cash + investments + isas + usd
+    cadences = [c.value for c in (enums.Cadence.MONTHLY, enums.Cadence.QUARTERLY, enums.Cadence.ANNUALLY)]
+
+    def future_date(max_years: int) -> date:
+        return date(start.year + rng.randint(0, max_years), rng.randint(1, 12), 1)
+
+    # --- Incomes ---
+    for owner in owners:
+        owner_cash = [a for a in cash if owner in a.owners] or cash
+        owner_pensions = [a for a in pensions if owner in a.owners] or pensions
+        for j in range(spec.incomes_per_owner):
+            is_pre_tax = j == 0
+            _add(db, models.IncomeSource(
+                owner_id=owner.id, account_id=owner_cash[j % len(owner_cash)].id,
+                name=f"{owner.name} Income {j + 1}",
+                net_value=rng.randint(2_000, 12_000) * 100,
+                cadence=enums.Cadence.MONTHLY.value if j == 0 else rng.choice(cadences),
+                start_date=start, end_date=future_date(25) if j else None,
+                currency="GBP", growth_rate=round(rng.uniform(0.0, 3.0), 2),
+                is_pre_tax=is_pre_tax,
+                salary_sacrifice_value=rng.randint(100, 800) * 100 if is_pre_tax and owner_pensions else 0,
+                salary_sacrifice_account_id=owner_pensions[0].id if is_pre_tax and owner_pensions else None,
+                employer_pension_contribution=rng.randint(100, 600) * 100 if is_pre_tax and owner_pensions else 0,
+                taxable_benefit_value=0,
+            ))
+
+    # --- Costs ---
+    for i in range(spec.costs):
+        once = rng.random() < 0.1
+        _add(db, models.Cost(
+            scenario_id=scenario.id, account_id=cash[i % len(cash)].id,
+            name=f"Cost {i + 1}", value=rng.randint(20, 2_500) * 100,
+            cadence=enums.Cadence.ONCE.value if once else rng.choice(cadences + [enums.Cadence.MONTHLY.value] * 3),
+            start_date=future_date(10) if once else start, end_date=None if once or rng.random() < 0.6 else future_date(30),
+            currency="GBP", growth_rate=round(rng.uniform(0.0, 3.0), 2), is_recurring=not once,
+        ))
+
+    # --- Transfers ---
+    for i in range(spec.transfers):
+        source = cash[i % len(cash)]
+        target = rng.choice([a for a in liquid + pensions if a is not source] or cash)
+        _add(db, models.Transfer(
+            scenario_id=scenario.id, from_account_id=source.id, to_account_id=target.id,
+            name=f"Transfer {i + 1}", value=rng.randint(50, 1_500) * 100,
+            cadence=rng.choice(cadences), start_date=start, end_date=None if rng.random() < 0.5 else future_date(20),
+            currency="GBP", show_on_chart=rng.random() < 0.1,
+        ))
+
+    # --- Events ---
+    for i in range(spec.events):
+        is_transfer = rng.random() < 0.3 and len(liquid) > 1
+        source = rng.choice(liquid)
+        target = rng.choice([a for a in liquid if a is not source]) if is_transfer else None
+        _add(db, models.FinancialEvent(
+            scenario_id=scenario.id, from_account_id=source.id, to_account_id=target.id if target else None,
+            name=f"Event {i + 1}", value=rng.choice([-1, 1]) * rng.randint(500, 50_000) * 100 if not is_transfer else rng.randint(500, 20_000) * 100,
+            event_date=date(start.year + rng.randint(0, 49), rng.randint(1, 12), rng.randint(1, 28)),
+            event_type=(enums.FinancialEventType.TRANSFER if is_transfer else enums.FinancialEventType.INCOME_EXPENSE).value,
+            currency="GBP", show_on_chart=rng.random() < 0.2,
+        ))
+
+    # --- Automation Rules ---
+    rule_types = [r.value for r in enums.RuleType]
+    for i in range(spec.rules):
+        rule_type = rule_types[i % len(rule_types)]
+        source = cash[i % len(cash)]
+        if rule_type == enums.RuleType.MORTGAGE_SMART.value:
+            if not mortgages: rule_type = enums.RuleType.SWEEP.value
+            target = mortgages[i % len(mortgages)] if mortgages else rng.choice(isas + investments or cash)
+        else:
+            target = rng.choice(isas + investments + pensions or cash)
+        _add(db, models.AutomationRule(
+            scenario_id=scenario.id, name=f"Rule {i + 1}", rule_type=rule_type,
+            source_account_id=source.id, target_account_id=target.id,
+            trigger_value=rng.randint(1_000, 20_000) * 100,
+            transfer_value=10.0 if rule_type == enums.RuleType.MORTGAGE_SMART.value else rng.randint(50, 2_000) * 100,
+            cadence=enums.Cadence.ANNUALLY.value if rule_type == enums.RuleType.MORTGAGE_SMART.value else rng.choice(cadences),
+            start_date=start, end_date=None, priority=i + 1,
+        ))
+
+    # --- Tax Limits & Strategy ---
+    _add(db, models.TaxLimit(
+        scenario_id=scenario.id, name="ISA Allowance", amount=2_000_000,
+        wrappers=[enums.TaxWrapper.ISA.value], start_date=start, frequency="Annually",
+    ))
+    _add(db, models.TaxLimit(
+        scenario_id=scenario.id, name="Pension Annual Allowance", amount=6_000_000,
+        wrappers=[enums.TaxWrapper.PENSION.value], start_date=start, frequency="Annually",
+    ))
+    _add(db, models.DecumulationStrategy(
+        scenario_id=scenario.id, name="Standard Drawdown", strategy_type="Standard", enabled=True,
+    ))
+
+    db.commit()
+    db.refresh(scenario)
+    return scenario
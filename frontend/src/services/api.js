@@ -14,6 +14,11 @@ export const api = {
         return handleResponse(res);
     },
     
+    async getScenarioSummaries() {
+        const res = await fetch(`${API_BASE}/scenarios/summary`);
+        return handleResponse(res);
+    },
+
     async createScenario(data) { 
         const res = await fetch(`${API_BASE}/scenarios/`, { method: 'POST', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify(data) });
         return handleResponse(res);
@@ -50,9 +55,16 @@ export const api = {
         return handleResponse(res);
     },
     
-    async runProjection(id, months = 12, overrides = []) {
+    async runProjection(id, months = 12, overrides = [], logLevel = 'full') {
+        const payload = { simulation_months: months, overrides: overrides };
+        const res = await fetch(`${API_BASE}/projections/${id}/project?log_level=${logLevel}`, { method: 'POST', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify(payload) });
+        return handleResponse(res);
+    },
+
+    async getRuleLogs(id, months = 12, overrides = [], { offset = 0, limit = 100, sort = 'date', desc = false } = {}) {
         const payload = { simulation_months: months, overrides: overrides };
-        const res = await fetch(`${API_BASE}/projections/${id}/project`, { method: 'POST', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify(payload) });
+        const params = new URLSearchParams({ offset, limit, sort, desc });
+        const res = await fetch(`${API_BASE}/projections/${id}/rule_logs?${params}`, { method: 'POST', headers: { 'Content-Type': 'application/json' }, body: JSON.stringify(payload) });
         return handleResponse(res);
     },
 
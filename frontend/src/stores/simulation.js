@@ -40,7 +40,7 @@ export const useSimulationStore = defineStore('simulation', () => {
     async function init() {
         if (!activeScenarioId.value) {
             try {
-                const list = await api.getScenarios();
+                const list = await api.getScenarioSummaries();
                 if (list.length > 0) activeScenarioId.value = list[0].id;
                 else return;
             } catch (e) { return; }
@@ -72,7 +72,8 @@ export const useSimulationStore = defineStore('simulation', () => {
     }
 
     async function runBaseline() {
-        const res = await api.runProjection(activeScenarioId.value, simulationMonths.value, []);
+        // The rule log is fetched page by page by AutomationAudit
+        const res = await api.runProjection(activeScenarioId.value, simulationMonths.value, [], 'off');
         baselineData.value = res;
         if (Object.keys(overrides.value).length === 0) simulationData.value = res;
         else runSimulation();
@@ -85,7 +86,7 @@ export const useSimulationStore = defineStore('simulation', () => {
         }
         const apiOverrides = getApiOverrides();
         try {
-            const res = await api.runProjection(activeScenarioId.value, simulationMonths.value, apiOverrides);
+            const res = await api.runProjection(activeScenarioId.value, simulationMonths.value, apiOverrides, 'off');
             simulationData.value = res;
         } catch (e) { console.error("Sim failed", e); }
     }
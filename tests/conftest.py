@@ -3,6 +3,10 @@ import os
 
 # Force environment to 'testing' to prevent 'dev_' prefix injection in scenarios
 os.environ["ENVIRONMENT"] = "testing"
+# Write history snapshots synchronously (the background writer would use the real database)
+os.environ["HISTORY_COALESCE_SECONDS"] = "0"
+# No background metrics refresh (it would project against the real database); tests refresh explicitly
+os.environ["METRICS_REFRESH_DELAY"] = "-1"
 
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
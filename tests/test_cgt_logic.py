@@ -67,3 +67,26 @@ def test_cgt_higher_rate_payer():
 
     calculated = TaxService.calculate_capital_gains_tax(gain_pence, 0, income_pence)
     assert abs(calculated - expected_tax_pence) < 50
+
+def test_account_classes_drive_disposal_exemptions():
+    from app import enums, models
+    from app.engine.classes import AccountClass, AccountClasses
+    from app.engine.helpers import calculate_disposal_impact
+
+    accounts = [
+        models.Account(id=1, account_type=enums.AccountType.INVESTMENT, tax_wrapper=enums.TaxWrapper.NONE, currency=enums.Currency.USD),
+        models.Account(id=2, account_type=enums.AccountType.INVESTMENT, tax_wrapper=enums.TaxWrapper.ISA),
+        models.Account(id=3, account_type=enums.AccountType.CASH, tax_wrapper=enums.TaxWrapper.LISA),
+        models.Account(id=4, account_type=enums.AccountType.MAIN_RESIDENCE),
+        models.Account(id=5, account_type=enums.AccountType.MORTGAGE),
+    ]
+    classes = AccountClasses(accounts)
+    assert AccountClass.names(classes.of(1)) == ["INVESTMENT", "LIQUID", "USD", "GROWS"]
+    assert AccountClass.names(classes.of(3)) == ["CASH", "CGT_EXEMPT", "WRAPPED", "GROWS"]
+    assert classes.ids(AccountClass.DEBT) == (5,)
+    assert classes.ids(AccountClass.LIQUID) == (1, 2)
+
+    # Only the unwrapped investment realises a gain
+    assert calculate_disposal_impact(500, 1000, 600, classes.of(1)) == (300, 200)
+    for acc_id in (2, 3, 4, 5):
+        assert calculate_disposal_impact(500, 1000, 600, classes.of(acc_id)) == (0, 0)
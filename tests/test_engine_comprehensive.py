@@ -86,6 +86,31 @@ def test_engine_rsu_vesting(db_session, client):
     target_balance = final_point.account_balances[target_acc.id]
     assert target_balance > 0
 
+def test_rsu_vesting_table(db_session, client):
+    from app.engine.processors.rsu import compile_grant
+    db = db_session
+
+    scenario = create_scenario(db)
+    owner = create_owner(db, scenario.id)
+    target_acc = create_account(db, scenario.id, "Main Bank", enums.AccountType.CASH, 0, owner)
+    rsu_acc = create_account(
+        db, scenario.id, "RSU Grant", enums.AccountType.RSU_GRANT, balance=1200_00, owner=owner,
+        rsu_target_account_id=target_acc.id, vesting_schedule=[{"year": 2, "percent": 75}, {"year": 1, "percent": 25}],
+        grant_date=date(2024, 1, 15), unit_price=1000, interest_rate=0.0
+    )
+    rsu_acc.vesting_cadence = "quarterly"
+    db.commit()
+
+    table = compile_grant(scenario, rsu_acc)
+    # Unvested units by months since grant: the current year's tranche vests pro rata
+    assert [table.target(k) for k in (0, 6, 12, 18, 24, 36)] == [1200, 1050, 900, 450, 0, 0]
+    # Granted mid-January, so the first whole month completes on 1 March
+    assert table.base_month == 2024 * 12 + 1
+
+    projection = app_engine.run_projection(db, scenario, months=12)
+    vests = [(log.date, log.amount) for log in projection.rule_logs if log.rule_type == "RSU Vest"]
+    assert [d for d, _ in vests] == [date(2024, 5, 1), date(2024, 8, 1), date(2024, 11, 1)]
+
 def test_engine_mortgage_smart_payment(db_session, client):
     db = db_session
 
@@ -257,3 +282,215 @@ def test_engine_standard_mortgage(db_session, client):
     assert interest < 0
     # Expected repayment around £584.59 -> 58459 pence
     assert 58000 < repayment < 59000
+
+def test_rule_program_fire_months_and_order(db_session, client):
+    db = db_session
+
+    scenario = create_scenario(db)
+    owner = create_owner(db, scenario.id)
+    source_acc = create_account(db, scenario.id, "Checking", enums.AccountType.CASH, 10_000_000, owner)
+    target_acc = create_account(db, scenario.id, "Savings", enums.AccountType.CASH, 0, owner)
+
+    def add_rule(name, priority, cadence, start, end=None):
+        db.add(models.AutomationRule(
+            scenario_id=scenario.id, name=name, priority=priority, rule_type=enums.RuleType.SMART_TRANSFER,
+            source_account_id=source_acc.id, target_account_id=target_acc.id, trigger_value=0, transfer_value=100,
+            cadence=cadence, start_date=start, end_date=end
+        ))
+    add_rule("Quarterly", 2, enums.Cadence.QUARTERLY, date(2024, 2, 15), date(2024, 10, 1))
+    add_rule("Once", 1, enums.Cadence.ONCE, date(2024, 3, 20))
+    add_rule("Annual", 3, enums.Cadence.ANNUALLY, date(2024, 6, 1))
+    add_rule("Ended before start", 0, enums.Cadence.ONCE, date(2024, 5, 1), date(2024, 4, 30))
+    db.commit()
+    db.refresh(scenario)
+
+    projection = app_engine.run_projection(db, scenario, months=24)
+    fired = [(log.date.year, log.date.month, log.amount) for log in projection.rule_logs]
+    # Quarterly within Feb..Oct 2024 -> Apr, Jul, Oct; once -> Mar 2024; annually -> every June
+    assert fired == [(2024, 3, 100), (2024, 4, 100), (2024, 6, 100), (2024, 7, 100), (2024, 10, 100), (2025, 6, 100)]
+    assert all(log.source_account == "Checking" and log.target_account == "Savings" for log in projection.rule_logs)
+
+    from app.engine.processors.rules import compile_rules
+    from app.engine.context import ProjectionContext
+    view = app_engine.compile_scenario(scenario)
+    context = ProjectionContext(month_start=scenario.start_date, account_balances={a.id: 0 for a in view.accounts},
+                                account_book_costs={}, flows={}, all_accounts=view.accounts)
+    assert [op.rule.name for op in compile_rules(view, context)] == ["Once", "Quarterly", "Annual"]
+
+def test_recurring_warnings_and_annotations_are_ranged(db_session, client):
+    db = db_session
+
+    scenario = create_scenario(db)
+    owner = create_owner(db, scenario.id)
+    cash = create_account(db, scenario.id, "Cash", enums.AccountType.CASH, 10_000_000, owner)
+    isa = create_account(db, scenario.id, "ISA", enums.AccountType.CASH, 0, owner, tax_wrapper=enums.TaxWrapper.ISA)
+    db.add(models.TaxLimit(scenario_id=scenario.id, name="ISA Limit", amount=100_000,
+                           wrappers=[enums.TaxWrapper.ISA.value], start_date=date(2024, 1, 1)))
+    db.add(models.Transfer(scenario_id=scenario.id, name="ISA Drip", value=50_000, cadence=enums.Cadence.MONTHLY,
+                           start_date=date(2024, 1, 1), end_date=date(2024, 12, 31),
+                           from_account_id=cash.id, to_account_id=isa.id, show_on_chart=True))
+    db.commit()
+    db.refresh(scenario)
+
+    projection = app_engine.run_projection(db, scenario, months=12)
+    [drip] = [a for a in projection.annotations if a.label == "ISA Drip"]
+    assert (drip.date, drip.end_date, drip.count) == (date(2024, 1, 1), date(2024, 12, 1), 12)
+    # The allowance is used up by February: March and April (before the 6th) are one blocked range
+    warnings = [w for w in projection.warnings if w.code == "tax_limit_exceeded"]
+    assert (warnings[0].date, warnings[0].end_date, warnings[0].count) == (date(2024, 3, 1), date(2024, 4, 1), 2)
+
+def test_month_ranges_split_on_gaps():
+    from app.engine.ranges import MonthRanges
+    ranges = MonthRanges()
+    for month in [0, 1, 1, 2, 5, 6]:
+        ranges.add("k", month, date(2024, month + 1, 1), lambda: "payload")
+    ranges.add("other", 3, date(2024, 4, 1), lambda: "other")
+    assert ranges.ranges() == [
+        ("payload", date(2024, 1, 1), date(2024, 3, 1), 3),
+        ("other", date(2024, 4, 1), date(2024, 4, 1), 1),
+        ("payload", date(2024, 6, 1), date(2024, 7, 1), 2),
+    ]
+
+def test_milestones_detected_after_projection(db_session, client):
+    db = db_session
+
+    scenario = create_scenario(db)
+    owner = create_owner(db, scenario.id)
+    owner.birth_date, owner.retirement_age = date(1959, 5, 10), 65
+    cash = create_account(db, scenario.id, "Cash", enums.AccountType.CASH, 150_00, owner)
+    loan = create_account(db, scenario.id, "Car Loan", enums.AccountType.LOAN, -300_00, owner)
+    db.add(models.Transfer(scenario_id=scenario.id, name="Repay", value=100_00, cadence=enums.Cadence.MONTHLY,
+                           start_date=date(2024, 1, 1), from_account_id=cash.id, to_account_id=loan.id))
+    db.commit()
+    db.refresh(scenario)
+
+    projection = app_engine.run_projection(db, scenario, months=12)
+    milestones = [(a.date, a.label, a.type) for a in projection.annotations]
+    assert milestones == [
+        (date(2024, 3, 1), "Car Loan Cleared", "success"),
+        (date(2024, 3, 1), "Debt Free", "success"),
+        (date(2024, 5, 1), "Test Owner Retires", "milestone"),
+    ]
+
+def test_mortgage_schedule_segments(db_session, client):
+    db = db_session
+
+    scenario = create_scenario(db)
+    owner = create_owner(db, scenario.id)
+    bank = create_account(db, scenario.id, "Bank", enums.AccountType.CASH, 5_000_000, owner)
+    mortgage_acc = create_account(
+        db, scenario.id, "Home", enums.AccountType.MORTGAGE, -19_000_000, owner,
+        interest_rate=5.0, fixed_interest_rate=2.0, fixed_rate_period_years=2,
+        mortgage_start_date=date(2022, 6, 15), original_loan_amount=20_000_000, amortisation_period_years=25,
+        payment_from_account_id=bank.id
+    )
+    db.add(models.Transfer(scenario_id=scenario.id, name="Overpay", value=1_000_000, cadence=enums.Cadence.ONCE,
+                           start_date=date(2024, 9, 1), from_account_id=bank.id, to_account_id=mortgage_acc.id))
+    db.commit()
+    db.refresh(scenario)
+
+    projection = app_engine.run_projection(db, scenario, months=12)
+    [schedule] = projection.mortgage_schedules
+    assert schedule.account_id == mortgage_acc.id
+    start, fixed_end, overpaid = schedule.segments
+    # The fixed rate runs through June 2024 (it ends on the 15th), then the balance is re-amortised at 5%
+    assert (start.reason, start.date, start.interest_rate) == ("start", date(2024, 1, 1), 2.0)
+    assert (fixed_end.reason, fixed_end.date, fixed_end.interest_rate) == ("fixed_period_end", date(2024, 7, 1), 5.0)
+    assert fixed_end.remaining_months == 275
+    assert (overpaid.reason, overpaid.date) == ("overpayment", date(2024, 9, 1))
+    assert overpaid.payment < fixed_end.payment
+
+    # Every month's repayment follows the schedule
+    repayments = [p.flows[mortgage_acc.id].mortgage_repayments_in for p in projection.data_points[1:]]
+    assert repayments[:6] == [start.payment] * 6
+    assert repayments[6] == fixed_end.payment and repayments[8] == overpaid.payment
+
+def test_quiet_months_run_growth_only(db_session, client):
+    db = db_session
+
+    scenario = create_scenario(db)
+    owner = create_owner(db, scenario.id)
+    cash = create_account(db, scenario.id, "Savings", enums.AccountType.CASH, 10_000_00, owner, interest_rate=3.0)
+    db.add(models.Cost(scenario_id=scenario.id, account_id=cash.id, name="Rent", value=100_00, cadence=enums.Cadence.MONTHLY,
+                       start_date=date(2024, 1, 1), end_date=date(2024, 6, 15)))
+    db.commit()
+    db.refresh(scenario)
+
+    projection = app_engine.run_projection(db, scenario, months=12, profile=True)
+    calls = {name: entry["calls"] for name, entry in projection.metadata["profile"]["processors"].items()}
+    # The cost's last month is June; from July only growth happens
+    assert calls["process_costs"] == 6 and calls["process_growth"] == 12
+
+    flows = [p.flows[cash.id] for p in projection.data_points[1:]]
+    assert [f.costs for f in flows] == [100_00] * 6 + [0] * 6
+    assert all(f.growth > 0 for f in flows)
+    balances = [p.account_balances[cash.id] for p in projection.data_points]
+    assert all(later > earlier for earlier, later in zip(balances[7:], balances[8:]))
+
+def test_probe_projection_matches_summary_and_stops_early(db_session, client):
+    from app.engine.summary import summarize_projection
+    db = db_session
+
+    scenario = create_scenario(db)
+    owner = create_owner(db, scenario.id)
+    cash = create_account(db, scenario.id, "Cash", enums.AccountType.CASH, 500_00, owner)
+    create_account(db, scenario.id, "Car Loan", enums.AccountType.LOAN, -300_00, owner)
+    db.add(models.Cost(scenario_id=scenario.id, account_id=cash.id, name="Rent", value=100_00, cadence=enums.Cadence.MONTHLY,
+                       start_date=date(2024, 1, 1)))
+    db.commit()
+    db.refresh(scenario)
+
+    summary = summarize_projection(scenario, app_engine.run_projection(db, scenario, months=12))
+    probe = app_engine.probe_projection(db, scenario, months=12, metrics=app_engine.PROBE_METRICS)
+    assert probe.metrics == summary and not probe.stopped and probe.months == 12
+
+    # Insolvent once the rent has drained the cash: the sixth month ends below zero
+    insolvent = app_engine.probe_projection(db, scenario, months=12, stop=lambda month: month.liquid_assets < 0,
+                                            metrics=["final_liquid_assets"])
+    assert (insolvent.stopped_at, insolvent.stopped_on, insolvent.months) == (6, date(2024, 6, 30), 6)
+    assert insolvent.metrics == {"final_liquid_assets": -100_00}
+
+    # Without a predicate, first-occurrence metrics end the probe once known
+    assert app_engine.probe_projection(db, scenario, months=12, metrics=["insolvency_date"]).months == 6
+    with pytest.raises(ValueError):
+        app_engine.probe_projection(db, scenario, months=12, metrics=["net_worth"])
+
+    # No debt to start with: never "debt free", in the summary as in the probe
+    debtless = create_scenario(db)
+    create_account(db, debtless.id, "Cash", enums.AccountType.CASH, 500_00, create_owner(db, debtless.id))
+    db.refresh(debtless)
+    summary = summarize_projection(debtless, app_engine.run_projection(db, debtless, months=3))
+    probe = app_engine.probe_projection(db, debtless, months=3, metrics=app_engine.PROBE_METRICS)
+    assert summary["debt_free_date"] is None and probe.metrics == summary
+
+def test_pipeline_skips_processors_without_entities(db_session, client):
+    from app.engine.classes import AccountClasses
+    from app.engine.pipeline import PIPELINE, ProcessorRegistry
+    db = db_session
+
+    scenario = create_scenario(db)
+    owner = create_owner(db, scenario.id)
+    cash = create_account(db, scenario.id, "Savings", enums.AccountType.CASH, 1_000_00, owner, interest_rate=3.0)
+    db.add(models.Cost(scenario_id=scenario.id, account_id=cash.id, name="Rent", value=100_00, cadence=enums.Cadence.MONTHLY,
+                       start_date=date(2024, 1, 1)))
+    db.commit()
+    db.refresh(scenario)
+
+    every_month, quiet = PIPELINE.pipeline(scenario, AccountClasses(scenario.accounts))
+    assert [name for name, _ in every_month] == ["process_costs", "process_decumulation", "process_growth"]
+    assert [name for name, _ in quiet] == ["process_growth"]
+    # The optional processors only run when asked for
+    assert "process_interest" in PIPELINE.names()
+    every_month, _ = PIPELINE.pipeline(scenario, AccountClasses(scenario.accounts), include=["process_tax_year_end"])
+    assert [name for name, _ in every_month][-1] == "process_tax_year_end"
+
+    projection = app_engine.run_projection(db, scenario, months=3, profile=True)
+    assert set(projection.metadata["profile"]["processors"]) == {"process_costs", "process_decumulation", "process_growth"}
+
+    registry = ProcessorRegistry()
+    registry.register("first", lambda scenario, context: None, writes={"balances"})
+    registry.register("last", lambda scenario, context: None)
+    registry.register("middle", lambda scenario, context: None, after="first", needs=("costs",))
+    assert registry.names() == ["first", "middle", "last"]
+    with pytest.raises(ValueError):
+        registry.register("bad", lambda scenario, context: None, reads={"pension_pots"})
@@ -0,0 +1,39 @@
+import gzip
+import json
+
+from app import engine
+from benchmarks.synthetic import generate_household, get_spec
+
+def _project(client, scenario_id):
+    res = client.post(f"/api/projections/{scenario_id}/project?months=24", json={})
+    assert res.status_code == 200, res.text
+    return [p["balance"] for p in res.json()["data_points"]]
+
+def test_export_round_trips_through_import(client, db_session):
+    original = generate_household(db_session, get_spec("medium"), name="Exported")
+
+    res = client.get(f"/api/scenarios/{original.id}/export")
+    assert res.status_code == 200
+    assert "attachment" in res.headers["content-disposition"]
+    exported = res.json()
+    assert exported["name"] == "Exported"
+    assert len(exported["financial_events"]) == len(original.financial_events)
+
+    res = client.post("/api/scenarios/import_new", json=exported)
+    assert res.status_code == 200, res.text
+    assert _project(client, res.json()["id"]) == _project(client, original.id)
+
+def test_export_gzip_and_all_scenarios(client, db_session):
+    first = generate_household(db_session, get_spec("small"), name="One")
+    generate_household(db_session, get_spec("small", seed=7), name="Two")
+
+    res = client.get(f"/api/scenarios/{first.id}/export?gzip=true")
+    assert res.headers["content-type"] == "application/gzip"
+    assert json.loads(gzip.decompress(res.content))["name"] == "One"
+
+    res = client.get("/api/scenarios/export")
+    assert res.status_code == 200
+    lines = res.text.strip().split("\n")
+    assert [json.loads(line)["name"] for line in lines] == ["One", "Two"]
+
+    assert client.get("/api/scenarios/999/export").status_code == 404
@@ -0,0 +1,82 @@
+import copy
+from datetime import date
+
+from app import crud, models
+from app.crud import history
+
+def _doc(n_accounts):
+    return {"name": "S", "accounts": [{"id": i, "name": f"A{i}", "tags": ["x"]} for i in range(n_accounts)], "costs": []}
+
+def test_json_diff_round_trips_list_and_dict_edits():
+    old = _doc(5)
+    edits = []
+    new = copy.deepcopy(old); new["accounts"][2]["name"] = "Renamed"; edits.append(new)
+    new = copy.deepcopy(old); del new["accounts"][1]; edits.append(new)
+    new = copy.deepcopy(old); new["accounts"].insert(3, {"id": 99}); edits.append(new)
+    new = copy.deepcopy(old); new["costs"] = [{"id": 1}]; new["notes/~x"] = "k"; del new["name"]; edits.append(new)
+    new = copy.deepcopy(old); new["accounts"] = new["accounts"][:2] + [{"id": 7}, {"id": 8}, {"id": 9}]; edits.append(new)
+    for new in edits:
+        ops = history.json_diff(old, new)
+        assert history.apply_patch(old, ops) == new
+    assert history.apply_patch(old, []) == old
+    assert len(history.json_diff(old, edits[0])) == 1
+
+def test_snapshots_reconstruct_from_keyframes_and_deltas(db_session, monkeypatch):
+    monkeypatch.setattr(history, "HISTORY_KEYFRAME_INTERVAL", 4)
+    scenario = models.Scenario(name="H", start_date=date(2024, 1, 1))
+    db_session.add(scenario); db_session.commit()
+    # An entry from before delta encoding
+    db_session.add(models.ScenarioHistory(scenario_id=scenario.id, action_description="legacy", snapshot_data=_doc(1), timestamp=date.today()))
+    db_session.commit()
+
+    docs = [_doc(1)]
+    for i in range(2, 12):
+        docs.append(_doc(i))
+        history.record_snapshot(db_session, scenario.id, f"edit {i}", docs[-1])
+        db_session.commit()
+
+    entries = list(reversed(crud.get_scenario_history(db_session, scenario.id)))
+    assert [e.is_keyframe for e in entries[1:]] == [False, False, False, True, False, False, False, True, False, False]
+    for entry, doc in zip(entries, docs):
+        assert crud.get_history_snapshot(db_session, entry) == doc
+    # Deltas are much smaller than the documents they encode
+    assert len(entries[-1].payload) < len(history._encode(docs[-1]))
+
+    removed = history.compact_history(db_session, scenario.id, max_entries=6)
+    db_session.commit()
+    assert removed == 5
+    kept = list(reversed(crud.get_scenario_history(db_session, scenario.id)))
+    assert len(kept) == 6 and kept[0].is_keyframe
+    for entry, doc in zip(kept, docs[-6:]):
+        assert crud.get_history_snapshot(db_session, entry) == doc
+
+def test_background_writer_coalesces_bursts(client, db_session, monkeypatch):
+    import time
+    from .conftest import TestingSessionLocal
+    from .utils import create_test_scenario, create_test_owner
+    scenario = create_test_scenario(client, "Bursty")
+    sid = scenario["id"]
+    writer = history.HistoryWriter(window=0.2, session_factory=TestingSessionLocal)
+    monkeypatch.setattr(history, "HISTORY_WRITER", writer)
+
+    def edit(name):
+        # The owners router snapshots before creating
+        create_test_owner(client, name, sid)
+
+    # Three rapid edits -> one entry holding the state before the first
+    for name in ["A", "B", "C"]: edit(name)
+    assert crud.get_scenario_history(db_session, sid) == []
+    deadline = time.monotonic() + 5
+    while not crud.get_scenario_history(db_session, sid) and time.monotonic() < deadline: time.sleep(0.05)
+    db_session.expire_all()
+    entries = crud.get_scenario_history(db_session, sid)
+    assert [e.action_description for e in entries] == ["Create Owner: A (+2 more)"]
+    assert crud.get_history_snapshot(db_session, entries[0])["owners"] == []
+
+    # The next burst starts from the writer's tip (the state after A, B, C)
+    edit("D")
+    writer.flush_all()
+    db_session.expire_all()
+    entries = crud.get_scenario_history(db_session, sid)
+    assert entries[0].action_description == "Create Owner: D"
+    assert [o["name"] for o in crud.get_history_snapshot(db_session, entries[0])["owners"]] == ["A", "B", "C"]
@@ -0,0 +1,54 @@
+from app import metrics
+from .utils import create_test_scenario, create_test_owner, create_test_account
+
+def test_metrics_endpoint_exposes_prometheus_text(client, test_db):
+    scenario = create_test_scenario(client, "Metrics Scenario")
+    owner = create_test_owner(client, "Owner", scenario["id"])
+    create_test_account(client, scenario["id"], [owner["id"]])
+
+    months_before = metrics.PROJECTION_MONTHS.value()
+    res = client.post(f"/api/projections/{scenario['id']}/project?months=24", json={})
+    assert res.status_code == 200
+    assert metrics.PROJECTION_MONTHS.value() == months_before + 24
+
+    res = client.get("/api/metrics")
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("text/plain")
+    body = res.text
+
+    assert "# TYPE marty_http_request_duration_seconds histogram" in body
+    assert 'route="/api/projections/{scenario_id}/project"' in body
+    assert "marty_projection_months_per_second_count" in body
+    assert "marty_projection_scenario_entities_bucket" in body
+    assert "marty_sql_queries_total" in body
+    assert metrics.HTTP_REQUEST_QUERIES.count(method="POST", route="/api/projections/{scenario_id}/project") >= 1
+
+def test_registry_renders_histogram_buckets():
+    registry = metrics.MetricsRegistry()
+    hist = registry.histogram("test_latency_seconds", "Test.", ["route"], buckets=(0.1, 1.0))
+    hist.observe(0.05, route="/a")
+    hist.observe(0.5, route="/a")
+    cache = registry.counter("test_cache_total", "Test.", ["cache", "result"])
+    cache.inc(cache="scenario", result="hit")
+
+    text = registry.render()
+    assert 'test_latency_seconds_bucket{route="/a",le="0.1"} 1' in text
+    assert 'test_latency_seconds_bucket{route="/a",le="1"} 2' in text
+    assert 'test_latency_seconds_bucket{route="/a",le="+Inf"} 2' in text
+    assert 'test_latency_seconds_count{route="/a"} 2' in text
+    assert 'test_cache_total{cache="scenario",result="hit"} 1' in text
+
+def test_route_template_by_position(client, test_db):
+    from types import SimpleNamespace
+    scenario = create_test_scenario(client, "Labelled")
+    sid = scenario["id"]
+    # Both path params take the same value
+    client.post(f"/api/scenarios/{sid}/history/{sid}/restore")
+    route = "/api/scenarios/{scenario_id}/history/{history_id}/restore"
+    assert metrics.HTTP_REQUEST_QUERIES.count(method="POST", route=route) >= 1
+
+    # A literal segment equal to a parameter value stays literal
+    scope = {"route": SimpleNamespace(path_format="/items/{name}/history"), "path": "/api/items/history/history",
+             "path_params": {"name": "history"}}
+    assert metrics.route_template(scope) == "/api/items/{name}/history"
+    assert metrics.route_template({"route": None, "path": "/nowhere"}) == "unmatched"
@@ -1,4 +1,6 @@
+from app import engine, metrics
 from app.utils import calculate_mortgage_payment
+from app.schemas.projection import Projection, ProjectionFlows
 from .utils import create_test_scenario, create_test_owner
 
 def test_run_projection(client, test_db):
@@ -75,3 +77,118 @@ def test_run_projection_with_mortgage(client, test_db):
     actual_mortgage_balance = data["data_points"][1]["account_balances"][str(mortgage_id)]
     
     assert abs(actual_mortgage_balance - expected_mortgage_balance_pence) < 10
+
+def test_projection_response_matches_schema(client, test_db):
+    scenario = create_test_scenario(client, "Serialization Scenario")
+    scenario_id = scenario["id"]
+    owner = create_test_owner(client, "Owner", scenario_id)
+    account = client.post("/api/accounts/", json={
+        "name": "Checking", "account_type": "Cash", "starting_balance": 100000,
+        "interest_rate": 2.0, "scenario_id": scenario_id, "owner_ids": [owner["id"]]
+    }).json()
+
+    response = client.post(f"/api/projections/{scenario_id}/project?months=2", json={})
+    assert response.status_code == 200, response.text
+    assert response.headers["content-type"] == "application/json"
+    data = response.json()
+
+    # Pre-serialized output must still respect the documented Projection shape
+    assert "metadata" not in data
+    assert set(data.keys()) == set(Projection.model_fields.keys())
+    flows = data["data_points"][1]["flows"][str(account["id"])]
+    assert set(flows.keys()) == set(ProjectionFlows.model_fields.keys())
+    assert all(isinstance(v, int) for v in flows.values())
+    assert flows["growth"] > 0
+
+def test_projection_profile_metadata(client, test_db):
+    scenario = create_test_scenario(client, "Profiled Scenario")
+    scenario_id = scenario["id"]
+    owner = create_test_owner(client, "Owner", scenario_id)
+    account = client.post("/api/accounts/", json={
+        "name": "Checking", "account_type": "Cash", "starting_balance": 100000,
+        "interest_rate": 0.0, "scenario_id": scenario_id, "owner_ids": [owner["id"]]
+    }).json()
+    client.post("/api/income_sources/", json={
+        "name": "Salary", "net_value": 500000, "cadence": "monthly", "is_pre_tax": True,
+        "start_date": "2024-01-01", "owner_id": owner["id"], "account_id": account["id"]
+    })
+
+    response = client.post(f"/api/projections/{scenario_id}/project?months=6&profile=true", json={})
+    assert response.status_code == 200, response.text
+    profile = response.json()["metadata"]["profile"]
+
+    assert profile["months"] == 6
+    assert profile["processors"]["process_income"]["calls"] == 6
+    assert profile["processors"]["process_growth"]["calls"] == 6
+    assert profile["phases"]["snapshot"]["calls"] == 6
+    assert profile["tax"]["TaxService.calculate_payroll_deductions"]["calls"] == 6
+
+    # Instrumentation is removed once the profiled run finishes
+    from app.services.tax import TaxService
+    assert TaxService.calculate_payroll_deductions.__qualname__.startswith("TaxService.")
+
+def test_rule_log_levels_and_pages(client, test_db):
+    scenario = create_test_scenario(client, "Logged Scenario")
+    scenario_id = scenario["id"]
+    owner = create_test_owner(client, "Owner", scenario_id)
+    accounts = [client.post("/api/accounts/", json={
+        "name": name, "account_type": "Cash", "starting_balance": balance,
+        "scenario_id": scenario_id, "owner_ids": [owner["id"]]
+    }).json()["id"] for name, balance in [("Checking", 10_000_000), ("Savings", 0)]]
+    client.post("/api/automation_rules/", json={
+        "scenario_id": scenario_id, "name": "Monthly Save", "rule_type": "transfer", "cadence": "monthly",
+        "source_account_id": accounts[0], "target_account_id": accounts[1], "trigger_value": 0, "transfer_value": 1000,
+        "start_date": "2024-01-01"
+    })
+
+    def logs(level):
+        res = client.post(f"/api/projections/{scenario_id}/project?months=12&log_level={level}", json={})
+        assert res.status_code == 200, res.text
+        return res.json()["rule_logs"]
+
+    full = logs("full")
+    assert len(full) == 12
+    assert full[0]["action"] == "Moved £10.00" and full[0]["reason"] == "Smart Transfer"
+    assert full[0]["target_account"] == "Savings"
+    assert logs("off") == []
+    [summary] = logs("summary")
+    assert (summary["count"], summary["amount"], summary["date"], summary["last_date"]) == (12, 12000, full[0]["date"], full[-1]["date"])
+
+    page = client.post(f"/api/projections/{scenario_id}/rule_logs?months=12&offset=10&limit=5&desc=true", json={}).json()
+    assert page["total"] == 12 and page["offset"] == 10
+    assert [row["date"] for row in page["items"]] == [full[1]["date"], full[0]["date"]]
+    assert client.post(f"/api/projections/{scenario_id}/project?log_level=verbose", json={}).status_code == 422
+
+def test_rule_log_pages_for_every_sort(client, test_db):
+    scenario = create_test_scenario(client, "Sorted Logs")
+    scenario_id = scenario["id"]
+    owner = create_test_owner(client, "Owner", scenario_id)
+    accounts = [client.post("/api/accounts/", json={
+        "name": name, "account_type": "Cash", "starting_balance": balance,
+        "scenario_id": scenario_id, "owner_ids": [owner["id"]]
+    }).json()["id"] for name, balance in [("Checking", 10_000_000), ("Savings", 0), ("Buffer", 0)]]
+    for name, target, value in [("Save", accounts[1], 1000), ("Pad", accounts[2], 500)]:
+        client.post("/api/automation_rules/", json={
+            "scenario_id": scenario_id, "name": name, "rule_type": "transfer", "cadence": "monthly",
+            "source_account_id": accounts[0], "target_account_id": target, "trigger_value": 0, "transfer_value": value,
+            "start_date": "2024-01-01"
+        })
+
+    engine.RULE_LOG_CACHE.clear()
+    runs = lambda: metrics.CACHE_REQUESTS.value(cache="rule_logs", result="miss")
+    before = runs()
+    for sort in ["date", "rule_type", "source_account", "target_account", "amount", "reason"]:
+        for desc in ("false", "true"):
+            res = client.post(f"/api/projections/{scenario_id}/rule_logs?months=6&limit=100&sort={sort}&desc={desc}", json={})
+            assert res.status_code == 200, (sort, res.text)
+            items = res.json()["items"]
+            assert len(items) == 12
+            values = [row[sort] for row in items]
+            assert values == sorted(values, reverse=desc == "true"), sort
+    # Only the first page ran the projection; the rest paged the cached log
+    assert runs() == before + 1
+
+    # A /project run with a log leaves its log for the audit view to page
+    client.post(f"/api/projections/{scenario_id}/project?months=3", json={})
+    page = client.post(f"/api/projections/{scenario_id}/rule_logs?months=3", json={}).json()
+    assert page["total"] == 6 and runs() == before + 1
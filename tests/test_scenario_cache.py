@@ -0,0 +1,63 @@
+from app import engine, metrics
+from .utils import create_test_scenario, create_test_owner, create_test_account, create_test_income_source, create_test_cost
+
+def _version(client, scenario_id):
+    return client.get(f"/api/scenarios/{scenario_id}").json()["version"]
+
+def test_child_mutations_bump_scenario_version(client, test_db):
+    scenario = create_test_scenario(client, "Versioned")
+    sid = scenario["id"]
+    owner = create_test_owner(client, "Owner", sid)
+    v1 = _version(client, sid)
+
+    account = create_test_account(client, sid, [owner["id"]])
+    v2 = _version(client, sid)
+    assert v2 > v1
+
+    income = create_test_income_source(client, owner["id"], account["id"])
+    v3 = _version(client, sid)
+    assert v3 > v2
+
+    res = client.put(f"/api/income_sources/{income['id']}", json={"net_value": 123})
+    assert res.status_code == 200, res.text
+    v4 = _version(client, sid)
+    assert v4 > v3
+
+    cost = create_test_cost(client, sid, account["id"])
+    assert client.delete(f"/api/costs/{cost['id']}").status_code == 200
+    assert _version(client, sid) > v4
+
+def test_projection_served_from_cache_until_scenario_changes(client, test_db):
+    engine.SCENARIO_CACHE.clear()
+    scenario = create_test_scenario(client, "Cached")
+    sid = scenario["id"]
+    owner = create_test_owner(client, "Owner", sid)
+    account = create_test_account(client, sid, [owner["id"]])
+
+    hits = lambda: metrics.CACHE_REQUESTS.value(cache="scenario", result="hit")
+    first = client.post(f"/api/projections/{sid}/project?months=6", json={}).json()
+    before = hits()
+    # A what-if run shares the cached base view without altering it
+    sim = client.post(f"/api/projections/{sid}/project?months=6",
+                      json={"overrides": [{"type": "account", "id": account["id"], "field": "starting_balance", "value": 1}]}).json()
+    again = client.post(f"/api/projections/{sid}/project?months=6", json={}).json()
+    assert hits() == before + 2
+    assert sim["data_points"][0]["balance"] == 1
+    assert again == first
+
+    res = client.put(f"/api/accounts/{account['id']}", json={"starting_balance": 500})
+    assert res.status_code == 200, res.text
+    updated = client.post(f"/api/projections/{sid}/project?months=6", json={}).json()
+    assert hits() == before + 2
+    assert updated["data_points"][0]["balance"] == 500
+
+def test_cache_evicts_least_recently_used():
+    cache = engine.cache.ScenarioCache(maxsize=2)
+    cache.put(1, 1, "a"); cache.put(2, 1, "b")
+    assert cache.get(1, 1) == "a"
+    cache.put(3, 1, "c")
+    assert cache.get(2, 1) is None
+    assert cache.get(1, 1) == "a"
+    # A newer version replaces the old entry for the same scenario
+    cache.put(1, 2, "a2")
+    assert cache.get(1, 1) is None and len(cache) == 2
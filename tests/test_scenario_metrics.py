@@ -0,0 +1,113 @@
+from datetime import date
+
+from app import engine, models
+from app.engine.summary import MetricsRefresher
+from .conftest import TestingSessionLocal
+
+
+def _scenario_with_loan(client):
+    scenario_id = client.post("/api/scenarios/", json={"name": "KPIs", "start_date": "2024-01-01"}).json()["id"]
+    owner_id = client.post("/api/owners/", json={"name": "O", "scenario_id": scenario_id}).json()["id"]
+    cash = client.post("/api/accounts/", json={
+        "name": "Cash", "account_type": "Cash", "starting_balance": 5_000_000, "scenario_id": scenario_id, "owner_ids": [owner_id]
+    }).json()["id"]
+    loan = client.post("/api/accounts/", json={
+        "name": "Loan", "account_type": "Loan", "starting_balance": -120_000, "scenario_id": scenario_id,
+        "owner_ids": [owner_id]
+    }).json()["id"]
+    client.post("/api/income_sources/", json={
+        "name": "Salary", "owner_id": owner_id, "account_id": cash, "amount": 500_000, "net_value": 500_000,
+        "cadence": "monthly", "start_date": "2024-01-01", "is_pre_tax": True
+    })
+    client.post("/api/transfers/", json={
+        "name": "Repay", "from_account_id": cash, "to_account_id": loan, "value": 10_000,
+        "cadence": "monthly", "start_date": "2024-01-01", "scenario_id": scenario_id
+    })
+    return scenario_id
+
+
+def test_metrics_endpoint_matches_projection(client, db_session):
+    scenario_id = _scenario_with_loan(client)
+    projection = client.post(f"/api/projections/{scenario_id}/project?months=36").json()
+
+    res = client.get(f"/api/scenarios/{scenario_id}/metrics")
+    assert res.status_code == 200, res.text
+    kpis = res.json()
+    assert kpis["months"] == engine.METRICS_REFRESHER.months and kpis["stale"] is False
+
+    # Computed by a probe, so the refresh leaves the rule log cache alone
+    cached = len(engine.RULE_LOG_CACHE)
+    row = engine.refresh_scenario_metrics(db_session, scenario_id, months=36, force=True)
+    assert len(engine.RULE_LOG_CACHE) == cached
+    assert row.final_net_worth == projection["data_points"][-1]["balance"]
+    assert row.final_liquid_assets == projection["data_points"][-1]["liquid_assets"]
+    assert row.tax_paid == sum(f["tax"] + f["cgt"] for p in projection["data_points"] for f in p["flows"].values())
+    assert row.tax_paid > 0
+    assert row.debt_free_date is not None and row.debt_free_date > date(2024, 1, 1)
+    assert row.insolvency_date is None
+
+    assert client.get("/api/scenarios/999/metrics").status_code == 404
+
+
+def test_refresher_recomputes_after_commit(client, db_session, monkeypatch):
+    from app.engine import summary
+    scenario_id = _scenario_with_loan(client)
+    refresher = MetricsRefresher(delay=0, session_factory=TestingSessionLocal, months=12)
+    # Capture what the after-commit hook schedules and run it inline (the test DB is one shared connection)
+    scheduled = []
+    monkeypatch.setattr(refresher, "schedule", lambda ids: scheduled.extend(ids))
+    monkeypatch.setattr(summary, "METRICS_REFRESHER", refresher)
+
+    client.put(f"/api/scenarios/{scenario_id}", json={"gbp_to_usd_rate": 1.3})
+    assert scheduled == [scenario_id]
+    assert refresher.refresh(scheduled) == 1
+    version = db_session.get(models.Scenario, scenario_id).version
+    row = db_session.get(models.ScenarioMetrics, scenario_id)
+    assert row is not None and row.version == version and row.months == 12
+
+    # The batch pass skips scenarios that are already current unless forced
+    computed_at = row.computed_at
+    assert refresher.refresh_all() >= 1
+    db_session.expire_all()
+    assert db_session.get(models.ScenarioMetrics, scenario_id).computed_at == computed_at
+
+
+def test_refresher_worker_debounces_and_refreshes(tmp_path):
+    import time
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from app.database import Base
+    from benchmarks.synthetic import generate_household, get_spec
+
+    # The worker thread gets a database of its own (the shared in-memory test connection isn't thread-safe)
+    db_engine = create_engine(f"sqlite:///{tmp_path / 'worker.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(db_engine)
+    factory = sessionmaker(bind=db_engine)
+    with factory() as db:
+        scenario_id = generate_household(db, get_spec("small"), name="Worker").id
+
+    refresher = MetricsRefresher(delay=0.3, session_factory=factory, months=12)
+    scheduled_at = time.monotonic()
+    refresher.schedule([scenario_id])
+    thread = refresher._thread
+    assert thread is not None and thread.is_alive()
+    first_deadline = refresher._pending[scenario_id]
+    assert first_deadline >= scheduled_at + 0.3
+
+    # A second edit pushes the deadline back and reuses the running worker
+    time.sleep(0.05)
+    refresher.schedule([scenario_id])
+    assert refresher._thread is thread and refresher._pending[scenario_id] > first_deadline
+    with factory() as db:
+        assert db.get(models.ScenarioMetrics, scenario_id) is None
+
+    deadline = time.monotonic() + 10
+    row = None
+    while row is None and time.monotonic() < deadline:
+        time.sleep(0.05)
+        with factory() as db:
+            row = db.get(models.ScenarioMetrics, scenario_id)
+    assert row is not None and row.months == 12
+    assert time.monotonic() - scheduled_at >= 0.35
+    assert scenario_id not in refresher._pending
+    db_engine.dispose()
@@ -88,3 +88,51 @@ def test_delete_scenario(client, test_db):
     # Verify it's gone
     response = client.get(f"/api/scenarios/{scenario_id}")
     assert response.status_code == 404
+
+
+def test_scenario_graph_query_count_is_independent_of_size(client, db_session):
+    from app import metrics
+    from benchmarks.synthetic import generate_household, get_spec
+
+    small = generate_household(db_session, get_spec("small"), name="Small").id
+    large = generate_household(db_session, get_spec("medium", costs=40, events=20), name="Large").id
+
+    def queries_for(path, method="get"):
+        before = metrics.SQL_QUERIES.value()
+        response = getattr(client, method)(path, **({"json": {}} if method == "post" else {}))
+        assert response.status_code == 200, response.text
+        return metrics.SQL_QUERIES.value() - before
+
+    assert queries_for(f"/api/scenarios/{small}") == queries_for(f"/api/scenarios/{large}")
+    assert queries_for(f"/api/projections/{small}/project?months=12", "post") == \
+        queries_for(f"/api/projections/{large}/project?months=12", "post")
+
+
+def test_scenario_summaries_use_one_query_and_stored_metrics(client, db_session):
+    from app import metrics, engine
+    from benchmarks.synthetic import generate_household, get_spec
+
+    small = generate_household(db_session, get_spec("small"), name="Small")
+    large = generate_household(db_session, get_spec("medium"), name="Large")
+
+    before = metrics.SQL_QUERIES.value()
+    response = client.get("/api/scenarios/summary")
+    assert response.status_code == 200
+    assert metrics.SQL_QUERIES.value() - before == 1
+    rows = {row["id"]: row for row in response.json()}
+    assert rows[large.id]["entity_counts"]["accounts"] == len(large.accounts)
+    assert rows[large.id]["entity_counts"]["income_sources"] == sum(len(o.income_sources) for o in large.owners)
+    assert rows[small.id]["entity_counts"]["costs"] == len(small.costs)
+    assert rows[small.id]["final_net_worth"] is None
+
+    projection = client.post(f"/api/projections/{small.id}/project?months=24").json()
+    engine.refresh_scenario_metrics(db_session, small.id, months=24)
+    row = next(r for r in client.get("/api/scenarios/summary").json() if r["id"] == small.id)
+    assert row["final_net_worth"] == projection["data_points"][-1]["balance"]
+    assert row["current_net_worth"] == projection["data_points"][0]["balance"]
+    assert (row["metrics_months"], row["metrics_stale"]) == (24, False)
+
+    # Metrics computed at an older version are flagged until refreshed
+    client.put(f"/api/scenarios/{small.id}", json={"description": "edited"})
+    row = next(r for r in client.get("/api/scenarios/summary").json() if r["id"] == small.id)
+    assert row["metrics_stale"] is True
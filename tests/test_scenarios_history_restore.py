@@ -52,3 +52,66 @@ def test_import_new_scenario(client, test_db):
     assert data["start_date"] == "2025-01-01"
     assert len(data["accounts"]) == 1
     assert data["accounts"][0]["name"] == "Acc1"
+
+def test_restore_history_snapshot(client, test_db):
+    from .utils import create_test_owner, create_test_account
+    res = client.post("/api/scenarios/", json={"name": "Restorable", "start_date": "2024-01-01"})
+    scenario_id = res.json()["id"]
+    owner = create_test_owner(client, "Owner", scenario_id)
+    create_test_account(client, scenario_id, [owner["id"]], name="Snapshotted")
+    # Snapshots record the state before each change
+    create_test_owner(client, "Later Owner", scenario_id)
+
+    history = client.get(f"/api/scenarios/{scenario_id}/history").json()
+    res = client.post(f"/api/scenarios/{scenario_id}/history/{history[0]['id']}/restore")
+    assert res.status_code == 200, res.text
+    restored = res.json()
+    assert restored["name"] == "Restored: Restorable"
+    assert [a["name"] for a in restored["accounts"]] == ["Snapshotted"]
+    assert restored["accounts"][0]["owners"][0]["name"] == "Owner"
+
+def test_import_new_bulk_links_and_errors(client, test_db):
+    events = [{"name": f"E{i}", "value": i, "event_date": "2026-01-01", "event_type": "income_expense", "to_account_id": 1}
+              for i in range(1200)]
+    import_data = {
+        "name": "Big Import", "start_date": "2025-01-01",
+        "owners": [{"id": 7, "name": "O", "income_sources": [
+            {"name": "Pay", "net_value": 100, "cadence": "monthly", "start_date": "2025-01-01", "account_id": 2}]}],
+        "accounts": [
+            {"id": 1, "name": "Cash", "account_type": "Cash", "starting_balance": 0, "owners": [7]},
+            {"id": 2, "name": "Current", "account_type": "Cash", "starting_balance": 0, "owners": [{"id": 7}], "payment_from_account_id": 1},
+        ],
+        "financial_events": events,
+    }
+    res = client.post("/api/scenarios/import_new", json=import_data)
+    assert res.status_code == 200, res.text
+    data = res.json()
+    ids = {a["name"]: a["id"] for a in data["accounts"]}
+    assert len(data["financial_events"]) == 1200
+    assert {e["to_account_id"] for e in data["financial_events"]} == {ids["Cash"]}
+    assert next(a for a in data["accounts"] if a["name"] == "Current")["payment_from_account_id"] == ids["Cash"]
+    assert all(a["owners"][0]["name"] == "O" for a in data["accounts"])
+    assert data["owners"][0]["income_sources"][0]["account_id"] == ids["Current"]
+
+    events[1100]["value"] = "not a number"
+    res = client.post("/api/scenarios/import_new", json=import_data)
+    assert res.status_code == 422
+    assert "financial_events[1100].value" in res.json()["detail"]
+    # Nothing from the failed import was kept
+    assert [s["name"] for s in client.get("/api/scenarios/").json()] == ["Big Import"]
+
+def test_history_listing_is_keyset_paginated(client, test_db):
+    from .utils import create_test_owner
+    res = client.post("/api/scenarios/", json={"name": "Paged", "start_date": "2024-01-01"})
+    scenario_id = res.json()["id"]
+    for i in range(5): create_test_owner(client, f"O{i}", scenario_id)
+
+    pages, before = [], None
+    while True:
+        res = client.get(f"/api/scenarios/{scenario_id}/history", params={"limit": 2, **({"before": before} if before else {})})
+        assert res.status_code == 200
+        pages.append([h["action_description"] for h in res.json()])
+        before = res.headers.get("X-Next-Before")
+        if not before: break
+    assert pages == [["Create Owner: O4", "Create Owner: O3"], ["Create Owner: O2", "Create Owner: O1"], ["Create Owner: O0"]]
+    assert "snapshot_data" not in res.json()[0]
@@ -53,3 +53,30 @@ def test_simulation_overrides(client, db_session):
     
     # Logic check: More income = Higher balance
     assert final_balance_sim > final_balance_base
+
+def test_overrides_leave_orm_state_untouched(db_session):
+    from app import engine
+    db = db_session
+    scenario = models.Scenario(name="Overlay Test", start_date=date(2024, 1, 1))
+    db.add(scenario)
+    db.commit()
+
+    acc = models.Account(scenario_id=scenario.id, name="Cash", account_type=enums.AccountType.CASH, starting_balance=100000)
+    db.add(acc)
+    db.commit()
+
+    overrides = [
+        schemas.SimulationOverride(type="account", id=acc.id, field="starting_balance", value=500000),
+        schemas.SimulationOverride(type="account", id=acc.id, field="not_a_column", value=1),
+    ]
+    base = engine.compile_scenario(scenario)
+    sim = engine.run_projection(db, base, months=2, overrides=overrides)
+
+    assert sim.data_points[0].balance == 500000
+    assert acc.starting_balance == 100000
+    assert not db.dirty
+    # The shared base view is not modified either, so it can serve other requests
+    assert base.accounts[0].starting_balance == 100000
+    assert engine.run_projection(db, base, months=2).data_points[0].balance == 100000
+    with pytest.raises(AttributeError):
+        base.accounts[0].starting_balance = 1
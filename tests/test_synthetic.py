@@ -0,0 +1,23 @@
+from app import engine as app_engine
+from benchmarks.synthetic import generate_household, get_spec
+
+def _fingerprint(scenario):
+    return (
+        len(scenario.owners), len(scenario.accounts), len(scenario.costs), len(scenario.transfers),
+        len(scenario.financial_events), len(scenario.automation_rules),
+        sum(len(o.income_sources) for o in scenario.owners),
+        sum(a.starting_balance for a in scenario.accounts),
+    )
+
+def test_synthetic_household_is_deterministic(db_session):
+    spec = get_spec("medium", events=5, costs=8)
+    first = generate_household(db_session, spec, name="A")
+    second = generate_household(db_session, spec, name="B")
+    assert _fingerprint(first) == _fingerprint(second)
+
+    account_types = {a.account_type for a in first.accounts}
+    assert {"Cash", "Investment", "Pension", "Mortgage", "RSU Grant"} <= account_types
+
+    res_a = app_engine.run_projection(db_session, first, months=24)
+    res_b = app_engine.run_projection(db_session, second, months=24)
+    assert [p.balance for p in res_a.data_points] == [p.balance for p in res_b.data_points]